@@ -0,0 +1,225 @@
+import hashlib
+import os
+import queue
+import threading
+from collections import OrderedDict, deque
+
+from PIL import Image
+
+# SHARED IMAGE ASSETS: EACH SOURCE IS DECODED ONCE PER VARIANT SIZE, KEPT IN A
+# SIZE-BOUNDED MEMORY LRU AND SAVED PRE-SCALED TO AN ON-DISK CACHE SO LATER
+# LAUNCHES LOAD A SMALL PNG INSTEAD OF RE-DECODING THE LARGE ORIGINAL.
+CACHE_DIR = os.environ.get("RENOVISION_CACHE_DIR",
+                           os.path.join(os.path.expanduser("~"), ".cache", "renovision", "thumbs"))
+MEMORY_BUDGET_MB = float(os.environ.get("RENOVISION_TEXTURE_MB", "32"))
+
+# VARIANT SIZES USED BY THE PAGES
+LOGO_LARGE = (150, 150)
+LOGO_SMALL = (50, 50)
+POPUP_SIZE = (400, 200)
+TEXTURE_SIZE = (400, 250)
+THUMB_SIZE = (96, 96)
+
+
+def decode_scaled(path, size):
+    img = Image.open(path)
+    # JPEG DRAFT MODE: LET THE DECODER DOWNSCALE BY 1/2, 1/4 OR 1/8 WHILE STAYING >= size
+    if img.format == "JPEG":
+        img.draft("RGB", size)
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+    img = img.convert("RGBA" if has_alpha else "RGB")
+    return img.resize(size, Image.Resampling.LANCZOS)
+
+
+def decode_texture(path, size):
+    return Image.open(path).convert("RGB").resize(size, Image.Resampling.LANCZOS)
+
+
+def image_nbytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+# SIZE-BOUNDED LRU OF DECODED, RESIZED IMAGES KEYED BY (PATH, SIZE)
+class TextureCache:
+    def __init__(self, budget_mb=MEMORY_BUDGET_MB, loader=decode_texture):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self.loader = loader
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path, size):
+        key = (path, tuple(size))
+        with self._lock:
+            img = self._items.get(key)
+            if img is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return img
+            self.misses += 1
+        # DECODE OUTSIDE THE LOCK SO OTHER LOOKUPS ARE NOT BLOCKED
+        img = self.loader(path, key[1])
+        self.put(key, img)
+        return img
+
+    def put(self, key, img):
+        size = image_nbytes(img)
+        with self._lock:
+            if key in self._items:
+                self.nbytes -= image_nbytes(self._items.pop(key))
+            # AN IMAGE BIGGER THAN THE WHOLE BUDGET IS RETURNED BUT NOT KEPT
+            if size > self.budget_bytes:
+                return
+            self._items[key] = img
+            self.nbytes += size
+            while self.nbytes > self.budget_bytes:
+                _, old = self._items.popitem(last=False)
+                self.nbytes -= image_nbytes(old)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "mb": self.nbytes / (1024 * 1024),
+                "budget_mb": self.budget_bytes / (1024 * 1024),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+class AssetManager:
+    def __init__(self, cache_dir=CACHE_DIR, budget_mb=MEMORY_BUDGET_MB):
+        self.cache_dir = cache_dir
+        self.memory = TextureCache(budget_mb, loader=self._load)
+        self.disk_hits = 0
+        self.decodes = 0
+
+    # SAME INTERFACE AS TextureCache SO RoomRenderer CAN USE EITHER
+    def get(self, path, size):
+        return self.memory.get(path, size)
+
+    def disk_path(self, path, size):
+        # KEYED BY SOURCE PATH + MTIME + FILE SIZE, SO AN EDITED IMAGE GETS A NEW ENTRY
+        st = os.stat(path)
+        digest = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}_{size[0]}x{size[1]}_{st.st_mtime_ns}_{st.st_size}.png")
+
+    def _load(self, path, size):
+        cached = self.disk_path(path, size)
+        if os.path.exists(cached):
+            try:
+                img = Image.open(cached)
+                img.load()
+                self.disk_hits += 1
+                return img
+            except OSError:
+                pass
+        img = decode_scaled(path, size)
+        self.decodes += 1
+        self._save(cached, img)
+        return img
+
+    def _save(self, cached, img):
+        # A READ-ONLY OR FULL DISK ONLY COSTS US THE CACHE, NEVER THE IMAGE
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp = f"{cached}.{os.getpid()}.{threading.get_ident()}.tmp"
+            img.save(tmp, "PNG")
+            os.replace(tmp, cached)
+            # DROP STALE VARIANTS OF THE SAME SOURCE AND SIZE
+            prefix = os.path.basename(cached).rsplit("_", 2)[0] + "_"
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(prefix) and name.endswith(".png") and name != os.path.basename(cached):
+                    os.remove(os.path.join(self.cache_dir, name))
+        except OSError:
+            pass
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats.update({"disk_hits": self.disk_hits, "decodes": self.decodes})
+        return stats
+
+
+ASSETS = AssetManager()
+
+
+# BACKGROUND DECODING FOR THE GALLERY. want() REPLACES THE WHOLE PENDING LIST (MOST
+# URGENT FIRST), SO SCROLLING PAST THOUSANDS OF SKUS NEVER QUEUES MORE THAN WHAT
+# THE CALLER STILL CARES ABOUT. EACH FINISHED want() KEY IS PUT ON self.done AS
+# (key, image) - image None WHEN THE FILE CANNOT BE READ - FOR THE Tk THREAD TO
+# COLLECT. prefetch() JUMPS THE QUEUE AND ONLY WARMS THE ASSET CACHE.
+class BackgroundLoader:
+    def __init__(self, assets=None):
+        self.assets = ASSETS if assets is None else assets
+        self.done = queue.SimpleQueue()
+        self.loaded = 0
+        self.failed = 0
+        self._pending = deque()
+        self._urgent = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._busy = False
+        self._thread = threading.Thread(target=self._run, name="thumbnails", daemon=True)
+        self._thread.start()
+
+    def want(self, keys):
+        with self._cond:
+            self._pending = deque(keys)
+            self._cond.notify()
+
+    def prefetch(self, key):
+        with self._cond:
+            self._urgent.append(key)
+            self._cond.notify()
+
+    # TRUE WHILE ANYTHING IS QUEUED OR BEING DECODED
+    def busy(self):
+        with self._cond:
+            return self._busy or bool(self._pending or self._urgent)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._urgent.clear()
+            self._cond.notify()
+
+    def _next(self):
+        with self._cond:
+            self._busy = False
+            while not (self._closed or self._pending or self._urgent):
+                self._cond.wait()
+            if self._closed:
+                return None, False
+            self._busy = True
+            if self._urgent:
+                return self._urgent.popleft(), False
+            return self._pending.popleft(), True
+
+    def _run(self):
+        while True:
+            key, notify = self._next()
+            if key is None:
+                return
+            try:
+                img = self.assets.get(*key)
+                self.loaded += 1
+            # ANY DECODE ERROR (TRUNCATED / CORRUPT FILES RAISE MORE THAN OSError) FAILS
+            # JUST THIS KEY; THE THREAD KEEPS RUNNING SO busy() CAN GO FALSE
+            except Exception:
+                img = None
+                self.failed += 1
+            if notify:
+                self.done.put((key, img))
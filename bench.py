@@ -0,0 +1,320 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timezone
+
+import database
+from database import MaterialCatalog, RenovationLogic
+
+# BENCHMARK SUITE. "run" WRITES ONE JSON FILE OF METRICS PLUS MACHINE METADATA,
+# "compare" EXITS NON-ZERO WHEN A METRIC IS WORSE THAN THE BASELINE BY MORE THAN
+# THE THRESHOLD. INPUTS ARE SEEDED SO RUNS ARE REPRODUCIBLE.
+# CORRECTNESS CHECKS LIVE IN test_logic.py (python -m pytest -q).
+CATALOG_SIZES = (8, 100, 1_000, 10_000, 100_000)
+QUICK_CATALOG_SIZES = (8, 1_000)
+QUERIES = 2_000
+BATCH_ROWS = 100_000
+BULK_INVOICES = 2_000
+IMPORT_RUNS = 5
+DEFAULT_THRESHOLD = 0.10
+SEED = 1234
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# SECONDS PER CALL: MEDIAN OF repeat RUNS, EACH LONG ENOUGH TO TIME RELIABLY
+def per_call(fn, repeat=5):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return statistics.median(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def metric(value, unit, better):
+    return {"value": value, "unit": unit, "better": better}
+
+
+# n MATERIALS (HALF FLOOR, HALF WALL); THE REAL 8-ROW CATALOG FOR n == 8
+def synthetic_catalog(n, seed=SEED):
+    if n == len(database.catalog):
+        return database.catalog
+    rng = random.Random(seed)
+    images = [r.image_file for r in database.catalog]
+    data = {"Material": [], "Type": [], "Price_Per_Sqm": [], "Is_Waterproof": [], "Image_File": []}
+    for i in range(n):
+        mat_type = "Floor" if i % 2 == 0 else "Wall"
+        data["Material"].append(f"{mat_type} {i:06d}")
+        data["Type"].append(mat_type)
+        data["Price_Per_Sqm"].append(round(rng.uniform(15, 300), 2))
+        data["Is_Waterproof"].append(rng.random() < 0.5)
+        data["Image_File"].append(images[i % len(images)])
+    return MaterialCatalog.from_columns(data)
+
+
+def random_rooms(mat_catalog, n, seed=SEED):
+    rng = random.Random(seed)
+    floors = mat_catalog.names("Floor")
+    walls = mat_catalog.names("Wall")
+    rooms = []
+    for _ in range(n):
+        floor = rng.choice(floors)
+        rooms.append((rng.choice(["Bedroom", "Living Room", "Bathroom", "Kitchen"]),
+                      round(rng.uniform(2, 8), 2), round(rng.uniform(2, 8), 2), round(rng.uniform(2.4, 3.2), 2),
+                      floor, rng.choice(walls), rng.choice(["30x30 cm", "60x60 cm", "15x90 cm"])))
+    return rooms
+
+
+def bench_logic(sizes, queries, batch_rows, repeat):
+    import pandas as pd
+    results = {}
+    original = database.catalog
+    try:
+        for n in sizes:
+            mat_catalog = database.set_catalog(synthetic_catalog(n))
+            rooms = random_rooms(mat_catalog, queries)
+            safety_args = [(r[0], r[4]) for r in rooms]
+            calc_args = [r[1:] for r in rooms]
+
+            def raw_calc():
+                for args in calc_args:
+                    RenovationLogic._calculate_project(*args)
+
+            def safety():
+                for args in safety_args:
+                    RenovationLogic.check_safety(*args)
+
+            def calc():
+                for args in calc_args:
+                    RenovationLogic.calculate_project(*args)
+
+            # MEMO TIMINGS ARE WARM: EVERY QUERY HAS BEEN SEEN ONCE
+            RenovationLogic.clear_memo()
+            calc()
+            results[f"safety.{n}"] = metric(queries / per_call(safety, repeat), "ops/s", "higher")
+            results[f"calc.raw.{n}"] = metric(queries / per_call(raw_calc, repeat), "ops/s", "higher")
+            results[f"calc.memo.{n}"] = metric(queries / per_call(calc, repeat), "ops/s", "higher")
+
+            frame = pd.DataFrame(random_rooms(mat_catalog, batch_rows, seed=SEED + 1),
+                                 columns=list(RenovationLogic.BATCH_COLUMNS))
+            seconds = per_call(lambda: RenovationLogic.calculate_batch(frame), repeat)
+            results[f"batch.{n}"] = metric(batch_rows / seconds, "rows/s", "higher")
+    finally:
+        database.set_catalog(original)
+        RenovationLogic.clear_memo()
+    return results
+
+
+# PREVIEW COMPOSITING AS DONE FOR run_calc (TEXTURES WARM, AS AFTER THE FIRST CLICK)
+def bench_render(repeat):
+    from render import RoomRenderer, TextureCache
+    wall = os.path.join(HERE, "images", "paint.jpg")
+    floor = os.path.join(HERE, "images", "ceramic.jpg")
+    results = {}
+    for size in ((400, 250), (800, 500)):
+        label = f"{size[0]}x{size[1]}"
+        started = time.perf_counter()
+        renderer = RoomRenderer(size, TextureCache())
+        renderer.render_tiled(wall, floor, "60x60 cm", 4, 5, 2.7)
+        results[f"render.tiled_first.{label}"] = metric((time.perf_counter() - started) * 1000, "ms", "lower")
+        # A NEW WIDTH EVERY CALL RESAMPLES BOTH LAYERS; THE SAME INPUTS ONLY COMPOSITE CACHED LAYERS
+        widths = itertools.count()
+        results[f"render.tiled.{label}"] = metric(
+            per_call(lambda: renderer.render_tiled(wall, floor, "60x60 cm", 4 + next(widths) * 1e-3, 5, 2.7),
+                     repeat) * 1000, "ms", "lower")
+        results[f"render.tiled_cached.{label}"] = metric(
+            per_call(lambda: renderer.render_tiled(wall, floor, "60x60 cm", 4, 5, 2.7), repeat) * 1000, "ms", "lower")
+        results[f"render.classic.{label}"] = metric(
+            per_call(lambda: renderer.render(wall, floor), repeat) * 1000, "ms", "lower")
+
+    # STRIP-RENDERED PRINT EXPORT (export.py), TEXTURES WARM
+    from export import export_preview
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "preview.png")
+        export_preview(out, wall, floor, "60x60 cm", 4, 5, 2.7, size=(1600, 1000))
+        started = time.perf_counter()
+        export_preview(out, wall, floor, "60x60 cm", 4, 5, 2.7, size=(1600, 1000))
+        results["render.export_png.1600x1000"] = metric((time.perf_counter() - started) * 1000, "ms", "lower")
+    return results
+
+
+def bench_invoice(count, repeat):
+    from invoice import InvoiceEngine
+    engine = InvoiceEngine()
+    record = RenovationLogic.calculate_project(5, 4, 3, "Vinyl", "Standard Paint", "30x30 cm")
+    record.update({"discount": 0.0, "room_type": "Bedroom", "width": "5", "length": "4", "height": "3",
+                   "tile_size": "30x30 cm", "floor_mat": "Vinyl", "wall_mat": "Standard Paint",
+                   "service_fee": 85.0, "service_name": "Delivery Only"})
+    results = {"invoice.render": metric(1 / per_call(lambda: engine.render(record), repeat), "ops/s", "higher")}
+    with tempfile.TemporaryDirectory() as tmp:
+        stats = engine.write_bulk((dict(record) for _ in range(count)), os.path.join(tmp, "invoices.zip"))
+    results["invoice.bulk_zip"] = metric(stats["invoices_per_sec"], "ops/s", "higher")
+    return results
+
+
+# .rvcat FILE (catalog_mmap.py): OPEN TIME AND SINGLE-NAME LOOKUPS AT THE LARGEST SIZE
+def bench_catalog(n, queries, repeat):
+    from catalog_mmap import write_catalog, open_catalog
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_catalog(os.path.join(tmp, "catalog.rvcat"), synthetic_catalog(n).to_columns())
+
+        def open_close():
+            open_catalog(path).close()
+
+        results[f"catalog.mmap_open.{n}"] = metric(per_call(open_close, repeat) * 1000, "ms", "lower")
+        mapped = open_catalog(path)
+        names = [r[4] for r in random_rooms(mapped, queries)]
+
+        def lookups():
+            for name in names:
+                mapped.get(name)
+
+        results[f"catalog.mmap_get.{n}"] = metric(queries / per_call(lookups, repeat), "ops/s", "higher")
+        mapped.close()
+    return results
+
+
+# FRESH INTERPRETER PER RUN, BEST OF runs (THE OS FILE CACHE IS WARM AFTER THE FIRST)
+def bench_imports(runs):
+    results = {}
+    for module in ("database", "gui"):
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        times = []
+        for _ in range(runs):
+            proc = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True)
+            if proc.returncode != 0:
+                break
+            times.append(float(proc.stdout.strip().splitlines()[-1]))
+        if times:
+            results[f"import.{module}"] = metric(min(times) * 1000, "ms", "lower")
+    return results
+
+
+def package_version(name):
+    try:
+        module = __import__(name)
+        return getattr(module, "__version__", None)
+    except ImportError:
+        return None
+
+
+def machine_metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=HERE, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or None,
+        "cpu_count": os.cpu_count(),
+        "numpy": package_version("numpy"),
+        "pandas": package_version("pandas"),
+        "pillow": package_version("PIL")
+    }
+
+
+def run(quick=False, only=None):
+    repeat = 3 if quick else 5
+    suites = {
+        "logic": lambda: bench_logic(QUICK_CATALOG_SIZES if quick else CATALOG_SIZES, QUERIES,
+                                     BATCH_ROWS // 10 if quick else BATCH_ROWS, repeat),
+        "render": lambda: bench_render(repeat),
+        "catalog": lambda: bench_catalog((QUICK_CATALOG_SIZES if quick else CATALOG_SIZES)[-1], QUERIES, repeat),
+        "invoice": lambda: bench_invoice(BULK_INVOICES // 4 if quick else BULK_INVOICES, repeat),
+        "imports": lambda: bench_imports(2 if quick else IMPORT_RUNS)
+    }
+    metrics = {}
+    for name, suite in suites.items():
+        if only and name not in only:
+            continue
+        print(f"running {name}...", file=sys.stderr)
+        metrics.update(suite())
+    return {"meta": machine_metadata(), "quick": quick, "metrics": metrics}
+
+
+# METRICS WORSE THAN THE BASELINE BY MORE THAN threshold (A FRACTION, 0.10 = 10%)
+# A BASELINE METRIC MISSING FROM THE CURRENT RUN COUNTS AS A REGRESSION (current / change None)
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    regressions = []
+    for name, base in baseline["metrics"].items():
+        now = current["metrics"].get(name)
+        if now is None:
+            regressions.append({"name": name, "baseline": base["value"], "current": None,
+                                "unit": base["unit"], "change": None})
+            continue
+        if not base["value"]:
+            continue
+        change = (now["value"] - base["value"]) / base["value"]
+        worse = -change if base["better"] == "higher" else change
+        if worse > threshold:
+            regressions.append({"name": name, "baseline": base["value"], "current": now["value"],
+                                "unit": base["unit"], "change": change})
+    return regressions
+
+
+def print_comparison(baseline, current, regressions):
+    flagged = {r["name"] for r in regressions}
+    print(f"{'METRIC':<28} {'BASELINE':>14} {'CURRENT':>14} {'CHANGE':>9}")
+    for name, base in sorted(baseline["metrics"].items()):
+        now = current["metrics"].get(name)
+        if now is None:
+            print(f"{name:<28} {base['value']:>14.4g} {'missing':>14} {'':>9} {base['unit']}  REGRESSED")
+            continue
+        change = (now["value"] - base["value"]) / base["value"] if base["value"] else 0.0
+        mark = "  REGRESSED" if name in flagged else ""
+        print(f"{name:<28} {base['value']:>14.4g} {now['value']:>14.4g} {change:>+8.1%} {base['unit']}{mark}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="renovision-bench", description="RENOVISION benchmark suite.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_parser = sub.add_parser("run", help="run the benchmarks and write JSON")
+    run_parser.add_argument("-o", "--output", default="-", help="result file, '-' for stdout (default)")
+    run_parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer repeats")
+    run_parser.add_argument("--only", nargs="+", choices=["logic", "render", "catalog", "invoice", "imports"])
+    cmp_parser = sub.add_parser("compare", help="fail when current results regress against a baseline")
+    cmp_parser.add_argument("baseline")
+    cmp_parser.add_argument("current")
+    cmp_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                            help="allowed slowdown as a fraction (default: 0.10)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        text = json.dumps(run(args.quick, args.only), indent=2)
+        if args.output == "-":
+            print(text)
+        else:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    print_comparison(baseline, current, regressions)
+    if regressions:
+        missing = sum(r["current"] is None for r in regressions)
+        print(f"{len(regressions) - missing} metric(s) regressed by more than {args.threshold:.0%}, "
+              f"{missing} missing from the current run", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from database import MaterialCatalog, MaterialRecord
+
+# BINARY COLUMNAR CATALOG (.rvcat), OPENED WITH mmap. EVERY PROCESS THAT OPENS THE
+# SAME FILE SHARES ITS PAGES THROUGH THE OS PAGE CACHE; NOTHING IS PARSED OR COPIED
+# AT OPEN, COLUMNS ARE NUMPY VIEWS OVER THE MAPPING AND ONLY TOUCHED PAGES ARE READ.
+#
+# LAYOUT (LITTLE-ENDIAN, EVERY SECTION 8-BYTE ALIGNED):
+#   HEADER       MAGIC, FORMAT VERSION, ROWS, STRINGS, INDEX SLOTS, CATALOG VERSION,
+#                THEN (OFFSET, LENGTH) FOR EACH SECTION BELOW
+#   price        float64[rows]
+#   price_cents  int64[rows]
+#   flags        uint8[rows]       BIT 0 = WATERPROOF
+#   name_id      uint32[rows]      \
+#   type_id      uint32[rows]       > IDS INTO THE STRING TABLE (EACH STRING STORED ONCE)
+#   image_id     uint32[rows]      /
+#   str_offsets  uint64[strings + 1]
+#   str_data     UTF-8 BYTES
+#   index        int32[slots]      OPEN ADDRESSING (LINEAR PROBING) NAME -> ROW, -1 = EMPTY
+MAGIC = b"RVCAT\x00\x00\x01"
+FORMAT_VERSION = 1
+SECTIONS = ("price", "price_cents", "flags", "name_id", "type_id", "image_id", "str_offsets", "str_data", "index")
+DTYPES = {"price": "<f8", "price_cents": "<i8", "flags": "u1", "name_id": "<u4", "type_id": "<u4",
+          "image_id": "<u4", "str_offsets": "<u8", "str_data": "u1", "index": "<i4"}
+# MAGIC, FORMAT VERSION, RESERVED, ROWS, STRINGS, INDEX SLOTS, CATALOG VERSION, SECTIONS
+HEADER = struct.Struct("<8sIIQQQ16s" + "QQ" * len(SECTIONS))
+WATERPROOF = 1
+LOAD_FACTOR = 0.5
+
+
+def name_hash(key):
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def align(n):
+    return (n + 7) & ~7
+
+
+# material_data() / load_data() COLUMNS -> .rvcat FILE
+def write_catalog(path, data):
+    mat_catalog = MaterialCatalog.from_columns(data)
+    records = list(mat_catalog)
+    n = len(records)
+
+    strings, string_ids = [], {}
+
+    def intern(text):
+        sid = string_ids.get(text)
+        if sid is None:
+            sid = string_ids[text] = len(strings)
+            strings.append(text.encode("utf-8"))
+        return sid
+
+    name_id = np.array([intern(r.name) for r in records], dtype="<u4")
+    type_id = np.array([intern(r.type) for r in records], dtype="<u4")
+    image_id = np.array([intern(r.image_file) for r in records], dtype="<u4")
+    str_offsets = np.zeros(len(strings) + 1, dtype="<u8")
+    str_offsets[1:] = np.cumsum([len(s) for s in strings])
+
+    slots = 8
+    while slots * LOAD_FACTOR < n:
+        slots *= 2
+    index = np.full(slots, -1, dtype="<i4")
+    mask = slots - 1
+    for row, r in enumerate(records):
+        i = name_hash(r.name.encode("utf-8")) & mask
+        while index[i] >= 0:
+            i = (i + 1) & mask
+        index[i] = row
+
+    columns = {
+        "price": np.array([r.price for r in records], dtype="<f8"),
+        "price_cents": np.array([r.price_cents for r in records], dtype="<i8"),
+        "flags": np.array([WATERPROOF if r.waterproof else 0 for r in records], dtype="u1"),
+        "name_id": name_id, "type_id": type_id, "image_id": image_id,
+        "str_offsets": str_offsets,
+        "str_data": np.frombuffer(b"".join(strings), dtype="u1"),
+        "index": index
+    }
+    places, pos = [], align(HEADER.size)
+    for name in SECTIONS:
+        places += [pos, columns[name].nbytes]
+        pos = align(pos + columns[name].nbytes)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, n, len(strings), slots,
+                         mat_catalog.version.encode("ascii"), *places)
+
+    # WRITE NEXT TO THE TARGET AND RENAME, SO READERS NEVER SEE HALF A FILE
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as f:
+        f.write(header)
+        for name, offset in zip(SECTIONS, places[::2]):
+            f.write(b"\x00" * (offset - f.tell()))
+            f.write(columns[name].tobytes())
+        f.write(b"\x00" * (align(f.tell()) - f.tell()))
+    os.replace(tmp, path)
+    return path
+
+
+class MmapCatalog:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError(f"{path}: truncated or corrupt catalog") from None
+        # NOTHING MAY HOLD A VIEW OF THE MAPPING YET, SO IT CAN STILL BE CLOSED ON FAILURE
+        try:
+            n, slots, version, places = self._check_header()
+        except ValueError:
+            self._mm.close()
+            raise
+        self._n = n
+        self._slots = slots
+        self.version = version
+        # NUMPY VIEWS FOR COLUMN WORK, memoryview CASTS FOR SINGLE-ITEM READS (NO NUMPY SCALARS)
+        self._views = {}
+        for i, name in enumerate(SECTIONS):
+            offset, nbytes = places[2 * i], places[2 * i + 1]
+            dtype = np.dtype(DTYPES[name])
+            setattr(self, f"_{name}", np.frombuffer(self._mm, dtype=dtype, count=nbytes // dtype.itemsize,
+                                                    offset=offset))
+            self._views[name] = memoryview(self._mm)[offset:offset + nbytes].cast(dtype.char)
+        self._str_start = places[2 * SECTIONS.index("str_data")]
+        self._v_index = self._views["index"]
+        self._v_name = self._views["name_id"]
+        self._v_offsets = self._views["str_offsets"]
+        self._strings = {}
+        self._names = None
+        self._by_type = None
+        self._columns = None
+
+    # HEADER FIELDS, AFTER CHECKING THAT EVERY SECTION HAS THE SIZE ITS COUNTS IMPLY AND
+    # LIES INSIDE THE FILE (A TRUNCATED COPY MUST FAIL HERE, NOT ON SOME LATER LOOKUP)
+    def _check_header(self):
+        corrupt = ValueError(f"{self.path}: truncated or corrupt catalog")
+        if len(self._mm) < HEADER.size:
+            raise corrupt
+        fields = HEADER.unpack_from(self._mm, 0)
+        magic, fmt, _, n, n_strings, slots, version = fields[:7]
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: not a RENOVISION catalog file (format {FORMAT_VERSION})")
+        places = fields[7:]
+        expected = {"price": 8 * n, "price_cents": 8 * n, "flags": n, "name_id": 4 * n, "type_id": 4 * n,
+                    "image_id": 4 * n, "str_offsets": 8 * (n_strings + 1), "index": 4 * slots}
+        if slots <= 0 or slots & (slots - 1):
+            raise corrupt
+        for i, name in enumerate(SECTIONS):
+            offset, nbytes = places[2 * i], places[2 * i + 1]
+            if offset % 8 or offset + nbytes > len(self._mm) or nbytes != expected.get(name, nbytes):
+                raise corrupt
+        try:
+            return n, slots, version.decode("ascii"), places
+        except UnicodeDecodeError:
+            raise corrupt from None
+
+    # THE MAPPING STAYS OPEN WHILE ANY COLUMN VIEW IS STILL REFERENCED ELSEWHERE
+    def close(self):
+        for name in SECTIONS:
+            setattr(self, f"_{name}", None)
+            self._views[name].release()
+        self._v_index = self._v_name = self._v_offsets = None
+        self._columns = None
+        try:
+            self._mm.close()
+        except BufferError:
+            pass
+
+    # TYPE AND IMAGE STRINGS (FEW, REPEATED ACROSS ROWS) ARE DECODED ONCE
+    def _string(self, sid):
+        text = self._strings.get(sid)
+        if text is None:
+            text = self._strings[sid] = self._mm[self._str_start + self._v_offsets[sid]:
+                                                 self._str_start + self._v_offsets[sid + 1]].decode("utf-8")
+        return text
+
+    def _raw_name(self, row):
+        sid = self._v_name[row]
+        return self._mm[self._str_start + self._v_offsets[sid]:self._str_start + self._v_offsets[sid + 1]]
+
+    # ROW POSITION FOR name, -1 WHEN UNKNOWN (ONE HASH, USUALLY ONE PROBE)
+    def row_of(self, name):
+        key = name.encode("utf-8")
+        mask = self._slots - 1
+        i = name_hash(key) & mask
+        index = self._v_index
+        while True:
+            row = index[i]
+            if row < 0 or self._raw_name(row) == key:
+                return row
+            i = (i + 1) & mask
+
+    def record(self, row):
+        views = self._views
+        return MaterialRecord(self._raw_name(row).decode("utf-8"), self._string(views["type_id"][row]),
+                              views["price"][row], bool(views["flags"][row] & WATERPROOF),
+                              self._string(views["image_id"][row]))
+
+    # --- SAME INTERFACE AS database.MaterialCatalog ---
+    def get(self, name, default=None):
+        row = self.row_of(name) if isinstance(name, str) else -1
+        return default if row < 0 else self.record(row)
+
+    def __getitem__(self, name):
+        row = self.row_of(name) if isinstance(name, str) else -1
+        if row < 0:
+            raise KeyError(name)
+        return self.record(row)
+
+    def __contains__(self, name):
+        return isinstance(name, str) and self.row_of(name) >= 0
+
+    def __iter__(self):
+        return (self.record(row) for row in range(self._n))
+
+    def __len__(self):
+        return self._n
+
+    # ZERO-COPY VIEWS EXCEPT waterproof, WHICH IS ONE BOOLEAN PASS OVER THE FLAGS
+    def columns(self):
+        if self._columns is None:
+            self._columns = {
+                "price": self._price,
+                "price_cents": self._price_cents,
+                "waterproof": (self._flags & WATERPROOF).astype(bool)
+            }
+        return self._columns
+
+    def codes(self, names):
+        import pandas as pd
+        labels, uniques = pd.factorize(np.asarray(names, dtype=object))
+        lookup = np.array([self.row_of(name) if isinstance(name, str) else -1 for name in uniques] + [-1],
+                          dtype=np.int64)
+        return lookup[labels]
+
+    # DECODED ON FIRST USE (THE GUI LISTS AND SEARCH NEED THEM, BATCH PRICING DOES NOT)
+    def names(self, mat_type=None):
+        if self._names is None:
+            data = self._mm[self._str_start:self._str_start + int(self._str_offsets[-1])]
+            offsets = self._str_offsets.tolist()
+            self._names = [data[offsets[sid]:offsets[sid + 1]].decode("utf-8") for sid in self._name_id.tolist()]
+        if mat_type is None:
+            return list(self._names)
+        if self._by_type is None:
+            self._by_type = {}
+            type_ids = self._type_id
+            for sid in np.unique(type_ids).tolist():
+                rows = np.flatnonzero(type_ids == sid).tolist()
+                self._by_type[self._string(sid)] = [self._names[r] for r in rows]
+        return list(self._by_type.get(mat_type, []))
+
+    def to_columns(self):
+        return MaterialCatalog.to_columns(self)
+
+    # PRICE CHANGES GIVE AN IN-MEMORY SNAPSHOT (WRITE IT BACK WITH write_catalog TO SHARE IT)
+    def with_prices(self, prices):
+        return MaterialCatalog(iter(self)).with_prices(prices)
+
+
+def open_catalog(path):
+    return MmapCatalog(path)
+
+
+def frame_columns(frame):
+    return {col: frame[col].tolist() for col in MaterialRecord.COLUMNS}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="renovision-catalog", description="Memory-mapped catalog files.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="convert a catalog to .rvcat")
+    build.add_argument("output")
+    build.add_argument("--csv", help="CSV with the load_data() columns (default: the built-in catalog)")
+    build.add_argument("--synthetic", type=int, help="n generated materials instead (see bench.py)")
+    info = sub.add_parser("info", help="print a .rvcat summary")
+    info.add_argument("path")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "build":
+            if args.csv:
+                import pandas as pd
+                data = frame_columns(pd.read_csv(args.csv, skipinitialspace=True))
+            elif args.synthetic:
+                from bench import synthetic_catalog
+                data = synthetic_catalog(args.synthetic).to_columns()
+            else:
+                from database import material_data
+                data = material_data()
+            started = time.perf_counter()
+            write_catalog(args.output, data)
+            print(f"{args.output}: {len(data['Material'])} materials, {os.path.getsize(args.output) / 1e6:.1f} MB "
+                  f"in {time.perf_counter() - started:.2f}s", file=sys.stderr)
+            return 0
+        started = time.perf_counter()
+        mat_catalog = open_catalog(args.path)
+        print(f"{args.path}: {len(mat_catalog)} materials, version {mat_catalog.version}, "
+              f"opened in {(time.perf_counter() - started) * 1000:.2f} ms")
+        return 0
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import os
+import threading
+
+import database
+
+# HOT RELOAD: A DAEMON THREAD POLLS THE CATALOG FILE. WHEN IT CHANGES (AND HAS STOPPED
+# CHANGING FOR ONE POLL, SO A FILE THAT IS STILL BEING WRITTEN IS NOT READ), A NEW
+# SNAPSHOT IS BUILT ON THAT THREAD AND SWAPPED IN WITH database.set_catalog. SNAPSHOTS
+# ARE NEVER MODIFIED, SO A QUOTE THAT ALREADY HOLDS THE OLD ONE FINISHES ON OLD PRICES.
+# LISTENERS ARE CALLED ON THE WATCHER THREAD WITH (old, new, diff); GUI LISTENERS MUST
+# HAND THE WORK BACK TO THE Tk THREAD THEMSELVES.
+POLL_INTERVAL_S = 1.0
+
+
+# WHAT CHANGED BETWEEN TWO SNAPSHOTS, BY MATERIAL NAME
+def catalog_diff(old, new):
+    if old is new or (old is not None and old.version == new.version):
+        return {"added": [], "removed": [], "changed": []}
+    before = {} if old is None else {r.name: r for r in old}
+    added, changed = [], []
+    for record in new:
+        previous = before.pop(record.name, None)
+        if previous is None:
+            added.append(record.name)
+        elif (previous.type, previous.price, previous.waterproof, previous.image_file) != \
+                (record.type, record.price, record.waterproof, record.image_file):
+            changed.append(record.name)
+    return {"added": added, "removed": list(before), "changed": changed}
+
+
+def is_empty(diff):
+    return not (diff["added"] or diff["removed"] or diff["changed"])
+
+
+class CatalogWatcher:
+    def __init__(self, path, interval=POLL_INTERVAL_S):
+        self.path = path
+        self.interval = interval
+        self.listeners = []
+        self.reloads = 0
+        self.last_error = None
+        self._seen = self.signature()
+        self._pending = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    # ONE POLL. RETURNS THE DIFF WHEN A NEW SNAPSHOT WAS SWAPPED IN, OTHERWISE None
+    def check(self):
+        current = self.signature()
+        if current is None or current == self._seen:
+            self._pending = None
+            return None
+        if current != self._pending:
+            self._pending = current
+            return None
+        self._pending = None
+        self._seen = current
+        return self.reload()
+
+    # A FILE THAT FAILS TO LOAD (FOR ANY REASON: A TRUNCATED .rvcat, A JSON FILE OF THE
+    # WRONG SHAPE ...) LEAVES THE CURRENT SNAPSHOT IN PLACE AND THE WATCHER RUNNING
+    def reload(self):
+        try:
+            new = database.load_catalog_file(self.path)
+        except Exception as e:
+            self.last_error = e
+            return None
+        self.last_error = None
+        old = database.catalog
+        diff = catalog_diff(old, new)
+        if is_empty(diff):
+            return None
+        database.set_catalog(new)
+        self.reloads += 1
+        for listener in list(self.listeners):
+            listener(old, new, diff)
+        return diff
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="catalog-watch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+
+# THE GUI WATCHES RENOVISION_CATALOG WHEN IT IS SET (None OTHERWISE)
+def watch_env(interval=POLL_INTERVAL_S):
+    path = os.environ.get("RENOVISION_CATALOG")
+    return CatalogWatcher(path, interval).start() if path else None
@@ -0,0 +1,262 @@
+import argparse
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+
+from database import RenovationLogic, SERVICE_OPTIONS, MEMBER_DISCOUNT_BP
+from pricing import to_cents, from_cents, discount_cents
+
+# HEADLESS QUOTING: NO TKINTER, NO PIL. ROOMS ARE READ AND PRICED IN FIXED-SIZE CHUNKS
+# SO MEMORY STAYS BOUNDED NO MATTER HOW LARGE THE INPUT IS.
+DEFAULT_CHUNK_SIZE = 50_000
+
+OUTPUT_COLUMNS = [
+    "row", "status", "message", "room_type", "floor_mat", "wall_mat", "tile_size",
+    "width", "length", "height", "floor_area", "wall_area", "tiles_needed",
+    "floor_price", "wall_price", "floor_cost", "wall_cost", "subtotal", "discount", "total_cost",
+    "service", "service_fee", "grand_total", "budget", "balance"
+]
+
+TRUE_STRINGS = {"1", "true", "yes", "y", "member"}
+
+
+def read_chunks(source, fmt, chunk_size):
+    if fmt == "json":
+        return read_json_array(source, chunk_size)
+    if fmt == "jsonl":
+        return pd.read_json(source, lines=True, chunksize=chunk_size, dtype=False)
+    return pd.read_csv(source, chunksize=chunk_size, skipinitialspace=True)
+
+
+# A PLAIN JSON ARRAY OF ROOM OBJECTS. IT HAS TO BE PARSED WHOLE, SO ONLY THE PRICING
+# IS CHUNKED; USE JSON LINES FOR INPUTS THAT DO NOT FIT IN MEMORY.
+def read_json_array(source, chunk_size):
+    if isinstance(source, str):
+        with open(source, encoding="utf-8") as f:
+            rows = json.load(f)
+    else:
+        rows = json.load(source)
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("JSON input must be an array of room objects (use .jsonl for JSON Lines).")
+    for start in range(0, len(rows), chunk_size):
+        yield pd.DataFrame.from_records(rows[start:start + chunk_size])
+
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    if path and path.endswith(".json"):
+        return "json"
+    if path and path.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+
+def parse_member(values, default):
+    if values is None:
+        return np.full(default[0], default[1], dtype=bool)
+    return np.array([default[1] if pd.isna(v) or str(v).strip() == "" else str(v).strip().lower() in TRUE_STRINGS
+                     for v in values], dtype=bool)
+
+
+def parse_service(values, n, default):
+    keys = [default] * n if values is None else [
+        default if pd.isna(v) or str(v).strip() == "" else str(v).strip().lower() for v in values
+    ]
+    unknown = sorted({k for k in keys if k not in SERVICE_OPTIONS})
+    if unknown:
+        raise ValueError(f"Unknown service option(s): {', '.join(unknown)}")
+    fees = np.array([SERVICE_OPTIONS[k][0] for k in keys], dtype=np.float64)
+    names = [SERVICE_OPTIONS[k][1] for k in keys]
+    return fees, names
+
+
+# OPTIONAL 'pattern' AND 'grout_mm' COLUMNS OVERRIDE THE --layout DEFAULTS PER ROW
+def layout_columns(chunk, rooms, ok, pattern, grout_mm):
+    from layout import plan_layouts, PATTERNS
+    n = len(chunk)
+    patterns = [pattern if pd.isna(v) or str(v).strip() == "" else str(v).strip().lower()
+                for v in (chunk["pattern"] if "pattern" in chunk else [None] * n)]
+    unknown = sorted(set(patterns) - set(PATTERNS))
+    if unknown:
+        raise ValueError(f"Unknown layout pattern(s): {', '.join(unknown)}")
+    grout = (pd.to_numeric(chunk["grout_mm"], errors="coerce").fillna(grout_mm).to_numpy(dtype=np.float64)
+             if "grout_mm" in chunk else np.full(n, grout_mm))
+    cols = {"pattern": patterns, "full_tiles": np.zeros(n, dtype=np.int64), "cut_tiles": np.zeros(n, dtype=np.int64),
+            "offcuts_reused": np.zeros(n, dtype=np.int64), "layout_tiles": np.zeros(n, dtype=np.int64)}
+    rows = np.flatnonzero(ok)
+    if len(rows):
+        plan = plan_layouts(rooms["width"][rows], rooms["length"][rows], rooms["tile_size"][rows],
+                            np.array(patterns, dtype=object)[rows], grout[rows])
+        cols["full_tiles"][rows] = plan["full_tiles"]
+        cols["cut_tiles"][rows] = plan["cut_tiles"]
+        cols["offcuts_reused"][rows] = plan["offcuts_reused"]
+        cols["layout_tiles"][rows] = plan["tiles_needed"]
+    return cols
+
+
+def quote_chunk(chunk, first_row, default_service, default_member, layout=None, grout_mm=None):
+    n = len(chunk)
+    rooms = {col: chunk[col].to_numpy() for col in RenovationLogic.BATCH_COLUMNS}
+    for col in ("width", "length", "height"):
+        rooms[col] = pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype=np.float64)
+
+    # [HAZIQ] INPUT VALIDATION (SAME RULE AS THE CONSULTATION PAGE)
+    dims = np.column_stack([rooms["width"], rooms["length"], rooms["height"]])
+    valid_dims = np.all(np.isfinite(dims) & (dims > 0), axis=1)
+
+    res = RenovationLogic.calculate_batch(rooms)
+    ok = res["is_safe"] & valid_dims
+
+    member = parse_member(chunk["member"].to_numpy() if "member" in chunk else None, (n, default_member))
+    service_fee, service_name = parse_service(chunk["service"].to_numpy() if "service" in chunk else None,
+                                              n, default_service)
+
+    # [AIMAN] DISCOUNT CALCULATION LOGIC (IN CENTS, SEE pricing.py)
+    subtotal_cents = res["total_cost_cents"]
+    discount = discount_cents(subtotal_cents, member, MEMBER_DISCOUNT_BP)
+    total_cents = subtotal_cents - discount
+    grand_cents = total_cents + to_cents(service_fee)
+    subtotal = res["total_cost"]
+    discount = from_cents(discount)
+    total_cost = from_cents(total_cents)
+    grand_total = from_cents(grand_cents)
+
+    budget = (pd.to_numeric(chunk["budget"], errors="coerce").to_numpy(dtype=np.float64)
+              if "budget" in chunk else np.full(n, np.nan))
+
+    # REJECTION MESSAGES COME FROM THE SCALAR CHECK, ONLY FOR THE (FEW) REJECTED ROWS
+    status = np.where(ok, "quote", "rejected").astype(object)
+    message = np.full(n, "", dtype=object)
+    for i in np.flatnonzero(~ok):
+        if not valid_dims[i]:
+            message[i] = "Dimensions must be greater than 0."
+            continue
+        is_safe, msg = RenovationLogic.check_safety(rooms["room_type"][i], rooms["floor_mat"][i])
+        message[i] = msg if not is_safe else "Error: Material not found."
+
+    out = pd.DataFrame({
+        "row": np.arange(first_row, first_row + n),
+        "status": status,
+        "message": message,
+        "room_type": rooms["room_type"],
+        "floor_mat": rooms["floor_mat"],
+        "wall_mat": rooms["wall_mat"],
+        "tile_size": rooms["tile_size"],
+        "width": rooms["width"],
+        "length": rooms["length"],
+        "height": rooms["height"],
+        "floor_area": res["floor_area"],
+        "wall_area": res["wall_area"],
+        "tiles_needed": res["tiles_needed"],
+        "floor_price": res["floor_price"],
+        "wall_price": res["wall_price"],
+        "floor_cost": res["floor_cost"],
+        "wall_cost": res["wall_cost"],
+        "subtotal": subtotal,
+        "discount": discount,
+        "total_cost": total_cost,
+        "service": service_name,
+        "service_fee": service_fee,
+        "grand_total": grand_total,
+        "budget": budget,
+        "balance": np.round(budget - grand_total, 2)
+    }, columns=OUTPUT_COLUMNS)
+    if layout:
+        for col, values in layout_columns(chunk, rooms, ok, layout, grout_mm).items():
+            out[col] = values
+    money = ["floor_cost", "wall_cost", "subtotal", "discount", "total_cost", "service_fee", "grand_total"]
+    out.loc[~ok, money + ["floor_area", "wall_area", "balance"]] = np.nan
+    out.loc[~ok, "tiles_needed"] = 0
+    return out
+
+
+def write_chunk(out, stream, fmt, first):
+    if fmt == "jsonl":
+        text = out.to_json(orient="records", lines=True, double_precision=10)
+        stream.write(text if text.endswith("\n") else text + "\n")
+    else:
+        out.to_csv(stream, header=first, index=False, float_format="%.2f", lineterminator="\n")
+
+
+def new_totals():
+    return {"rows": 0, "quotes": 0, "rejected": 0, "materials_total": 0.0,
+            "discount_total": 0.0, "service_total": 0.0, "invoice_total": 0.0}
+
+
+# SUMMED IN WHOLE CENTS SO A MILLION ROWS STILL RECONCILE WITH THE INVOICES
+def add_totals(totals, out):
+    quoted = out["status"] == "quote"
+    totals["rows"] += len(out)
+    totals["quotes"] += int(quoted.sum())
+    totals["rejected"] += int((~quoted).sum())
+    # MATERIALS BEFORE THE DISCOUNT, SO materials - discount + service = invoice
+    for key, col in (("materials_total", "subtotal"), ("discount_total", "discount"),
+                     ("service_total", "service_fee"), ("invoice_total", "grand_total")):
+        cents = to_cents(out.loc[quoted, col].to_numpy(dtype=np.float64)).sum()
+        totals[key] = from_cents(to_cents(totals[key]) + int(cents))
+    return totals
+
+
+def run(source, stream, in_fmt="csv", out_fmt="csv", chunk_size=DEFAULT_CHUNK_SIZE,
+        default_service="self", default_member=False, layout=None, grout_mm=None):
+    if default_service not in SERVICE_OPTIONS:
+        raise ValueError(f"Unknown service option: {default_service}")
+    totals = new_totals()
+    first_row = 0
+    for chunk in read_chunks(source, in_fmt, chunk_size):
+        missing = [col for col in RenovationLogic.BATCH_COLUMNS if col not in chunk]
+        if missing:
+            raise ValueError(f"Missing input column(s): {', '.join(missing)}")
+        out = quote_chunk(chunk, first_row, default_service, default_member, layout, grout_mm)
+        write_chunk(out, stream, out_fmt, first_row == 0)
+        add_totals(totals, out)
+        first_row += len(out)
+    return totals
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="renovision-quote",
+                                     description="Headless RENOVISION quoting from CSV, JSON or JSON Lines.")
+    parser.add_argument("input", nargs="?", default="-", help="room spec file, '-' for stdin (default)")
+    parser.add_argument("-o", "--output", default="-", help="output file, '-' for stdout (default)")
+    parser.add_argument("--format", choices=["csv", "json", "jsonl"],
+                        help="input format (default: from extension, else csv); json is one array of rooms")
+    parser.add_argument("--output-format", choices=["csv", "jsonl"],
+                        help="output format (default: input format, jsonl for json input)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows per chunk")
+    parser.add_argument("--service", default="self", choices=sorted(SERVICE_OPTIONS),
+                        help="service option for rows without a 'service' column")
+    parser.add_argument("--member", action="store_true", help="apply member discount to rows without a 'member' column")
+    parser.add_argument("--layout", choices=["straight", "offset", "herringbone"],
+                        help="add planned full/cut tile counts, laying this pattern unless a row has a 'pattern' column")
+    parser.add_argument("--grout-mm", type=float, default=2.0, help="grout gap for --layout (default: 2)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.chunk_size <= 0:
+        print("Error: --chunk-size must be greater than 0.", file=sys.stderr)
+        return 2
+    in_fmt = detect_format(None if args.input == "-" else args.input, args.format)
+    out_fmt = args.output_format or ("jsonl" if in_fmt == "json" else in_fmt)
+    source = sys.stdin if args.input == "-" else args.input
+    stream = sys.stdout if args.output == "-" else open(args.output, "w", newline="", buffering=1 << 20)
+    try:
+        totals = run(source, stream, in_fmt, out_fmt, args.chunk_size, args.service, args.member,
+                     args.layout, args.grout_mm)
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    print(json.dumps({"summary": totals}), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,88 @@
-import pandas as pd
+import hashlib
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+from pricing import to_cents, from_cents, to_basis_points, room_cents
+
+# NUMPY AND PANDAS ARE IMPORTED INSIDE THE FUNCTIONS THAT NEED THEM SO THAT
+# "import database" STAYS CHEAP FOR THE GUI COLD START.
 
 # [HAZIQ] CONSTANTS FOR FEES
 DELIVERY_FLAT_RATE = 85.00
 INSTALLATION_FLAT_RATE = 450.00
 
-# [KER QIN] MATERIAL DATAFRAME
-def load_data():
-    data = {
+# [HAZIQ] SERVICE OPTIONS: KEY -> (FEE, INVOICE NAME)
+SERVICE_OPTIONS = {
+    "self": (0, "Self Collection"),
+    "delivery": (DELIVERY_FLAT_RATE, "Delivery Only"),
+    "installation": (INSTALLATION_FLAT_RATE, "Delivery & Installation")
+}
+
+# [AIMAN] MEMBER DISCOUNT
+MEMBER_DISCOUNT_RATE = 0.05
+MEMBER_DISCOUNT_BP = to_basis_points(MEMBER_DISCOUNT_RATE)
+
+# [HAZIQ] ROOMS THAT NEED WATERPROOF FLOORING
+WET_ROOMS = ("Bathroom", "Kitchen")
+
+# [AIMAN] WASTAGE LOGIC FOR TILE SIZE
+TILE_WASTAGE = {
+    "30x30 cm": 1.05,
+    "60x60 cm": 1.08,
+    "15x90 cm": 1.12
+}
+DEFAULT_WASTAGE = 1.05
+DEFAULT_TILE_AREA_SQM = 0.09
+
+# MEMOIZED QUOTES: HOW MANY DISTINCT INPUT SETS ARE KEPT
+QUOTE_MEMO_SIZE = 4096
+
+# [AIMAN] PLANK FLOORS ONLY COME IN 15x90, EVERYTHING ELSE IN SQUARE TILES
+PLANK_MATERIALS = ("Vinyl", "Solid Wood")
+PLANK_SIZES = ["15x90 cm"]
+TILE_SIZES = ["30x30 cm", "60x60 cm"]
+
+
+SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*[x×*]\s*(\d+(?:\.\d+)?)\s*(mm|cm|m)?\s*$", re.IGNORECASE)
+UNIT_M = {"mm": 0.001, "cm": 0.01, "m": 1.0}
+
+
+# "30x30 cm", "600 x 1200 mm", "15X90" (cm WHEN NO UNIT) -> (width_m, height_m).
+# SHARED BY THE QUOTE, layout.py AND THE PREVIEW; KEPT HERE SO A SCALAR QUOTE DOES NOT IMPORT NUMPY
+def parse_tile_size(text):
+    match = SIZE_RE.match(str(text))
+    if not match:
+        raise ValueError(f"Unrecognised tile size: {text!r} (expected e.g. '30x30 cm')")
+    scale = UNIT_M[(match.group(3) or "cm").lower()]
+    w, h = float(match.group(1)) * scale, float(match.group(2)) * scale
+    if w <= 0 or h <= 0:
+        raise ValueError(f"Tile size must be positive: {text!r}")
+    return w, h
+
+
+# [HAZIQ] TILE CALCULATION (PARSED ONCE PER DISTINCT SIZE STRING)
+@lru_cache(maxsize=256)
+def tile_area_sqm(tile_size_str):
+    # ANY "WxH" SIZE (mm / cm / m); layout.plan_layouts RAISES INSTEAD OF FALLING BACK
+    try:
+        w, h = parse_tile_size(tile_size_str)
+    except ValueError:
+        return DEFAULT_TILE_AREA_SQM
+    return w * h
+
+
+# [AIMAN] WASTAGE FACTOR FOR A TILE SIZE (BLANK / UNKNOWN SIZES GET THE DEFAULT)
+def tile_wastage(tile_size_str):
+    return TILE_WASTAGE.get(tile_size_str.strip() if isinstance(tile_size_str, str) else "", DEFAULT_WASTAGE)
+
+
+# [KER QIN] MATERIAL DATA (PLAIN COLUMNS)
+def material_data():
+    return {
         "Material": [
             "Vinyl", "Marble", "Solid Wood", "Ceramic Tile", "Porcelain Tile",
             "Standard Paint", "Premium Wallpaper", "Textured Paint"
@@ -34,19 +110,268 @@ def load_data():
             "images/texture.jpg"
         ]
     }
-    return pd.DataFrame(data)
-df = load_data()
+
+
+# [KER QIN] MATERIAL DATAFRAME
+def load_data():
+    import pandas as pd
+    return pd.DataFrame(material_data())
+
+
+# df IS BUILT ON FIRST ACCESS (from database import df STILL WORKS)
+def __getattr__(name):
+    if name == "df":
+        value = load_data()
+        setattr(sys.modules[__name__], "df", value)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# MATERIAL RECORD (COMPACT, ONE PER CATALOG ROW)
+class MaterialRecord:
+    __slots__ = ("name", "type", "price", "price_cents", "waterproof", "image_file")
+
+    # DATAFRAME COLUMN NAME -> RECORD ATTRIBUTE
+    COLUMNS = {
+        "Material": "name",
+        "Type": "type",
+        "Price_Per_Sqm": "price",
+        "Is_Waterproof": "waterproof",
+        "Image_File": "image_file"
+    }
+
+    def __init__(self, name, type, price, waterproof, image_file):
+        self.name = name
+        self.type = type
+        self.price = float(price)
+        self.price_cents = to_cents(self.price)
+        self.waterproof = bool(waterproof)
+        self.image_file = image_file
+
+    def __getitem__(self, column):
+        return getattr(self, self.COLUMNS[column])
+
+    def __repr__(self):
+        return f"MaterialRecord({self.name!r}, {self.type!r}, {self.price!r})"
+
+
+# MATERIAL CATALOG WITH O(1) NAME INDEX
+class MaterialCatalog:
+    def __init__(self, records):
+        self.records = []
+        self.index = {}
+        self._by_type = {}
+        self._columns = None
+        self._version = None
+        for record in records:
+            # FIRST ROW WINS, SAME AS df[df['Material'] == name].iloc[0]
+            if record.name in self.index:
+                continue
+            self.records.append(record)
+            self.index[record.name] = record
+            self._by_type.setdefault(record.type, []).append(record.name)
+
+    @classmethod
+    def from_columns(cls, data):
+        columns = zip(data['Material'], data['Type'], data['Price_Per_Sqm'], data['Is_Waterproof'], data['Image_File'])
+        return cls(MaterialRecord(*row) for row in columns)
+
+    @classmethod
+    def from_frame(cls, frame):
+        columns = zip(frame['Material'].tolist(), frame['Type'].tolist(), frame['Price_Per_Sqm'].tolist(),
+                      frame['Is_Waterproof'].tolist(), frame['Image_File'].tolist())
+        return cls(MaterialRecord(*row) for row in columns)
+
+    # CONTENT STAMP (STABLE ACROSS RUNS) OF EVERYTHING THAT AFFECTS A QUOTE. A CATALOG IS TREATED AS A
+    # SNAPSHOT: PRICE CHANGES GO THROUGH with_prices() + set_catalog(), WHICH GIVES
+    # A NEW STAMP AND SO INVALIDATES THE QUOTE MEMO.
+    @property
+    def version(self):
+        if self._version is None:
+            content = repr([(r.name, r.type, r.price, r.waterproof, r.image_file) for r in self.records])
+            self._version = hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+        return self._version
+
+    # NEW SNAPSHOT WITH SOME PRICES REPLACED ({name: price}), THIS ONE IS LEFT AS IS
+    def with_prices(self, prices):
+        unknown = [name for name in prices if name not in self.index]
+        if unknown:
+            raise KeyError(f"Unknown materials: {', '.join(map(str, unknown))}")
+        return MaterialCatalog(
+            MaterialRecord(r.name, r.type, prices.get(r.name, r.price), r.waterproof, r.image_file)
+            for r in self.records
+        )
+
+    def get(self, name, default=None):
+        return self.index.get(name, default)
+
+    # BACK TO material_data() COLUMNS
+    def to_columns(self):
+        records = list(self)
+        return {col: [getattr(r, attr) for r in records] for col, attr in MaterialRecord.COLUMNS.items()}
+
+    # ARRAY-BACKED COLUMNS FOR VECTORIZED PRICING (BUILT ON FIRST USE)
+    def columns(self):
+        import numpy as np
+        if self._columns is None:
+            self._columns = {
+                "price": np.array([r.price for r in self.records], dtype=np.float64),
+                "price_cents": np.array([r.price_cents for r in self.records], dtype=np.int64),
+                "waterproof": np.array([r.waterproof for r in self.records], dtype=bool)
+            }
+        return self._columns
+
+    def codes(self, names):
+        import numpy as np
+        import pandas as pd
+        # ROW POSITION OF EACH NAME, -1 WHEN THE MATERIAL IS UNKNOWN
+        labels, uniques = pd.factorize(np.asarray(names, dtype=object))
+        positions = {record.name: i for i, record in enumerate(self.records)}
+        lookup = np.array([positions.get(name, -1) for name in uniques] + [-1], dtype=np.int64)
+        return lookup[labels]
+
+    def names(self, mat_type=None):
+        if mat_type is None:
+            return [record.name for record in self.records]
+        return list(self._by_type.get(mat_type, []))
+
+    def __getitem__(self, name):
+        return self.index[name]
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+
+# CATALOG FILE -> SNAPSHOT. .rvcat IS MAPPED (SHARED BETWEEN PROCESSES, SEE catalog_mmap.py);
+# .csv AND .json HOLD THE load_data() COLUMNS (JSON: {column: [...]} OR A LIST OF ROWS)
+CATALOG_SUFFIXES = (".rvcat", ".csv", ".json")
+
+
+def load_catalog_file(path):
+    suffix = os.path.splitext(path)[1].lower()
+    if suffix == ".rvcat":
+        from catalog_mmap import open_catalog
+        return open_catalog(path)
+    if suffix == ".csv":
+        import pandas as pd
+        return MaterialCatalog.from_frame(pd.read_csv(path, skipinitialspace=True))
+    if suffix == ".json":
+        import json
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            data = {col: [row[col] for row in data] for col in MaterialRecord.COLUMNS}
+        return MaterialCatalog.from_columns(data)
+    raise ValueError(f"{path}: catalog files must be one of {', '.join(CATALOG_SUFFIXES)}")
+
+
+# RENOVISION_CATALOG=path/to/catalog.{rvcat,csv,json} LOADS AN EXTERNAL CATALOG INSTEAD
+# (THE GUI ALSO WATCHES IT FOR CHANGES, SEE catalog_watch.py)
+def load_catalog():
+    path = os.environ.get("RENOVISION_CATALOG")
+    if path:
+        return load_catalog_file(path)
+    return MaterialCatalog.from_columns(material_data())
+
+
+catalog = load_catalog()
+
+
+# SWAP IN A NEW CATALOG SNAPSHOT (E.G. AFTER A PRICE UPDATE). ONE REFERENCE
+# ASSIGNMENT, SO READERS SEE EITHER THE OLD SNAPSHOT OR THE NEW ONE. CODE THAT
+# READS THE CATALOG MORE THAN ONCE TAKES "mat_catalog = catalog" FIRST AND USES
+# THAT, SO A SWAP HALFWAY THROUGH A QUOTE CANNOT MIX PRICES FROM TWO SNAPSHOTS.
+def set_catalog(new_catalog):
+    global catalog
+    catalog = new_catalog
+    return catalog
+
+
+# EVERYTHING OUTSIDE THE INPUTS THAT A QUOTE DEPENDS ON
+def pricing_stamp(mat_catalog=None):
+    mat_catalog = catalog if mat_catalog is None else mat_catalog
+    return mat_catalog.version, DEFAULT_WASTAGE, tuple(TILE_WASTAGE.items())
+
+
+# SIZE-BOUNDED LRU OF RESULTS, KEYED BY THE CALL ARGUMENTS (compute(*key, *extra)
+# FILLS A MISS; extra IS NOT PART OF THE KEY). EACH LOOKUP CARRIES THE CURRENT STAMP; WHEN IT DIFFERS FROM THE STAMP THE
+# ENTRIES WERE COMPUTED UNDER, EVERYTHING IS DROPPED. THE HIT PATH TAKES NO LOCK.
+class QuoteMemo:
+    def __init__(self, maxsize=QUOTE_MEMO_SIZE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._stamp = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key, stamp, compute, *extra):
+        if stamp != self._stamp:
+            self._restamp(stamp)
+        value = self._items.get(key)
+        if value is not None:
+            try:
+                self._items.move_to_end(key)
+            except KeyError:
+                pass
+            self.hits += 1
+            return value
+        self.misses += 1
+        # ERRORS (E.G. UNKNOWN MATERIAL) ARE NOT CACHED
+        value = compute(*key, *extra)
+        with self._lock:
+            if stamp == self._stamp:
+                self._items[key] = value
+                if len(self._items) > self.maxsize:
+                    self._items.popitem(last=False)
+        return value
+
+    def _restamp(self, stamp):
+        with self._lock:
+            if stamp != self._stamp:
+                if self._items:
+                    self.invalidations += 1
+                self._items.clear()
+                self._stamp = stamp
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._stamp = None
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+QUOTE_MEMO = QuoteMemo(QUOTE_MEMO_SIZE)
 
 # [HAZIQ]
 class RenovationLogic:
+    # NOT MEMOIZED: THIS IS ONE DICT LOOKUP, CHEAPER THAN ANY MEMO KEY (SEE bench.py)
     @staticmethod
-    def check_safety(room_type, floor_mat):
-        try:
-            material_data = df[df['Material'] == floor_mat].iloc[0]
-        except IndexError:
+    def check_safety(room_type, floor_mat, mat_catalog=None):
+        material_data = (catalog if mat_catalog is None else mat_catalog).get(floor_mat)
+        if material_data is None:
             return False, "Error: Material not found."
 
-        if room_type in ["Bathroom", "Kitchen"] and not material_data['Is_Waterproof']:
+        if room_type in WET_ROOMS and not material_data.waterproof:
             return False, (
                 f"SAFETY WARNING: '{floor_mat}' is not suitable for wet areas like {room_type}s.\n"
                 "It is highly susceptible to rotting, warping, or mold."
@@ -54,39 +379,53 @@ class RenovationLogic:
         return True, ""
 
     @staticmethod
-    def calculate_project(width, length, height, floor_mat, wall_mat, tile_size_str):
+    def tile_options(floor_mat):
+        return list(PLANK_SIZES) if floor_mat in PLANK_MATERIALS else list(TILE_SIZES)
+
+    # MEMOIZED. 5, 5.0 AND np.float64(5) HASH THE SAME SO THEY SHARE AN ENTRY, AND
+    # THE MATHS ALWAYS RUNS ON FLOATS. THE CALLER GETS ITS OWN COPY OF THE DICT.
+    # THE STAMP AND THE PRICES COME FROM THE SAME SNAPSHOT (mat_catalog OR THE CURRENT ONE).
+    @staticmethod
+    def calculate_project(width, length, height, floor_mat, wall_mat, tile_size_str, mat_catalog=None):
+        mat_catalog = catalog if mat_catalog is None else mat_catalog
+        key = (width, length, height, floor_mat, wall_mat, tile_size_str)
+        return QUOTE_MEMO.get(key, pricing_stamp(mat_catalog), RenovationLogic._calculate_project,
+                              mat_catalog).copy()
+
+    @staticmethod
+    def memo_stats():
+        return {"quotes": QUOTE_MEMO.stats()}
+
+    @staticmethod
+    def clear_memo():
+        QUOTE_MEMO.clear()
+
+    @staticmethod
+    def _calculate_project(width, length, height, floor_mat, wall_mat, tile_size_str, mat_catalog=None):
+        mat_catalog = catalog if mat_catalog is None else mat_catalog
+        width, length, height = float(width), float(length), float(height)
+        floor_mat, wall_mat, tile_size_str = floor_mat.strip(), wall_mat.strip(), tile_size_str.strip()
+
         # ROOM CALCULATIONS
         area_sqm = width * length
         perimeter = 2 * (width + length)
         wall_area = perimeter * height
 
         # RETRIEVE PRICES
-        f_row = df[df['Material'] == floor_mat].iloc[0]
-        w_row = df[df['Material'] == wall_mat].iloc[0]
-
-        f_price = f_row['Price_Per_Sqm']
-        w_price = w_row['Price_Per_Sqm']
+        f_row = mat_catalog[floor_mat]
+        w_row = mat_catalog[wall_mat]
 
-        # [AIMAN] WASTAGE LOGIC FOR TILE SIZE
-        tile_wastage = {
-            "30x30 cm": 1.05,
-            "60x60 cm": 1.08,
-            "15x90 cm": 1.12
-        }
-        wastage_factor = tile_wastage.get(tile_size_str, 1.05)
+        f_price = f_row.price
+        w_price = w_row.price
 
-        # [HAZIQ] TILE CALCULATION
-        try:
-            dims = tile_size_str.lower().replace(' cm', '').split('x')
-            one_tile_area_sqm = (int(dims[0]) / 100) * (int(dims[1]) / 100)
-        except:
-            one_tile_area_sqm = 0.09
+        wastage_factor = tile_wastage(tile_size_str)
+        one_tile_area_sqm = tile_area_sqm(tile_size_str)
 
-        # [AIMAN] ADD WASTAGE FACTOR TO CALCULATION
+        # [AIMAN] ADD WASTAGE FACTOR TO CALCULATION (MONEY IN WHOLE CENTS, SEE pricing.py)
         tiles_needed = int((area_sqm / one_tile_area_sqm) * wastage_factor)
-        floor_cost = area_sqm * f_price * wastage_factor
-        wall_cost = wall_area * w_price
-        total_cost = floor_cost + wall_cost
+        floor_cents, wall_cents = room_cents(width, length, height, f_row.price_cents, w_row.price_cents,
+                                             to_basis_points(wastage_factor))
+        total_cents = floor_cents + wall_cents
 
         return {
             "tiles_needed": tiles_needed,
@@ -94,9 +433,94 @@ class RenovationLogic:
             "floor_area": area_sqm,
             "floor_price": f_price,
             "wall_price": w_price,
+            "total_cost": from_cents(total_cents),
+            "floor_cost": from_cents(floor_cents),
+            "wall_cost": from_cents(wall_cents),
+            "total_cost_cents": total_cents,
+            "floor_cost_cents": floor_cents,
+            "wall_cost_cents": wall_cents,
+            "floor_img": f_row.image_file,
+            "wall_img": w_row.image_file
+        }
+
+    # BATCH QUOTING: SAME MATHS AS calculate_project, ONE NUMPY PASS OVER ALL ROOMS
+    BATCH_COLUMNS = ("room_type", "width", "length", "height", "floor_mat", "wall_mat", "tile_size")
+
+    @staticmethod
+    def calculate_batch(rooms, mat_catalog=None):
+        import numpy as np
+        import pandas as pd
+        mat_catalog = catalog if mat_catalog is None else mat_catalog
+        missing = [col for col in RenovationLogic.BATCH_COLUMNS if col not in rooms]
+        if missing:
+            raise KeyError(f"Missing room columns: {', '.join(missing)}")
+
+        width = np.asarray(rooms["width"], dtype=np.float64)
+        length = np.asarray(rooms["length"], dtype=np.float64)
+        height = np.asarray(rooms["height"], dtype=np.float64)
+
+        # ROOM CALCULATIONS (inf x 0 DIMENSIONS GIVE A NaN AREA QUIETLY; SUCH ROWS ARE NOT PRICED)
+        with np.errstate(invalid="ignore"):
+            area_sqm = width * length
+            perimeter = 2 * (width + length)
+            wall_area = perimeter * height
+
+        # RETRIEVE PRICES BY CATALOG ROW
+        cols = mat_catalog.columns()
+        f_code = mat_catalog.codes(rooms["floor_mat"])
+        w_code = mat_catalog.codes(rooms["wall_mat"])
+        found = (f_code >= 0) & (w_code >= 0)
+        f_price = np.where(f_code >= 0, cols["price"][f_code], np.nan)
+        w_price = np.where(w_code >= 0, cols["price"][w_code], np.nan)
+
+        # SAFETY MASK (SAME RULE AS check_safety)
+        wet = np.isin(np.asarray(rooms["room_type"], dtype=object), WET_ROOMS)
+        waterproof = (f_code >= 0) & cols["waterproof"][f_code]
+        is_safe = found & ~(wet & ~waterproof)
+
+        # WASTAGE AND TILE AREA, PARSED ONCE PER DISTINCT TILE SIZE. A BLANK / NaN SIZE
+        # (CODE -1) PICKS THE TRAILING DEFAULT ENTRY, AS calculate_project DOES FOR ""
+        t_code, t_sizes = pd.factorize(np.asarray(rooms["tile_size"], dtype=object))
+        t_sizes = [t.strip() if isinstance(t, str) else "" for t in t_sizes]
+        size_wastage = [tile_wastage(t) for t in t_sizes] + [DEFAULT_WASTAGE]
+        wastage_factor = np.array(size_wastage, dtype=np.float64)[t_code]
+        one_tile_area_sqm = np.array([tile_area_sqm(t) for t in t_sizes] + [DEFAULT_TILE_AREA_SQM],
+                                     dtype=np.float64)[t_code]
+
+        tiles_needed = np.trunc((area_sqm / one_tile_area_sqm) * wastage_factor)
+        # MONEY IN WHOLE CENTS (SEE pricing.py); UNPRICED ROWS CARRY 0 CENTS AND NaN RM
+        priced = is_safe & np.isfinite(area_sqm) & np.isfinite(wall_area)
+        wastage_bp = np.array([to_basis_points(w) for w in size_wastage], dtype=np.int64)[t_code]
+        floor_cents, wall_cents = room_cents(np.where(priced, width, 0.0), np.where(priced, length, 0.0),
+                                             np.where(priced, height, 0.0), cols["price_cents"][f_code],
+                                             cols["price_cents"][w_code], wastage_bp)
+        floor_cents[~priced] = 0
+        wall_cents[~priced] = 0
+        total_cents = floor_cents + wall_cents
+        floor_cost = np.where(priced, from_cents(floor_cents), np.nan)
+        wall_cost = np.where(priced, from_cents(wall_cents), np.nan)
+        total_cost = np.where(priced, from_cents(total_cents), np.nan)
+
+        # REJECTED ROWS ARE NOT PRICED; ROWS WITH NaN / inf DIMENSIONS GET NO TILES EITHER
+        # (THEIR NaN COUNT WOULD CAST TO int64 MIN)
+        for arr in (f_price, w_price):
+            arr[~is_safe] = np.nan
+        tiles_needed[~priced] = 0
+
+        result = {
+            "is_safe": is_safe,
+            "tiles_needed": tiles_needed.astype(np.int64),
+            "wall_area": wall_area,
+            "floor_area": area_sqm,
+            "floor_price": f_price,
+            "wall_price": w_price,
             "total_cost": total_cost,
             "floor_cost": floor_cost,
             "wall_cost": wall_cost,
-            "floor_img": f_row['Image_File'],
-            "wall_img": w_row['Image_File']
-        }
\ No newline at end of file
+            "total_cost_cents": total_cents,
+            "floor_cost_cents": floor_cents,
+            "wall_cost_cents": wall_cents
+        }
+        if isinstance(rooms, pd.DataFrame):
+            return pd.DataFrame(result, index=rooms.index)
+        return result
@@ -0,0 +1,213 @@
+import os
+import struct
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from assets import ASSETS
+from render import (DEFAULT_CANVAS_SIZE, TILE_TEXTURE_SIZE, WALL_TEXTURE_SIZE, WALLS, CEILING_TEXEL,
+                    surface_maps, draw_overlay, pack_texture, sample_floor, sample_wall, wall_runs)
+from timing import TIMINGS
+
+# PRINT-RESOLUTION PREVIEW EXPORT. THE ROOM IS RENDERED IN HORIZONTAL STRIPS OF
+# STRIP_ROWS ROWS (COORDINATE MAPS, SAMPLING, CEILING AND OUTLINES PER STRIP) AND
+# EACH STRIP IS WRITTEN STRAIGHT TO THE FILE, SO PEAK MEMORY DEPENDS ON THE WIDTH
+# AND STRIP_ROWS, NOT ON THE OUTPUT HEIGHT. PNG AND TIFF ARE WRITTEN BY HAND
+# BECAUSE PIL CAN ONLY SAVE A WHOLE IMAGE.
+PRINT_DPI = 300
+A3_300DPI = (4961, 3508)
+STRIP_ROWS = 64
+# TEXTURES GROW WITH THE OUTPUT (SO TILES ARE NOT MAGNIFIED BLOCKS) UP TO THIS SIDE
+MAX_TEXTURE_SIDE = 1024
+EXPORT_FORMATS = (".png", ".tif", ".tiff")
+
+
+# "<invoice>.txt" -> "<invoice>_preview.png"
+def preview_path(invoice_path, suffix=".png"):
+    return os.path.splitext(invoice_path)[0] + "_preview" + suffix
+
+
+def texture_size(base, scale):
+    return tuple(min(MAX_TEXTURE_SIDE, max(side, int(side * scale))) for side in base)
+
+
+# ONE STRIP (CANVAS ROWS [row0, row1)) AS RAW RGB BYTES
+def render_strip(size, row0, row1, floor_tex, wall_tex, tile_size_str, width, length, height, line_width):
+    maps = surface_maps(size, row0, row1)
+    pixels = np.empty(size[0] * (row1 - row0), dtype=np.uint32)
+    pixels[:] = CEILING_TEXEL
+    idx, u, v = maps["floor"]
+    pixels[idx] = sample_floor(floor_tex, u, v, tile_size_str, width, length)
+    for name, run in zip(WALLS, wall_runs(width, length)):
+        idx, u, v = maps[name]
+        pixels[idx] = sample_wall(wall_tex, u, v, run, height)
+    strip = Image.frombuffer("RGBA", (size[0], row1 - row0), pixels, "raw", "RGBA", 0, 1)
+    overlay = draw_overlay(size, row0, row1, line_width)
+    strip.paste(overlay, (0, 0), overlay)
+    return strip.convert("RGB").tobytes()
+
+
+# PNG: ONE zlib STREAM FED STRIP BY STRIP, EMITTED AS IDAT CHUNKS AS IT COMPRESSES
+class PngStripWriter:
+    def __init__(self, f, size, dpi):
+        self.f = f
+        self.width = size[0]
+        self.z = zlib.compressobj(6)
+        f.write(b"\x89PNG\r\n\x1a\n")
+        self.chunk(b"IHDR", struct.pack(">IIBBBBB", size[0], size[1], 8, 2, 0, 0, 0))
+        ppm = round(dpi / 0.0254)
+        self.chunk(b"pHYs", struct.pack(">IIB", ppm, ppm, 1))
+
+    def chunk(self, kind, data):
+        self.f.write(struct.pack(">I", len(data)) + kind + data)
+        self.f.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(kind))))
+
+    # "SUB" FILTER ON EVERY ROW: EACH BYTE MINUS THE SAME CHANNEL OF THE PIXEL TO ITS LEFT
+    def write(self, rgb, rows):
+        raw = np.frombuffer(rgb, dtype=np.uint8).reshape(rows, self.width * 3)
+        out = np.empty((rows, self.width * 3 + 1), dtype=np.uint8)
+        out[:, 0] = 1
+        out[:, 1:4] = raw[:, :3]
+        np.subtract(raw[:, 3:], raw[:, :-3], out=out[:, 4:])
+        data = self.z.compress(out.tobytes())
+        if data:
+            self.chunk(b"IDAT", data)
+
+    def close(self):
+        self.chunk(b"IDAT", self.z.flush())
+        self.chunk(b"IEND", b"")
+
+
+# BASELINE UNCOMPRESSED RGB TIFF: STRIPS ARE WRITTEN AS THEY COME, THE DIRECTORY
+# (WITH EVERY STRIP OFFSET) GOES AT THE END AND THE HEADER IS PATCHED TO POINT AT IT
+class TiffStripWriter:
+    SHORT, LONG, RATIONAL = 3, 4, 5
+
+    def __init__(self, f, size, dpi):
+        self.f = f
+        self.size = size
+        self.dpi = dpi
+        self.offsets = []
+        self.counts = []
+        self.rows_per_strip = None
+        f.write(b"II*\x00\x00\x00\x00\x00")
+
+    def write(self, rgb, rows):
+        if self.rows_per_strip is None:
+            self.rows_per_strip = rows
+        self.offsets.append(self.f.tell())
+        self.counts.append(len(rgb))
+        self.f.write(rgb)
+
+    # (tag, type, values) -> 12-BYTE ENTRY; VALUES THAT DO NOT FIT IN 4 BYTES ARE WRITTEN FIRST
+    def entry(self, tag, kind, values):
+        fmt = {self.SHORT: "H", self.LONG: "I", self.RATIONAL: "II"}[kind]
+        data = struct.pack("<" + fmt * len(values), *[x for v in values for x in (v if kind == self.RATIONAL else (v,))])
+        if len(data) > 4:
+            self.pad()
+            offset = self.f.tell()
+            self.f.write(data)
+            data = struct.pack("<I", offset)
+        return struct.pack("<HHI", tag, kind, len(values)) + data.ljust(4, b"\x00")
+
+    def pad(self):
+        if self.f.tell() % 2:
+            self.f.write(b"\x00")
+
+    def close(self):
+        w, h = self.size
+        entries = [
+            self.entry(256, self.LONG, [w]),
+            self.entry(257, self.LONG, [h]),
+            self.entry(258, self.SHORT, [8, 8, 8]),
+            self.entry(259, self.SHORT, [1]),
+            self.entry(262, self.SHORT, [2]),
+            self.entry(273, self.LONG, self.offsets),
+            self.entry(277, self.SHORT, [3]),
+            self.entry(278, self.LONG, [self.rows_per_strip]),
+            self.entry(279, self.LONG, self.counts),
+            self.entry(282, self.RATIONAL, [(self.dpi, 1)]),
+            self.entry(283, self.RATIONAL, [(self.dpi, 1)]),
+            self.entry(296, self.SHORT, [2])
+        ]
+        self.pad()
+        ifd = self.f.tell()
+        self.f.write(struct.pack("<H", len(entries)) + b"".join(entries) + b"\x00\x00\x00\x00")
+        self.f.seek(4)
+        self.f.write(struct.pack("<I", ifd))
+
+
+WRITERS = {".png": PngStripWriter, ".tif": TiffStripWriter, ".tiff": TiffStripWriter}
+
+
+# SAME COMPOSITION AS RoomRenderer.render_tiled AT ANY size; OUTLINES KEEP THEIR
+# ON-SCREEN WEIGHT. WRITTEN NEXT TO THE TARGET AND RENAMED WHEN COMPLETE.
+def export_preview(path, wall_path, floor_path, tile_size_str, width, length, height, size=A3_300DPI,
+                   dpi=PRINT_DPI, strip_rows=STRIP_ROWS, textures=None):
+    writer_cls = WRITERS.get(os.path.splitext(path)[1].lower())
+    if writer_cls is None:
+        raise ValueError(f"{path}: preview exports must be one of {', '.join(EXPORT_FORMATS)}")
+    size = tuple(size)
+    if size[0] <= 0 or size[1] <= 0 or strip_rows <= 0:
+        raise ValueError("Export size and strip height must be positive.")
+    textures = ASSETS if textures is None else textures
+    scale = size[0] / DEFAULT_CANVAS_SIZE[0]
+    line_width = max(2, round(2 * scale))
+    with TIMINGS.stage("export.decode"):
+        floor_tex = pack_texture(textures.get(floor_path, texture_size(TILE_TEXTURE_SIZE, scale)))
+        wall_tex = pack_texture(textures.get(wall_path, texture_size(WALL_TEXTURE_SIZE, scale)))
+
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp, "wb") as f, TIMINGS.stage("export.strips"):
+            writer = writer_cls(f, size, dpi)
+            for row0 in range(0, size[1], strip_rows):
+                row1 = min(size[1], row0 + strip_rows)
+                writer.write(render_strip(size, row0, row1, floor_tex, wall_tex, tile_size_str, width, length,
+                                          height, line_width), row1 - row0)
+            writer.close()
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return path
+
+
+# ONE EXPORT AT A TIME OFF THE Tk THREAD (AN A3 PAGE TAKES A FEW SECONDS)
+_executor = None
+
+
+def export_in_background(*args, **kwargs):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+    return _executor.submit(export_preview, *args, **kwargs)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(prog="renovision-export", description="Print-resolution room preview.")
+    parser.add_argument("output", help=f"file to write ({', '.join(EXPORT_FORMATS)})")
+    parser.add_argument("--wall", default="images/paint.jpg")
+    parser.add_argument("--floor", default="images/ceramic.jpg")
+    parser.add_argument("--tile-size", default="60x60 cm")
+    parser.add_argument("--room", nargs=3, type=float, default=(4.0, 5.0, 2.7), metavar=("W", "L", "H"))
+    parser.add_argument("--size", nargs=2, type=int, default=A3_300DPI, metavar=("PX_W", "PX_H"))
+    parser.add_argument("--dpi", type=int, default=PRINT_DPI)
+    parser.add_argument("--strip-rows", type=int, default=STRIP_ROWS)
+    args = parser.parse_args(argv)
+    try:
+        export_preview(args.output, args.wall, args.floor, args.tile_size, *args.room, size=args.size,
+                       dpi=args.dpi, strip_rows=args.strip_rows)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,57 @@
+import math
+import queue
+import sys
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, Menu
-from database import df, RenovationLogic, DELIVERY_FLAT_RATE, INSTALLATION_FLAT_RATE
-from PIL import Image, ImageTk, ImageDraw
-from datetime import datetime
+from collections import OrderedDict
+from tkinter import ttk, messagebox, filedialog, Menu, font as tkfont
+import database
+from database import RenovationLogic, SERVICE_OPTIONS, MEMBER_DISCOUNT_BP
+from pricing import from_cents, discount_cents
+from recalc import LiveQuote
+from timing import TIMINGS
+
+# PIL (AND assets.py, WHICH USES IT) IS IMPORTED INSIDE THE METHODS THAT DECODE
+# IMAGES SO THE FIRST WINDOW DOES NOT WAIT FOR IT. THE SAME GOES FOR search.py (NUMPY).
+LOGO_FILE = "images/logo.png"
+LOGO_LARGE = (150, 150)
+LOGO_SMALL = (50, 50)
+DEBUG_REFRESH_MS = 500
+
+# LARGE CATALOGS: FILTERS RE-RUN THIS LONG AFTER THE LAST KEYSTROKE, COMBOBOXES
+# OFFER AT MOST COMBO_LIMIT MATCHES
+FILTER_DELAY_MS = 80
+COMBO_LIMIT = 200
+COMBO_SKIP_KEYS = {"Up", "Down", "Return", "Tab", "Escape", "Shift_L", "Shift_R", "Control_L", "Control_R"}
+
+# HOT-RELOADED CATALOG (RENOVISION_CATALOG, SEE catalog_watch.py): HOW OFTEN THE Tk
+# THREAD PICKS UP SNAPSHOTS THE WATCHER THREAD HAS SWAPPED IN. ALWAYS READ THE
+# CATALOG AS database.catalog, NEVER IMPORT IT BY VALUE.
+CATALOG_POLL_MS = 250
+
+# GALLERY: THUMBNAIL CELL PADDING, HOW MANY PhotoImages STAY ALIVE, HOW OFTEN
+# FINISHED DECODES ARE PICKED UP (THUMBNAIL SIZE IS assets.THUMB_SIZE)
+THUMB_PAD = 6
+THUMB_PHOTO_LIMIT = 300
+GALLERY_POLL_MS = 30
+
+# PRINT PREVIEW EXPORT (SEE export.py): HOW OFTEN THE Tk THREAD CHECKS FOR COMPLETION
+EXPORT_POLL_MS = 200
+
+# LIVE ESTIMATE: CalculatorPage RECALCULATES THIS LONG AFTER THE LAST INPUT CHANGE
+LIVE_DELAY_MS = 250
 
 
 # [HAZIQ] MAIN APPLICATION SETUP
 class RenovationApp(tk.Tk):
-    def __init__(self):
+    PAGES = ("HomePage", "DashboardPage", "MaterialPage", "CalculatorPage")
+
+    # eager=True BUILDS EVERY PAGE UP FRONT (OLD BEHAVIOUR); OTHERWISE PAGES ARE
+    # BUILT THE FIRST TIME show_frame ASKS FOR THEM.
+    def __init__(self, eager=False, started_at=None, report_timings=False):
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.startup_timings = {"import_s": time.perf_counter() - self.started_at}
+        self.report_timings = report_timings
         super().__init__()
         self.title("RENOVISION: Smart Interior Assistant")
         self.geometry("1100x800")
@@ -39,17 +83,108 @@ class RenovationApp(tk.Tk):
         self.container.pack(fill="both", expand=True)
 
         self.frames = {}
-        for F in (HomePage, DashboardPage, MaterialPage, CalculatorPage):
-            page_name = F.__name__
-            frame = F(parent=self.container, controller=self)
-            self.frames[page_name] = frame
-            frame.grid(row=0, column=0, sticky="nsew")
+        self._logos = {}
+
+        # HIDDEN DEBUG OVERLAY: CTRL+SHIFT+D SHOWS STAGE TIMINGS, CTRL+SHIFT+E EXPORTS THEM
+        self.debug_overlay = None
+        self._debug_after = None
+        self.bind("<Control-D>", self.toggle_debug_overlay)
+        self.bind("<Control-E>", self.export_timings)
 
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
 
-        self.show_frame("HomePage")
         self.apply_theme()
+        self.show_frame("HomePage")
+        if eager:
+            for page_name in self.PAGES:
+                self.get_frame(page_name)
+        self.after_idle(self.mark_first_paint)
+        self.after_idle(self.start_catalog_watch)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    # QUEUED QUOTE-STORE WRITES ARE FLUSHED BEFORE THE WINDOW GOES AWAY
+    def on_close(self):
+        if "quote_store" in sys.modules:
+            sys.modules["quote_store"].close_store()
+        self.destroy()
+
+    # THE WATCHER THREAD BUILDS THE SNAPSHOT AND ITS SEARCH INDEX; THE Tk THREAD ONLY
+    # PATCHES THE ROWS NAMED IN THE DIFF
+    def start_catalog_watch(self):
+        from catalog_watch import watch_env
+        self.catalog_watcher = watch_env()
+        if self.catalog_watcher is None:
+            return
+        self.catalog_changes = queue.SimpleQueue()
+        self.catalog_watcher.add_listener(self.queue_catalog_change)
+        self.after(CATALOG_POLL_MS, self.poll_catalog_changes)
+
+    def queue_catalog_change(self, old, new, diff):
+        from search import get_index
+        get_index(new)
+        self.catalog_changes.put((new, diff))
+
+    def poll_catalog_changes(self):
+        while True:
+            try:
+                new, diff = self.catalog_changes.get_nowait()
+            except queue.Empty:
+                break
+            for frame in self.frames.values():
+                if hasattr(frame, "on_catalog_change"):
+                    frame.on_catalog_change(new, diff)
+        self.after(CATALOG_POLL_MS, self.poll_catalog_changes)
+
+    # STARTUP TIMINGS FOR IMPORT AND FIRST PAINT
+    def mark_first_paint(self):
+        self.startup_timings["first_paint_s"] = time.perf_counter() - self.started_at
+        if self.report_timings:
+            print("Startup: " + ", ".join(f"{k}={v * 1000:.1f}ms" for k, v in self.startup_timings.items()),
+                  file=sys.stderr)
+
+    def toggle_debug_overlay(self, event=None):
+        if self.debug_overlay is not None:
+            self.after_cancel(self._debug_after)
+            self.debug_overlay.destroy()
+            self.debug_overlay = None
+            return
+        TIMINGS.enabled = True
+        self.debug_overlay = tk.Label(self, font=("Courier", 9), justify="left", anchor="nw",
+                                      bg="#111111", fg="#33ff66", padx=6, pady=4)
+        self.debug_overlay.place(relx=1.0, rely=1.0, anchor="se")
+        self.refresh_debug_overlay()
+
+    def refresh_debug_overlay(self):
+        self.debug_overlay.config(text=TIMINGS.overlay_text())
+        self.debug_overlay.lift()
+        self._debug_after = self.after(DEBUG_REFRESH_MS, self.refresh_debug_overlay)
+
+    def export_timings(self, event=None):
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            initialfile="Renovision_Timings.json",
+            filetypes=[("JSON", "*.json"), ("Prometheus Text", "*.prom")]
+        )
+        if path:
+            TIMINGS.dump(path)
+
+    # SHARED LOGO: ONE PhotoImage PER SIZE, PRE-SCALED BY THE ASSET MANAGER
+    def get_logo(self, size):
+        if size not in self._logos:
+            from PIL import ImageTk
+            from assets import ASSETS
+            self._logos[size] = ImageTk.PhotoImage(ASSETS.get(LOGO_FILE, size))
+        return self._logos[size]
+
+    def get_frame(self, page_name):
+        frame = self.frames.get(page_name)
+        if frame is None:
+            frame = globals()[page_name](parent=self.container, controller=self)
+            self.frames[page_name] = frame
+            frame.grid(row=0, column=0, sticky="nsew")
+            frame.update_colors(self.colors[self.current_mode])
+        return frame
 
     # [HAZIQ] UTILITY FOR CENTERING POPUPS
     def center_popup(self, popup, width, height):
@@ -80,7 +215,7 @@ class RenovationApp(tk.Tk):
         help_menu.add_command(label="About", command=lambda: messagebox.showinfo("About", "RENOVISION v1.0"))
 
     def show_frame(self, page_name):
-        frame = self.frames[page_name]
+        frame = self.get_frame(page_name)
         frame.tkraise()
 
     def toggle_theme(self):
@@ -111,14 +246,11 @@ class HomePage(tk.Frame):
         self.center_box = tk.Frame(self)
         self.center_box.place(relx=0.5, rely=0.5, anchor="center")
 
-        self.logo_img = None
-        try:
-            load = Image.open("images/logo.png")
-            load = load.resize((150, 150), Image.Resampling.LANCZOS)
-            self.logo_img = ImageTk.PhotoImage(load)
-            tk.Label(self.center_box, image=self.logo_img).pack(pady=10)
-        except Exception:
-            tk.Label(self.center_box, text="[LOGO]", font=("Arial", 20, "bold")).pack(pady=10)
+        # LOGO IS FILLED IN AFTER THE FIRST PAINT
+        self.logo_img = tk.PhotoImage(width=150, height=150)
+        self.logo_lbl = tk.Label(self.center_box, image=self.logo_img)
+        self.logo_lbl.pack(pady=10)
+        self.after_idle(self.load_logo)
 
         self.title_lbl = tk.Label(self.center_box, text="RENOVISION", font=("Arial", 36, "bold"))
         self.title_lbl.pack(pady=5)
@@ -130,6 +262,14 @@ class HomePage(tk.Frame):
                   font=("Arial", 14, "bold"), bg="#4CAF50", fg="white",
                   padx=30, pady=10).pack()
 
+    def load_logo(self):
+        try:
+            self.logo_img = self.controller.get_logo(LOGO_LARGE)
+            self.logo_lbl.config(image=self.logo_img)
+        except Exception:
+            self.logo_img = None
+            self.logo_lbl.config(image="", text="[LOGO]", font=("Arial", 20, "bold"))
+
     def update_colors(self, c):
         self.config(bg=c["bg"])
         self.center_box.config(bg=c["bg"])
@@ -147,9 +287,7 @@ class DashboardPage(tk.Frame):
 
         self.logo_img = None
         try:
-            load = Image.open("images/logo.png")
-            load = load.resize((50, 50), Image.Resampling.LANCZOS)
-            self.logo_img = ImageTk.PhotoImage(load)
+            self.logo_img = controller.get_logo(LOGO_SMALL)
             tk.Label(self.top_bar, image=self.logo_img).pack(side="left")
         except:
             pass
@@ -173,7 +311,7 @@ class DashboardPage(tk.Frame):
         make_btn("HOME PAGE", lambda: controller.show_frame("HomePage"), "#FFA94D")
         make_btn("MATERIAL MENU", lambda: controller.show_frame("MaterialPage"), "#FFA94D")
         make_btn("CONSULTATION", lambda: controller.show_frame("CalculatorPage"), "#FFA94D")
-        make_btn("EXIT", controller.quit, "#FFA94D")
+        make_btn("EXIT", controller.on_close, "#FFA94D")
 
     def update_colors(self, c):
         self.config(bg=c["bg"])
@@ -183,6 +321,260 @@ class DashboardPage(tk.Frame):
             lbl.config(bg=c["bg"], fg=c["fg"])
 
 
+# VIRTUALIZED LIST: CANVAS ROWS ARE CREATED ONLY FOR THE VISIBLE WINDOW AND REUSED
+# WHILE SCROLLING, SO 50k ITEMS COST THE SAME AS 20. SPEAKS THE PART OF THE
+# Listbox API THE PAGES USE (curselection, get, selection_clear, <<ListboxSelect>>).
+class VirtualList(tk.Frame):
+    def __init__(self, parent, font=("Arial", 12), padding=4):
+        super().__init__(parent)
+        self.font = font
+        self.row_height = tkfont.Font(font=font).metrics("linespace") + padding
+        self.items = []
+        self.offset = 0
+        self.selected = None
+        self.colors = {"bg": "white", "fg": "black", "select_bg": "#3874d8", "select_fg": "white"}
+        self._slots = []
+
+        self.canvas = tk.Canvas(self, highlightthickness=0, bg=self.colors["bg"])
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.scrollbar = tk.Scrollbar(self, command=self.yview)
+        self.scrollbar.pack(side="left", fill="y")
+
+        self.canvas.bind("<Configure>", lambda e: self.redraw())
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.scroll_pixels((-3 if e.delta > 0 else 3) * self.row_height))
+        self.canvas.bind("<Button-4>", lambda e: self.scroll_pixels(-3 * self.row_height))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll_pixels(3 * self.row_height))
+        self.canvas.bind("<Up>", lambda e: self.move_selection(-1))
+        self.canvas.bind("<Down>", lambda e: self.move_selection(1))
+
+    def set_items(self, items):
+        self.items = items
+        self.offset = 0
+        self.selected = None
+        self.redraw()
+
+    # SAME LIST WITH A FEW ROWS ADDED OR REMOVED: KEEPS THE SCROLL POSITION AND THE SELECTED NAME
+    def update_items(self, items):
+        selected = None if self.selected is None else self.items[self.selected]
+        self.items = items
+        self.selected = None
+        if selected is not None:
+            try:
+                self.selected = items.index(selected)
+            except ValueError:
+                pass
+        self.offset = int(min(max(0, self.offset), self.max_offset()))
+        self.redraw()
+
+    def set_colors(self, bg, fg):
+        self.colors.update(bg=bg, fg=fg)
+        self.canvas.config(bg=bg)
+        self.redraw()
+
+    def total_height(self):
+        return len(self.items) * self.row_height
+
+    def max_offset(self):
+        return max(0, self.total_height() - self.canvas.winfo_height())
+
+    # SCROLLBAR PROTOCOL (SAME AS Listbox.yview)
+    def yview(self, *args):
+        total = self.total_height()
+        if not args:
+            if total == 0:
+                return 0.0, 1.0
+            return self.offset / total, min(1.0, (self.offset + self.canvas.winfo_height()) / total)
+        if args[0] == "moveto":
+            self.offset = float(args[1]) * total
+        elif args[0] == "scroll":
+            step = self.canvas.winfo_height() if args[2] == "pages" else self.row_height
+            self.offset += int(args[1]) * step
+        self.offset = int(min(max(0, self.offset), self.max_offset()))
+        self.redraw()
+
+    def scroll_pixels(self, delta):
+        self.offset = int(min(max(0, self.offset + delta), self.max_offset()))
+        self.redraw()
+
+    def redraw(self):
+        height = max(self.canvas.winfo_height(), self.row_height)
+        width = self.canvas.winfo_width()
+        needed = height // self.row_height + 2
+        while len(self._slots) < needed:
+            rect = self.canvas.create_rectangle(0, 0, 0, 0, width=0, state="hidden")
+            text = self.canvas.create_text(0, 0, anchor="w", font=self.font, state="hidden")
+            self._slots.append((rect, text))
+
+        first = self.offset // self.row_height
+        for k, (rect, text) in enumerate(self._slots):
+            row = first + k
+            if k >= needed or row >= len(self.items):
+                self.canvas.itemconfig(rect, state="hidden")
+                self.canvas.itemconfig(text, state="hidden")
+                continue
+            y = row * self.row_height - self.offset
+            chosen = row == self.selected
+            self.canvas.coords(rect, 0, y, width, y + self.row_height)
+            self.canvas.itemconfig(rect, state="normal" if chosen else "hidden", fill=self.colors["select_bg"])
+            self.canvas.coords(text, 6, y + self.row_height // 2)
+            self.canvas.itemconfig(text, state="normal", text=self.items[row],
+                                   fill=self.colors["select_fg"] if chosen else self.colors["fg"])
+        self.scrollbar.set(*self.yview())
+
+    def on_click(self, event):
+        self.canvas.focus_set()
+        row = (self.offset + event.y) // self.row_height
+        if 0 <= row < len(self.items):
+            self.select(row)
+
+    def move_selection(self, step):
+        if self.items:
+            self.select(min(max(0, (self.selected if self.selected is not None else -1) + step), len(self.items) - 1))
+
+    def select(self, row):
+        self.selected = row
+        self.see(row)
+        self.event_generate("<<ListboxSelect>>")
+
+    def see(self, row):
+        top = row * self.row_height
+        if top < self.offset:
+            self.offset = top
+        elif top + self.row_height > self.offset + self.canvas.winfo_height():
+            self.offset = top + self.row_height - self.canvas.winfo_height()
+        self.offset = int(min(max(0, self.offset), self.max_offset()))
+        self.redraw()
+
+    def curselection(self):
+        return () if self.selected is None else (self.selected,)
+
+    def get(self, index):
+        if isinstance(index, tuple):
+            index = index[0]
+        return self.items[index]
+
+    def selection_clear(self, first=None, last=None):
+        if self.selected is not None:
+            self.selected = None
+            self.redraw()
+
+
+# THUMBNAIL GALLERY: THE SAME VIRTUALIZED SCROLLING, ONE ROW IS A ROW OF CELLS. THE
+# loader THREAD DECODES THE VISIBLE CELLS FIRST, THEN ONE SCREEN AHEAD; AT MOST
+# THUMB_PHOTO_LIMIT PhotoImages ARE KEPT, SO MEMORY STAYS FLAT OVER THOUSANDS OF SKUS.
+class ThumbnailGrid(VirtualList):
+    def __init__(self, parent, loader, image_of, thumb_size, font=("Arial", 9)):
+        super().__init__(parent, font=font)
+        self.loader = loader
+        self.image_of = image_of
+        self.thumb_size = thumb_size
+        self.cell_width = thumb_size[0] + 2 * THUMB_PAD
+        self.row_height = thumb_size[1] + tkfont.Font(font=font).metrics("linespace") + 3 * THUMB_PAD
+        self.photos = OrderedDict()
+        self._poll_after = None
+        self.canvas.bind("<Up>", lambda e: self.move_selection(-self.columns()))
+        self.canvas.bind("<Down>", lambda e: self.move_selection(self.columns()))
+        self.canvas.bind("<Left>", lambda e: self.move_selection(-1))
+        self.canvas.bind("<Right>", lambda e: self.move_selection(1))
+
+    def columns(self):
+        return max(1, self.canvas.winfo_width() // self.cell_width)
+
+    def total_height(self):
+        return -(-len(self.items) // self.columns()) * self.row_height
+
+    def key(self, name):
+        path = self.image_of(name)
+        return None if path is None else (path, self.thumb_size)
+
+    # A KEY WHOSE FILE FAILED TO LOAD IS KEPT AS None SO IT IS NOT RETRIED EVERY REDRAW
+    def photo(self, key):
+        if key not in self.photos:
+            return None, False
+        self.photos.move_to_end(key)
+        return self.photos[key], True
+
+    def redraw(self):
+        cols = self.columns()
+        height = max(self.canvas.winfo_height(), self.row_height)
+        needed = (height // self.row_height + 2) * cols
+        tw, th = self.thumb_size
+        while len(self._slots) < needed:
+            self._slots.append((
+                self.canvas.create_rectangle(0, 0, 0, 0, width=0, state="hidden"),
+                self.canvas.create_rectangle(0, 0, 0, 0, outline="", fill="#c8c8c8", state="hidden"),
+                self.canvas.create_image(0, 0, anchor="nw", state="hidden"),
+                self.canvas.create_text(0, 0, anchor="n", font=self.font, width=self.cell_width - 4, state="hidden")
+            ))
+
+        first = (self.offset // self.row_height) * cols
+        wanted = []
+        for k, (sel, frame, image, text) in enumerate(self._slots):
+            i = first + k
+            if k >= needed or i >= len(self.items):
+                for item in (sel, frame, image, text):
+                    self.canvas.itemconfig(item, state="hidden")
+                continue
+            row, col = divmod(i, cols)
+            x, y = col * self.cell_width, row * self.row_height - self.offset
+            chosen = i == self.selected
+            self.canvas.coords(sel, x, y, x + self.cell_width, y + self.row_height)
+            self.canvas.itemconfig(sel, state="normal" if chosen else "hidden", fill=self.colors["select_bg"])
+            self.canvas.coords(frame, x + THUMB_PAD, y + THUMB_PAD, x + THUMB_PAD + tw, y + THUMB_PAD + th)
+            key = self.key(self.items[i])
+            photo, known = self.photo(key)
+            if not known and key is not None:
+                wanted.append(key)
+            self.canvas.itemconfig(frame, state="hidden" if photo else "normal")
+            self.canvas.coords(image, x + THUMB_PAD, y + THUMB_PAD)
+            self.canvas.itemconfig(image, image=photo or "", state="normal" if photo else "hidden")
+            self.canvas.coords(text, x + self.cell_width // 2, y + 2 * THUMB_PAD + th)
+            self.canvas.itemconfig(text, state="normal", text=self.items[i],
+                                   fill=self.colors["select_fg"] if chosen else self.colors["fg"])
+        self.scrollbar.set(*self.yview())
+
+        # PREFETCH ONE SCREEN BELOW, AFTER EVERYTHING VISIBLE
+        for name in self.items[first + needed:first + 2 * needed]:
+            key = self.key(name)
+            if key is not None and key not in self.photos:
+                wanted.append(key)
+        self.loader.want(wanted)
+        if wanted and self._poll_after is None:
+            self._poll_after = self.after(GALLERY_POLL_MS, self.poll)
+
+    def poll(self):
+        from PIL import ImageTk
+        self._poll_after = None
+        # CHECKED BEFORE DRAINING: IF THE LOADER WAS IDLE, EVERYTHING IT MADE IS ALREADY QUEUED
+        busy = self.loader.busy()
+        arrived = False
+        while True:
+            try:
+                key, img = self.loader.done.get_nowait()
+            except queue.Empty:
+                break
+            self.photos[key] = None if img is None else ImageTk.PhotoImage(img)
+            self.photos.move_to_end(key)
+            while len(self.photos) > THUMB_PHOTO_LIMIT:
+                self.photos.popitem(last=False)
+            arrived = True
+        if arrived:
+            self.redraw()
+        elif busy:
+            self._poll_after = self.after(GALLERY_POLL_MS, self.poll)
+
+    def on_click(self, event):
+        self.canvas.focus_set()
+        col = event.x // self.cell_width
+        i = (self.offset + event.y) // self.row_height * self.columns() + col
+        if col < self.columns() and 0 <= i < len(self.items):
+            self.select(i)
+
+    def see(self, index):
+        super().see(index // self.columns())
+
+
 # [KER QIN] MATERIAL CATALOG PAGE (WITH LABELFRAME)
 class MaterialPage(tk.Frame):
     def __init__(self, parent, controller):
@@ -193,9 +585,7 @@ class MaterialPage(tk.Frame):
 
         self.logo_img = None
         try:
-            load = Image.open("images/logo.png")
-            load = load.resize((50, 50), Image.Resampling.LANCZOS)
-            self.logo_img = ImageTk.PhotoImage(load)
+            self.logo_img = controller.get_logo(LOGO_SMALL)
             tk.Label(self.header_frame, image=self.logo_img).pack(side="left", padx=(0, 10))
         except:
             pass
@@ -205,6 +595,43 @@ class MaterialPage(tk.Frame):
         tk.Button(self.header_frame, text="Back to Menu",
                   command=lambda: controller.show_frame("DashboardPage")).pack(side="right")
 
+        # SEARCH AND FILTERS (TYPE IS THE FLOOR / WALL SPLIT BELOW)
+        self.filter_frame = tk.Frame(self)
+        self.filter_frame.pack(fill="x", padx=50)
+        self.filter_labels = []
+        self.search_var = tk.StringVar()
+        self.min_price_var = tk.StringVar()
+        self.max_price_var = tk.StringVar()
+        self.waterproof_var = tk.StringVar(value="Any")
+        for text, var, width in (("Search:", self.search_var, 24), ("Min RM:", self.min_price_var, 7),
+                                 ("Max RM:", self.max_price_var, 7)):
+            lbl = tk.Label(self.filter_frame, text=text, font=("Arial", 10, "bold"))
+            lbl.pack(side="left", padx=(10, 2))
+            self.filter_labels.append(lbl)
+            tk.Entry(self.filter_frame, textvariable=var, width=width).pack(side="left")
+            var.trace_add("write", self.schedule_filter)
+        lbl = tk.Label(self.filter_frame, text="Waterproof:", font=("Arial", 10, "bold"))
+        lbl.pack(side="left", padx=(10, 2))
+        self.filter_labels.append(lbl)
+        ttk.Combobox(self.filter_frame, textvariable=self.waterproof_var, state="readonly", width=8,
+                     values=["Any", "Yes", "No"]).pack(side="left")
+        self.waterproof_var.trace_add("write", self.schedule_filter)
+        # GALLERY MODE: THUMBNAIL GRID OF ONE TYPE INSTEAD OF THE TWO NAME LISTS
+        self.view_var = tk.StringVar(value="List")
+        self.gallery_type_var = tk.StringVar(value="Floor")
+        for text, var, values in (("View:", self.view_var, ["List", "Gallery"]),
+                                  ("Type:", self.gallery_type_var, ["Floor", "Wall"])):
+            lbl = tk.Label(self.filter_frame, text=text, font=("Arial", 10, "bold"))
+            lbl.pack(side="left", padx=(10, 2))
+            self.filter_labels.append(lbl)
+            ttk.Combobox(self.filter_frame, textvariable=var, state="readonly", width=8,
+                         values=values).pack(side="left")
+        self.view_var.trace_add("write", self.switch_view)
+        self.gallery_type_var.trace_add("write", self.schedule_filter)
+        self.count_lbl = tk.Label(self.filter_frame, font=("Arial", 10, "italic"))
+        self.count_lbl.pack(side="right", padx=10)
+        self._filter_after = None
+
         self.content_frame = tk.Frame(self)
         self.content_frame.pack(fill="both", expand=True, padx=40, pady=10)
 
@@ -214,26 +641,21 @@ class MaterialPage(tk.Frame):
         self.floor_frame = tk.LabelFrame(self.content_frame, text="Flooring Options", font=("Arial", 14, "bold"))
         self.floor_frame.pack(side="left", fill="both", expand=True, padx=10)
 
-        self.floor_list = tk.Listbox(self.floor_frame, font=("Arial", 12), height=15, exportselection=False)
+        self.floor_list = VirtualList(self.floor_frame, font=("Arial", 12))
         self.floor_list.pack(side="left", fill="both", expand=True, padx=5, pady=5)
 
-        floor_scroll = tk.Scrollbar(self.floor_frame, command=self.floor_list.yview)
-        floor_scroll.pack(side="left", fill="y")
-        self.floor_list.config(yscrollcommand=floor_scroll.set)
-
         # WALLS
         self.wall_frame = tk.LabelFrame(self.content_frame, text="Wall Finishes", font=("Arial", 14, "bold"))
         self.wall_frame.pack(side="right", fill="both", expand=True, padx=10)
 
-        self.wall_list = tk.Listbox(self.wall_frame, font=("Arial", 12), height=15, exportselection=False)
+        self.wall_list = VirtualList(self.wall_frame, font=("Arial", 12))
         self.wall_list.pack(side="left", fill="both", expand=True, padx=5, pady=5)
 
-        wall_scroll = tk.Scrollbar(self.wall_frame, command=self.wall_list.yview)
-        wall_scroll.pack(side="left", fill="y")
-        self.wall_list.config(yscrollcommand=wall_scroll.set)
-
-        self.floor_list.bind("<<ListboxSelect>>", lambda e: self.wall_list.selection_clear(0, "end"))
-        self.wall_list.bind("<<ListboxSelect>>", lambda e: self.floor_list.selection_clear(0, "end"))
+        self.floor_list.bind("<<ListboxSelect>>", lambda e: self.on_select(self.floor_list, self.wall_list))
+        self.wall_list.bind("<<ListboxSelect>>", lambda e: self.on_select(self.wall_list, self.floor_list))
+        self.gallery_frame = None
+        self.gallery = None
+        self.loader = None
 
         self.btn_frame = tk.Frame(self)
         self.btn_frame.pack(fill="x", pady=20)
@@ -243,24 +665,123 @@ class MaterialPage(tk.Frame):
         self.load_list()
 
     def load_list(self):
-        self.floor_list.delete(0, "end")
-        self.wall_list.delete(0, "end")
-        for index, row in df.iterrows():
-            if row['Type'] == 'Floor':
-                self.floor_list.insert("end", row['Material'])
-            elif row['Type'] == 'Wall':
-                self.wall_list.insert("end", row['Material'])
+        from search import get_index
+        with TIMINGS.stage("materials.filter"):
+            index = get_index(database.catalog)
+            filters = self.current_filters()
+            floors = index.search_names(self.search_var.get(), "Floor", **filters)
+            walls = index.search_names(self.search_var.get(), "Wall", **filters)
+            self.floor_list.set_items(floors)
+            self.wall_list.set_items(walls)
+            if self.gallery is not None:
+                self.gallery.set_items(floors if self.gallery_type_var.get() == "Floor" else walls)
+        self.update_count()
+
+    def update_count(self):
+        if self.view_var.get() == "Gallery":
+            shown = len(self.gallery.items)
+        else:
+            shown = len(self.floor_list.items) + len(self.wall_list.items)
+        self.count_lbl.config(text=f"{shown} of {len(database.catalog)} materials")
+
+    # ONE BACKGROUND DECODER FOR THE GALLERY AND THE POPUP PREFETCH (PIL IS IMPORTED HERE)
+    def get_loader(self):
+        if self.loader is None:
+            from assets import BackgroundLoader
+            self.loader = BackgroundLoader()
+        return self.loader
+
+    def switch_view(self, *args):
+        if self.view_var.get() == "Gallery":
+            if self.gallery is None:
+                from assets import THUMB_SIZE
+                self.gallery_frame = tk.LabelFrame(self.content_frame, text="Gallery", font=("Arial", 14, "bold"))
+                self.gallery = ThumbnailGrid(self.gallery_frame, self.get_loader(), self.image_of, THUMB_SIZE)
+                self.gallery.pack(fill="both", expand=True, padx=5, pady=5)
+                self.gallery.bind("<<ListboxSelect>>", lambda e: self.on_select(self.gallery))
+                self.update_colors(self.controller.colors[self.controller.current_mode])
+            self.floor_frame.pack_forget()
+            self.wall_frame.pack_forget()
+            self.gallery_frame.pack(fill="both", expand=True, padx=10)
+        else:
+            if self.gallery_frame is not None:
+                self.gallery_frame.pack_forget()
+            self.floor_frame.pack(side="left", fill="both", expand=True, padx=10)
+            self.wall_frame.pack(side="right", fill="both", expand=True, padx=10)
+        self.load_list()
+
+    def image_of(self, name):
+        record = database.catalog.get(name)
+        return None if record is None else record.image_file
+
+    def selected_name(self):
+        lists = (self.gallery,) if self.view_var.get() == "Gallery" else (self.floor_list, self.wall_list)
+        for mat_list in lists:
+            if mat_list.curselection():
+                return mat_list.get(mat_list.curselection())
+        return None
+
+    # A SELECTION STARTS DECODING THE POPUP IMAGE, SO "VIEW SPEC & IMAGE" FINDS IT CACHED
+    def on_select(self, mat_list, other=None):
+        if other is not None:
+            other.selection_clear(0, "end")
+        if not mat_list.curselection():
+            return
+        path = self.image_of(mat_list.get(mat_list.curselection()))
+        if path is not None:
+            from assets import POPUP_SIZE
+            self.get_loader().prefetch((path, POPUP_SIZE))
+
+    # CATALOG RELOAD: ONLY THE NAMES IN THE DIFF ARE RE-CHECKED AGAINST THE FILTERS. A ROW
+    # THAT STILL MATCHES KEEPS ITS PLACE, NEW MATCHES GO TO THE END OF THE LIST.
+    def on_catalog_change(self, new, diff):
+        from search import record_matches
+        query, filters = self.search_var.get(), self.current_filters()
+        touched = diff["added"] + diff["changed"]
+        lists = [(self.floor_list, "Floor"), (self.wall_list, "Wall")]
+        if self.gallery is not None:
+            lists.append((self.gallery, self.gallery_type_var.get()))
+        for mat_list, mat_type in lists:
+            keep = {name for name in touched if record_matches(new[name], query, mat_type, **filters)}
+            drop = (set(touched) - keep) | set(diff["removed"])
+            current = set(mat_list.items)
+            if not (keep - current or drop & current):
+                continue
+            items = [name for name in mat_list.items if name not in drop]
+            items += [name for name in touched if name in keep and name not in current]
+            mat_list.update_items(items)
+        self.update_count()
+
+    def current_filters(self):
+        def price(var):
+            try:
+                return float(var.get())
+            except ValueError:
+                return None
+        waterproof = {"Yes": True, "No": False}.get(self.waterproof_var.get())
+        return {"min_price": price(self.min_price_var), "max_price": price(self.max_price_var),
+                "waterproof": waterproof}
+
+    # TYPE-AHEAD: RE-FILTER SHORTLY AFTER THE LAST CHANGE
+    def schedule_filter(self, *args):
+        if self._filter_after is not None:
+            self.after_cancel(self._filter_after)
+        self._filter_after = self.after(FILTER_DELAY_MS, self.run_filter)
+
+    def run_filter(self):
+        self._filter_after = None
+        self.load_list()
 
     def open_popup(self):
-        selection = None
-        if self.floor_list.curselection():
-            selection = self.floor_list.get(self.floor_list.curselection())
-        elif self.wall_list.curselection():
-            selection = self.wall_list.get(self.wall_list.curselection())
+        started = time.perf_counter()
+        selection = self.selected_name()
         if not selection:
             messagebox.showwarning("Selection", "Please select a material first.")
             return
-        row = df[df['Material'] == selection].iloc[0]
+        row = database.catalog.get(selection)
+        if row is None:
+            messagebox.showwarning("Selection", f"'{selection}' is no longer in the catalog.")
+            return
 
         popup = tk.Toplevel(self)
         popup.title(f"{selection} - Details")
@@ -273,11 +794,12 @@ class MaterialPage(tk.Frame):
         img_frame.pack_propagate(False)
 
         # [KER QIN] VARIABLES
-        image_name = row['Image_File']
+        image_name = row.image_file
         try:
-            load = Image.open(image_name)
-            load = load.resize((400, 200), Image.Resampling.LANCZOS)
-            render = ImageTk.PhotoImage(load)
+            with TIMINGS.stage("popup.image"):
+                from PIL import ImageTk
+                from assets import ASSETS, POPUP_SIZE
+                render = ImageTk.PhotoImage(ASSETS.get(image_name, POPUP_SIZE))
             img_label = tk.Label(img_frame, image=render, bg="grey")
             img_label.image = render
             img_label.pack(fill="both", expand=True)
@@ -286,13 +808,14 @@ class MaterialPage(tk.Frame):
             lbl.pack(fill="both", expand=True)
 
         info_text = (
-            f"Type: {row['Type']}\n\n"
-            f"Price: RM {row['Price_Per_Sqm']:.2f} / sqm\n\n"
-            f"Waterproof: {'YES' if row['Is_Waterproof'] else 'NO'}"
+            f"Type: {row.type}\n\n"
+            f"Price: RM {row.price:.2f} / sqm\n\n"
+            f"Waterproof: {'YES' if row.waterproof else 'NO'}"
         )
         tk.Label(popup, text=selection, font=("Arial", 18, "bold"), bg=c["bg"], fg=c["fg"]).pack()
         tk.Label(popup, text=info_text, font=("Arial", 12), bg=c["bg"], fg=c["fg"], justify="left").pack(pady=10)
         tk.Button(popup, text="Close", command=popup.destroy).pack(pady=10)
+        TIMINGS.record("popup.total", time.perf_counter() - started)
 
     def update_colors(self, c):
         self.config(bg=c["bg"])
@@ -304,8 +827,15 @@ class MaterialPage(tk.Frame):
         self.wall_frame.config(bg=c["bg"], fg=c["fg"])
         self.btn_frame.config(bg=c["bg"])
         # Removed individual label updates since they are now part of LabelFrame
-        self.floor_list.config(bg=c["input_bg"], fg=c["fg"])
-        self.wall_list.config(bg=c["input_bg"], fg=c["fg"])
+        self.floor_list.set_colors(c["input_bg"], c["fg"])
+        self.wall_list.set_colors(c["input_bg"], c["fg"])
+        self.filter_frame.config(bg=c["bg"])
+        self.count_lbl.config(bg=c["bg"], fg=c["fg"])
+        for lbl in self.filter_labels:
+            lbl.config(bg=c["bg"], fg=c["fg"])
+        if self.gallery is not None:
+            self.gallery_frame.config(bg=c["bg"], fg=c["fg"])
+            self.gallery.set_colors(c["input_bg"], c["fg"])
 
 
 # [AIMAN] CALCULATOR PAGE
@@ -315,14 +845,15 @@ class CalculatorPage(tk.Frame):
         self.controller = controller
         self.final_room_image = None
         self.last_results = None
+        self.last_preview = None
+        self.render_worker = None
+        self.preview_requested_at = None
         self.top_bar = tk.Frame(self)
         self.top_bar.pack(fill="x", side="top", padx=10, pady=10)
 
         self.logo_img = None
         try:
-            load = Image.open("images/logo.png")
-            load = load.resize((50, 50), Image.Resampling.LANCZOS)
-            self.logo_img = ImageTk.PhotoImage(load)
+            self.logo_img = controller.get_logo(LOGO_SMALL)
             tk.Label(self.top_bar, image=self.logo_img).pack(side="left", padx=(0, 10))
         except:
             pass
@@ -339,6 +870,13 @@ class CalculatorPage(tk.Frame):
         self.setup_inputs(self.left_pane)
         self.setup_outputs(self.right_pane)
 
+        # LIVE ESTIMATE: EVERY INPUT IS WATCHED, A BURST OF CHANGES IS ONE run_live
+        self.live = LiveQuote()
+        self._live_after = None
+        for var in (self.room_var, self.floor_var, self.wall_var, self.tile_var, self.width_var, self.length_var,
+                    self.height_var, self.budget_var, self.is_member):
+            var.trace_add("write", self.schedule_live)
+
     def setup_inputs(self, parent):
         input_container = tk.Frame(parent)
         input_container.pack(fill="both", expand=True)
@@ -363,13 +901,16 @@ class CalculatorPage(tk.Frame):
         create_lbl(col1, "Flooring:")
         self.floor_var = tk.StringVar()
         self.floor_combo = ttk.Combobox(col1, textvariable=self.floor_var,
-                                        values=list(df[df['Type'] == 'Floor']['Material']))
+                                        values=database.catalog.names('Floor')[:COMBO_LIMIT])
         self.floor_combo.pack(fill="x", ipady=3)
         self.floor_combo.bind("<<ComboboxSelected>>", self.update_tile_choices)
+        self.floor_combo.bind("<KeyRelease>", lambda e: self.type_ahead(e, self.floor_combo, "Floor"))
         create_lbl(col1, "Wall Finish:")
         self.wall_var = tk.StringVar()
-        ttk.Combobox(col1, textvariable=self.wall_var,
-                     values=list(df[df['Type'] == 'Wall']['Material'])).pack(fill="x", ipady=3)
+        self.wall_combo = ttk.Combobox(col1, textvariable=self.wall_var,
+                                       values=database.catalog.names('Wall')[:COMBO_LIMIT])
+        self.wall_combo.pack(fill="x", ipady=3)
+        self.wall_combo.bind("<KeyRelease>", lambda e: self.type_ahead(e, self.wall_combo, "Wall"))
         create_lbl(col1, "Tile Size (cm):")
         self.tile_var = tk.StringVar()
         self.tile_combo = ttk.Combobox(col1, textvariable=self.tile_var, values=["30x30 cm", "60x60 cm"])
@@ -379,23 +920,27 @@ class CalculatorPage(tk.Frame):
         tk.Label(col2, text="--- FLOOR SIZE ---", font=("Arial", 9, "bold", "italic"), fg="grey").pack(fill="x",
                                                                                                        pady=(10, 2))
         create_lbl(col2, "Floor Width (m):")
-        self.width_entry = tk.Entry(col2)
+        self.width_var = tk.StringVar()
+        self.width_entry = tk.Entry(col2, textvariable=self.width_var)
         self.width_entry.pack(fill="x", ipady=3)
         create_lbl(col2, "Floor Length (m):")
-        self.length_entry = tk.Entry(col2)
+        self.length_var = tk.StringVar()
+        self.length_entry = tk.Entry(col2, textvariable=self.length_var)
         self.length_entry.pack(fill="x", ipady=3)
 
         tk.Label(col2, text="--- WALL SIZE ---", font=("Arial", 9, "bold", "italic"), fg="grey").pack(fill="x",
                                                                                                       pady=(10, 2))
         create_lbl(col2, "Wall Height (m):")
-        self.height_entry = tk.Entry(col2)
+        self.height_var = tk.StringVar()
+        self.height_entry = tk.Entry(col2, textvariable=self.height_var)
         self.height_entry.pack(fill="x", ipady=3)
         self.height_entry.insert(0, "3.0")
 
         tk.Label(col2, text="--- FINANCIAL ---", font=("Arial", 9, "bold", "italic"), fg="grey").pack(fill="x",
                                                                                                       pady=(10, 2))
         create_lbl(col2, "Budget (RM):")
-        self.budget_entry = tk.Entry(col2)
+        self.budget_var = tk.StringVar()
+        self.budget_entry = tk.Entry(col2, textvariable=self.budget_var)
         self.budget_entry.pack(fill="x", ipady=3)
 
         # [AIMAN] INPUT CONTROL: CHECKBOX TOGGLE
@@ -407,19 +952,96 @@ class CalculatorPage(tk.Frame):
         self.btn_frame.pack(fill="x", pady=20, side="bottom")
         tk.Button(self.btn_frame, text="CALCULATE PLAN", bg="blue", fg="white",
                   font=("Arial", 11, "bold"), command=self.run_calc).pack(fill="x", pady=5, ipady=3)
+        tk.Button(self.btn_frame, text="SUGGEST WITHIN BUDGET", bg="#FFA94D", fg="black",
+                  font=("Arial", 11, "bold"), command=self.suggest_combinations).pack(fill="x", pady=5, ipady=3)
         self.btn_print = tk.Button(self.btn_frame, text="PRINT INVOICE", bg="grey", fg="white",
                                    font=("Arial", 11, "bold"), state="disabled",
                                    command=self.save_receipt)
         self.btn_print.pack(fill="x", pady=5, ipady=3)
 
+    # LARGE CATALOGS: THE DROPDOWN ONLY EVER HOLDS THE FIRST COMBO_LIMIT MATCHES OF WHAT IS TYPED
+    def type_ahead(self, event, combo, mat_type):
+        if event.keysym in COMBO_SKIP_KEYS:
+            return
+        from search import get_index
+        combo["values"] = get_index(database.catalog).search_names(combo.get(), mat_type, limit=COMBO_LIMIT)
+
+    # CATALOG RELOAD: PRICE CHANGES LEAVE THE DROPDOWNS ALONE, ONLY ADDED / REMOVED /
+    # RE-TYPED NAMES ARE PATCHED IN
+    def on_catalog_change(self, new, diff):
+        from search import record_matches
+        touched = diff["added"] + diff["changed"]
+        for combo, mat_type in ((self.floor_combo, "Floor"), (self.wall_combo, "Wall")):
+            values = list(combo["values"])
+            current = set(values)
+            keep = {name for name in touched if record_matches(new[name], combo.get(), mat_type)}
+            drop = {name for name in touched if name not in keep} | set(diff["removed"])
+            add = [name for name in touched if name in keep and name not in current]
+            if not (add or drop & current):
+                continue
+            values = [name for name in values if name not in drop] + add
+            combo["values"] = values[:COMBO_LIMIT]
+        self.schedule_live()
+
+    def schedule_live(self, *args):
+        if self._live_after is not None:
+            self.after_cancel(self._live_after)
+        self._live_after = self.after(LIVE_DELAY_MS, self.run_live)
+
+    def live_inputs(self):
+        def number(var, minimum):
+            try:
+                value = float(var.get())
+            except ValueError:
+                return None
+            return value if minimum < value < math.inf else None
+        return {
+            "room_type": self.room_var.get(),
+            "floor_mat": self.floor_var.get().strip() or None,
+            "wall_mat": self.wall_var.get().strip() or None,
+            "tile_size": self.tile_var.get().strip(),
+            "width": number(self.width_var, 0),
+            "length": number(self.length_var, 0),
+            "height": number(self.height_var, 0),
+            "budget": number(self.budget_var, -1e-9),
+            "member": self.is_member.get(),
+            "catalog": database.catalog
+        }
+
+    # ONLY THE OUTPUTS WHOSE INPUTS MOVED ARE REDONE (SEE recalc.DEPENDS_ON): A BUDGET EDIT
+    # IS JUST THE FEEDBACK LABEL, A WALL CHANGE RE-SAMPLES ONLY THE WALL LAYER, AND A NEW
+    # SIZE RE-SAMPLES BOTH LAYERS FROM TEXTURES THAT ARE ALREADY DECODED
+    def run_live(self):
+        self._live_after = None
+        live = self.live
+        with TIMINGS.stage("live.update"):
+            changed = set(live.update(**self.live_inputs()))
+        if not changed:
+            return
+        safety = live["safety"]
+        if safety is not None and not safety[0]:
+            if "safety" in changed:
+                self.lbl_cost.config(text="Total Estimate: -")
+                self.lbl_budget_feedback.config(text=safety[1], fg="red")
+            return
+        if changed & {"safety", "total"}:
+            total = live["total"]
+            self.lbl_cost.config(text="Total Estimate: -" if total is None else
+                                 f"Total Estimate: RM {from_cents(total['total_cents']):.2f}")
+        if changed & {"safety", "budget_feedback"}:
+            feedback = live["budget_feedback"]
+            if feedback is None:
+                self.lbl_budget_feedback.config(text="")
+            else:
+                self.update_budget_feedback(from_cents(feedback[0]), feedback[1])
+        if changed & {"safety", "floor_layer", "wall_layer"} and live["floor_layer"] and live["wall_layer"]:
+            self.request_preview(live["wall_texture"], live["floor_texture"], live["tile_size"], live["width"],
+                                 live["length"], live["height"])
+
     def update_tile_choices(self, event):
-        selection = self.floor_var.get()
-        if selection in ["Vinyl", "Solid Wood"]:
-            self.tile_combo['values'] = ["15x90 cm"]
-            self.tile_var.set("15x90 cm")
-        else:
-            self.tile_combo['values'] = ["30x30 cm", "60x60 cm"]
-            self.tile_var.set("30x30 cm")
+        options = RenovationLogic.tile_options(self.floor_var.get())
+        self.tile_combo['values'] = options
+        self.tile_var.set(options[0])
 
     def setup_outputs(self, parent):
         self.preview_lbl = tk.Label(parent, text="3D Room Preview", font=("Arial", 14))
@@ -459,78 +1081,115 @@ class CalculatorPage(tk.Frame):
         self.lbl_cost.config(bg=c["bg"])
         self.lbl_budget_feedback.config(bg=c["bg"])
 
+    # EACH STAGE IS TIMED (SEE timing.py, CTRL+SHIFT+D FOR THE OVERLAY)
     def run_calc(self):
+        started = time.perf_counter()
         r_type = self.room_var.get()
         f_mat = self.floor_var.get()
+        # ONE SNAPSHOT FOR THE WHOLE QUOTE, EVEN IF A RELOAD LANDS MEANWHILE
+        mat_catalog = database.catalog
 
         # [HAZIQ] SAFETY CHECK
-        is_safe, msg = RenovationLogic.check_safety(r_type, f_mat)
+        with TIMINGS.stage("calc.safety"):
+            is_safe, msg = RenovationLogic.check_safety(r_type, f_mat, mat_catalog)
         if not is_safe:
             messagebox.showwarning("Safety Lock", msg)
             return
         try:
-            w = float(self.width_entry.get())
-            l = float(self.length_entry.get())
-            h = float(self.height_entry.get())
-            b = float(self.budget_entry.get())
+            with TIMINGS.stage("calc.parse"):
+                w = float(self.width_entry.get())
+                l = float(self.length_entry.get())
+                h = float(self.height_entry.get())
+                b = float(self.budget_entry.get())
 
             # [HAZIQ] INPUT VALIDATION
-            if w <= 0 or l <= 0 or h <= 0 or b < 0:
-                messagebox.showerror("Input Error", "Dimensions must be greater than 0.\nBudget cannot be negative.")
+            if not all(map(math.isfinite, (w, l, h, b))) or w <= 0 or l <= 0 or h <= 0 or b < 0:
+                messagebox.showerror("Input Error", "Dimensions must be greater than 0.\nBudget cannot be negative.\nValues must be finite numbers.")
                 return
         except Exception:
             messagebox.showerror("Error", "Please check your numbers.")
             return
 
-        self.last_results = RenovationLogic.calculate_project(w, l, h, f_mat, self.wall_var.get(), self.tile_var.get())
+        with TIMINGS.stage("calc.quote"):
+            self.last_results = RenovationLogic.calculate_project(w, l, h, f_mat, self.wall_var.get(),
+                                                                  self.tile_var.get(), mat_catalog)
 
-        # [AIMAN] DISCOUNT CALCULATION LOGIC
-        if self.is_member.get():
-            discount_amount = self.last_results['total_cost'] * 0.05
-            self.last_results['total_cost'] -= discount_amount
+        # [AIMAN] DISCOUNT CALCULATION LOGIC (IN CENTS, SEE pricing.py)
+        with TIMINGS.stage("calc.discount"):
+            subtotal_cents = self.last_results['total_cost_cents']
+            discount = discount_cents(subtotal_cents, self.is_member.get(), MEMBER_DISCOUNT_BP)
+            self.last_results['total_cost_cents'] = subtotal_cents - discount
+            self.last_results['total_cost'] = from_cents(subtotal_cents - discount)
             # Store discount for invoice receipt
-            self.last_results['discount'] = discount_amount
-        else:
-            self.last_results['discount'] = 0.0
+            self.last_results['discount_cents'] = discount
+            self.last_results['discount'] = from_cents(discount)
+
+        # QUOTE HISTORY: ORDER NUMBER IS ASSIGNED NOW AND REUSED BY THE INVOICE
+        with TIMINGS.stage("calc.save_quote"):
+            self.save_quote(r_type, w, l, h, b)
+
+        with TIMINGS.stage("calc.budget_feedback"):
+            self.lbl_cost.config(text=f"Total Estimate: RM {self.last_results['total_cost']:.2f}")
+            self.btn_print.config(state="normal", bg="#4CAF50")
+            self.update_budget_feedback(self.last_results['total_cost'], b)
+        # THE SAME ROOM IS EXPORTED AT PRINT RESOLUTION NEXT TO THE INVOICE
+        self.last_preview = (self.last_results['wall_img'], self.last_results['floor_img'], self.tile_var.get(),
+                             w, l, h)
+        self.request_preview(*self.last_preview)
+        TIMINGS.record("calc.total", time.perf_counter() - started)
+
+    # [KER QIN] IMAGE COMPOSITING RUNS ON A BACKGROUND WORKER; A NEWER CALCULATION
+    # SUPERSEDES ANY RENDER STILL IN FLIGHT
+    def request_preview(self, wall_img, floor_img, tile_size, width, length, height):
+        from render import RenderWorker, get_renderer
+        if self.render_worker is None:
+            self.render_worker = RenderWorker(self)
+        CANVAS_W, CANVAS_H = 400, 250
+        renderer = get_renderer((CANVAS_W, CANVAS_H))
+        self.preview_requested_at = time.perf_counter()
+        self.render_worker.submit(lambda cancelled: renderer.render_tiled(wall_img, floor_img, tile_size,
+                                                                          width, length, height, cancelled),
+                                  self.show_preview, self.show_preview_error)
+
+    def show_preview(self, final_img):
+        from PIL import ImageTk
+        with TIMINGS.stage("preview.photoimage"):
+            self.final_room_image = ImageTk.PhotoImage(final_img)
+            self.blueprint.itemconfig(self.image_container, image=self.final_room_image)
+        self.blueprint.delete("render_error")
+        TIMINGS.record("preview.click_to_screen", time.perf_counter() - self.preview_requested_at)
 
-        self.lbl_cost.config(text=f"Total Estimate: RM {self.last_results['total_cost']:.2f}")
-        self.btn_print.config(state="normal", bg="#4CAF50")
+    def show_preview_error(self, e):
+        print(f"3D Render Error: {e}")
+        self.blueprint.create_rectangle(0, 0, 400, 250, fill="grey", tags="render_error")
+        self.blueprint.create_text(200, 125, text="Image Load Error", tags="render_error")
 
+    # BEST USE OF THE BUDGET ACROSS ALL SAFE FLOOR x WALL x TILE COMBINATIONS
+    def suggest_combinations(self):
         try:
-            CANVAS_W, CANVAS_H = 400, 250
-            # [KER QIN] IMAGE COMPOSITING WITH NEW KEYS
-            wall_img = Image.open(self.last_results['wall_img']).resize((CANVAS_W, CANVAS_H), Image.Resampling.LANCZOS)
-            final_img = wall_img.copy()
-            floor_tex = Image.open(self.last_results['floor_img']).resize((CANVAS_W, CANVAS_H),
-                                                                          Image.Resampling.LANCZOS)
-            floor_mask = Image.new("L", (CANVAS_W, CANVAS_H), 0)
-            draw_floor = ImageDraw.Draw(floor_mask)
-            floor_poly = [(0, 250), (400, 250), (300, 150), (100, 150)]
-            draw_floor.polygon(floor_poly, fill=255)
-            final_img.paste(floor_tex, (0, 0), floor_mask)
-            ceiling_mask = Image.new("L", (CANVAS_W, CANVAS_H), 0)
-            draw_ceil = ImageDraw.Draw(ceiling_mask)
-            ceil_poly = [(0, 0), (400, 0), (300, 50), (100, 50)]
-            draw_ceil.polygon(ceil_poly, fill=255)
-            grey_block = Image.new("RGB", (CANVAS_W, CANVAS_H), (220, 220, 220))
-            final_img.paste(grey_block, (0, 0), ceiling_mask)
-            draw_lines = ImageDraw.Draw(final_img)
-            draw_lines.rectangle([100, 50, 300, 150], outline="grey", width=2)
-            draw_lines.line([(0, 0), (100, 50)], fill="grey", width=2)
-            draw_lines.line([(400, 0), (300, 50)], fill="grey", width=2)
-            draw_lines.line([(0, 250), (100, 150)], fill="grey", width=2)
-            draw_lines.line([(400, 250), (300, 150)], fill="grey", width=2)
-            self.final_room_image = ImageTk.PhotoImage(final_img)
-            self.blueprint.itemconfig(self.image_container, image=self.final_room_image)
-        except Exception as e:
-            print(f"3D Render Error: {e}")
-            self.blueprint.create_rectangle(0, 0, 400, 250, fill="grey")
-            self.blueprint.create_text(200, 125, text="Image Load Error")
-        self.update_budget_feedback(self.last_results['total_cost'], b)
+            w = float(self.width_entry.get())
+            l = float(self.length_entry.get())
+            h = float(self.height_entry.get())
+            b = float(self.budget_entry.get())
+            if not all(map(math.isfinite, (w, l, h, b))) or w <= 0 or l <= 0 or h <= 0 or b < 0:
+                raise ValueError
+        except Exception:
+            messagebox.showerror("Error", "Please enter room dimensions and a budget first.")
+            return
+        from optimizer import find_combinations
+        options = find_combinations(self.room_var.get(), w, l, h, b, top_n=5, sort_by="leftover",
+                                    member=self.is_member.get())
+        if not options:
+            messagebox.showinfo("Suggestions", "No safe combination fits this budget.")
+            return
+        lines = [f"{i}. {o['floor_mat']} ({o['tile_size']}) + {o['wall_mat']}\n"
+                 f"    RM {o['total_cost']:.2f}  (balance RM {o['leftover']:.2f})"
+                 for i, o in enumerate(options, 1)]
+        messagebox.showinfo("Suggestions Within Budget", "\n".join(lines))
 
     def update_budget_feedback(self, cost, budget):
         balance = budget - cost
-        pct_left = balance / budget
+        pct_left = balance / budget if budget else 0.0
         if balance < 0:
             msg = f"⚠ Budget Exceeded by RM {abs(balance):.2f}\nConsider cheaper options."
             color = "red"
@@ -542,6 +1201,27 @@ class CalculatorPage(tk.Frame):
             color = "green"
         self.lbl_budget_feedback.config(text=msg, fg=color)
 
+    def save_quote(self, room_type, width, length, height, budget):
+        from invoice import ENGINE
+        from quote_store import get_store
+        self.last_results['order_id'] = ENGINE.order_numbers.next()
+        record = dict(self.last_results)
+        record.update({
+            "room_type": room_type,
+            "floor_mat": self.floor_var.get(),
+            "wall_mat": self.wall_var.get(),
+            "tile_size": self.tile_var.get(),
+            "width": width,
+            "length": length,
+            "height": height,
+            "budget": budget,
+            "member": self.is_member.get()
+        })
+        try:
+            get_store().submit(record)
+        except Exception as e:
+            print(f"Quote Store Error: {e}")
+
     # [HAZIQ] PRINT INVOICE
     def save_receipt(self):
         if not self.last_results:
@@ -556,71 +1236,66 @@ class CalculatorPage(tk.Frame):
             win.destroy()
             self.generate_ascii_invoice(service_fee, service_name)
 
+        self_fee, self_name = SERVICE_OPTIONS["self"]
+        delivery_fee, delivery_name = SERVICE_OPTIONS["delivery"]
+        install_fee, install_name = SERVICE_OPTIONS["installation"]
         tk.Button(win, text="Self Collect (No Extra Charge)", width=30, height=2,
-                  command=lambda: finalize(0, "Self Collection")).pack(pady=5)
-        tk.Button(win, text=f"Delivery Only (+RM {DELIVERY_FLAT_RATE})", width=30, height=2,
-                  command=lambda: finalize(DELIVERY_FLAT_RATE, "Delivery Only")).pack(pady=5)
-        tk.Button(win, text=f"Delivery + Installation (+RM {INSTALLATION_FLAT_RATE})", width=30, height=2,
-                  command=lambda: finalize(INSTALLATION_FLAT_RATE, "Delivery & Installation")).pack(pady=5)
+                  command=lambda: finalize(self_fee, self_name)).pack(pady=5)
+        tk.Button(win, text=f"Delivery Only (+RM {delivery_fee})", width=30, height=2,
+                  command=lambda: finalize(delivery_fee, delivery_name)).pack(pady=5)
+        tk.Button(win, text=f"Delivery + Installation (+RM {install_fee})", width=30, height=2,
+                  command=lambda: finalize(install_fee, install_name)).pack(pady=5)
 
     def generate_ascii_invoice(self, service_fee, service_name):
-        res = self.last_results
-        grand_total = res['total_cost'] + service_fee
-        date_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        ascii_header = r"""
-  _____  ______ _   _  _____      _______ _____ _____ ____  _   _ 
- |  __ \|  ____| \ | |/ _ \ \    / /_   _/ ____|_   _/ __ \| \ | |
- | |__) | |__  |  \| | | | \ \  / /  | || (___   | || |  | |  \| |
- |  _  /|  __| | . ` | | | |\ \/ /   | | \___ \  | || |  | | . ` |
- | | \ \| |____| |\  | |_| | \  /   _| |_|___) |_| || |__| | |\  |
- |_|  \_\______|_| \_|\___/   \/   |_____|_____/_____\____/|_| \_|
-        """
-        line = "=" * 60
-        thin_line = "-" * 60
-
-        discount_text = ""
-        if res.get('discount', 0) > 0:
-            discount_text = f"Member Discount (5%):                           -RM {res['discount']:>7.2f}\n{thin_line}"
-
-        text_content = f"""
-{ascii_header}
-
-{line}
-OFFICIAL INVOICE
-{line}
-Date: {date_str}
-Client Order: #RV-{int(datetime.now().timestamp())}
-{line}
-
-PROJECT SPECIFICATIONS:
-  Room Type:      {self.room_var.get()}
-  Dimensions:     {self.width_entry.get()}m x {self.length_entry.get()}m
-  Ceiling Height: {self.height_entry.get()}m
-  Tile Size:      {self.tile_var.get()}
-
-{thin_line}
-ITEMIZED BREAKDOWN
-{thin_line}
-{'ITEM':<25} | {'QTY':<10} | {'UNIT PRICE':<10} | {'TOTAL':>10}
-{thin_line}
-FLOORING: {self.floor_var.get():<15} | {res['floor_area']:<6.1f} sqm | RM {res['floor_price']:<7.2f} | RM {res['floor_cost']:>7.2f}
-WALL: {self.wall_var.get():<19} | {res['wall_area']:<6.1f} sqm | RM {res['wall_price']:<7.2f} | RM {res['wall_cost']:>7.2f}
-{thin_line}
-Subtotal (Materials):                               RM {res['total_cost'] + res.get('discount', 0):>7.2f}
-{discount_text}
-Service ({service_name}):                           RM {service_fee:>7.2f}
-{line}
-GRAND TOTAL:                                        RM {grand_total:>7.2f}
-{line}
-
-Thank you for choosing RENOVISION!
-"""
+        from invoice import ENGINE
+        # [HAZIQ] INVOICE RECORD FROM THE CURRENT INPUTS; LAYOUT LIVES IN invoice.py
+        record = dict(self.last_results)
+        record.update({
+            "room_type": self.room_var.get(),
+            "width": self.width_entry.get(),
+            "length": self.length_entry.get(),
+            "height": self.height_entry.get(),
+            "tile_size": self.tile_var.get(),
+            "floor_mat": self.floor_var.get(),
+            "wall_mat": self.wall_var.get(),
+            "service_fee": service_fee,
+            "service_name": service_name
+        })
+        with TIMINGS.stage("invoice.render"):
+            order_id, text_content = ENGINE.render(record)
+        try:
+            with TIMINGS.stage("invoice.store"):
+                from quote_store import get_store
+                get_store().submit({"order_id": order_id, "service_name": service_name, "service_fee": service_fee})
+        except Exception as e:
+            print(f"Quote Store Error: {e}")
         path = filedialog.asksaveasfilename(
             defaultextension=".txt",
             initialfile="Renovision_Invoice.txt",
             filetypes=[("Text Files", "*.txt")]
         )
         if path:
-            with open(path, "w") as f:
-                f.write(text_content)
-            messagebox.showinfo("Success", "Invoice saved successfully!")
\ No newline at end of file
+            with TIMINGS.stage("invoice.write"):
+                with open(path, "w") as f:
+                    f.write(text_content)
+            messagebox.showinfo("Success", "Invoice saved successfully!")
+            if self.last_preview is not None:
+                self.export_preview(path)
+
+    # A3 / 300 DPI ROOM PREVIEW NEXT TO THE INVOICE, RENDERED IN STRIPS OFF THE Tk THREAD
+    def export_preview(self, invoice_path):
+        from export import export_in_background, preview_path
+        out = preview_path(invoice_path)
+        future = export_in_background(out, *self.last_preview)
+        self.after(EXPORT_POLL_MS, self.poll_export, future)
+
+    def poll_export(self, future):
+        if not future.done():
+            self.after(EXPORT_POLL_MS, self.poll_export, future)
+            return
+        try:
+            out = future.result()
+        except Exception as e:
+            messagebox.showerror("Preview Export", f"Could not save the print preview:\n{e}")
+            return
+        messagebox.showinfo("Preview Export", f"Print preview saved:\n{out}")
\ No newline at end of file
@@ -0,0 +1,265 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import database
+from cli import read_chunks, detect_format, parse_member
+from database import MaterialCatalog, RenovationLogic, MEMBER_DISCOUNT_BP
+from pricing import to_cents, from_cents, discount_cents
+
+# PRICE-CHANGE IMPACT: RE-PRICE STORED OR EXPORTED QUOTES UNDER THE CURRENT CATALOG
+# AND UNDER A PROPOSED PRICE TABLE, THEN REPORT THE DIFFERENCE. QUOTES ARE READ IN
+# CHUNKS AND PRICED ON A PROCESS POOL; EACH WORKER BUILDS BOTH CATALOGS ONCE IN ITS
+# INITIALIZER, SO A TASK CARRIES ONLY ITS ROWS AND RETURNS ONLY CENT AGGREGATES.
+DEFAULT_CHUNK_SIZE = 50_000
+STORE_COLUMNS = ("room_type", "width", "length", "height", "floor_mat", "wall_mat", "tile_size",
+                 "budget", "member", "service_fee")
+
+_catalogs = None
+
+
+# source: A .rvcat PATH (EACH WORKER MAPS THE SAME FILE) OR material_data() COLUMNS
+def init_worker(source, prices):
+    global _catalogs
+    if isinstance(source, str):
+        from catalog_mmap import open_catalog
+        base = open_catalog(source)
+    else:
+        base = MaterialCatalog.from_columns(source)
+    _catalogs = (base, base.with_prices(prices))
+
+
+# {name: price} FROM A .json OBJECT, OR A .csv WITH Material AND Price_Per_Sqm COLUMNS
+def load_prices(path):
+    if path.endswith(".json"):
+        with open(path) as f:
+            data = json.load(f)
+    else:
+        frame = pd.read_csv(path, skipinitialspace=True)
+        data = dict(zip(frame["Material"].astype(str).str.strip(), frame["Price_Per_Sqm"]))
+    prices = {str(name): float(price) for name, price in data.items()}
+    bad = [name for name, price in prices.items() if not np.isfinite(price) or price < 0]
+    if bad:
+        raise ValueError(f"Invalid proposed price(s) for: {', '.join(bad)}")
+    return prices
+
+
+# QUOTE STORE id RANGES OF chunk_size; EACH WORKER READS ITS OWN RANGE, SO ROWS
+# NEVER PASS THROUGH THIS PROCESS
+def store_ranges(path, chunk_size):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        low, high = conn.execute("SELECT MIN(id), MAX(id) FROM quotes").fetchone()
+    finally:
+        conn.close()
+    if low is None:
+        return []
+    return [(path, start, start + chunk_size) for start in range(low, high + 1, chunk_size)]
+
+
+def read_store_range(path, start, stop):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        sql = f"SELECT {', '.join(STORE_COLUMNS)} FROM quotes WHERE id >= ? AND id < ?"
+        return pd.DataFrame(conn.execute(sql, (start, stop)).fetchall(), columns=list(STORE_COLUMNS))
+    finally:
+        conn.close()
+
+
+# cli.py INPUT SPECS OR cli.py OUTPUT ROWS -> THE STORE COLUMNS
+def normalize(chunk):
+    n = len(chunk)
+    missing = [col for col in RenovationLogic.BATCH_COLUMNS if col not in chunk]
+    if missing:
+        raise ValueError(f"Missing input column(s): {', '.join(missing)}")
+    out = {col: chunk[col] for col in RenovationLogic.BATCH_COLUMNS}
+    out["budget"] = chunk["budget"] if "budget" in chunk else np.nan
+    if "member" in chunk:
+        member = chunk["member"]
+        numeric = pd.to_numeric(member, errors="coerce")
+        # 0 / 1 (THE QUOTE STORE) TAKES THE FAST PATH, "yes" / "member" STRINGS DO NOT
+        if numeric.notna().sum() == member.notna().sum():
+            out["member"] = numeric.fillna(0).to_numpy() != 0
+        else:
+            out["member"] = parse_member(member.to_numpy(), (n, False))
+    elif "discount" in chunk:
+        out["member"] = pd.to_numeric(chunk["discount"], errors="coerce").fillna(0).to_numpy() > 0
+    else:
+        out["member"] = False
+    if "service_fee" in chunk:
+        out["service_fee"] = chunk["service_fee"]
+    elif "service" in chunk:
+        fees = {key: fee for key, (fee, _) in database.SERVICE_OPTIONS.items()}
+        out["service_fee"] = [fees.get(str(v).strip().lower(), 0.0) for v in chunk["service"]]
+    else:
+        out["service_fee"] = 0.0
+    return pd.DataFrame(out, index=chunk.index)
+
+
+def priced(rooms, mat_catalog, member, fee_cents):
+    res = RenovationLogic.calculate_batch(rooms, mat_catalog)
+    subtotal = np.asarray(res["total_cost_cents"])
+    total = subtotal - discount_cents(subtotal, member, MEMBER_DISCOUNT_BP)
+    return res, total + fee_cents
+
+
+def add_groups(groups, keys, columns):
+    labels, uniques = pd.factorize(np.asarray(keys, dtype=object))
+    sums = {}
+    for name, values in columns.items():
+        # int64 ACCUMULATION (bincount WOULD GO THROUGH float64)
+        sums[name] = np.zeros(len(uniques), dtype=np.int64)
+        np.add.at(sums[name], labels, values)
+    for i, key in enumerate(uniques):
+        entry = groups.setdefault(str(key), {name: 0 for name in columns})
+        for name in columns:
+            entry[name] += int(sums[name][i])
+
+
+# RUNS IN A WORKER: ONE CHUNK (OR STORE id RANGE) -> CENT TOTALS (NOTHING PER ROW COMES BACK)
+def impact_chunk(chunk):
+    if isinstance(chunk, tuple):
+        chunk = read_store_range(*chunk)
+    base, proposed = _catalogs
+    rooms = normalize(chunk)
+    width, length, height = (pd.to_numeric(rooms[col], errors="coerce").to_numpy(dtype=np.float64)
+                             for col in ("width", "length", "height"))
+    rooms["width"], rooms["length"], rooms["height"] = width, length, height
+    member = np.asarray(rooms["member"].fillna(False), dtype=bool)
+    fee = to_cents(pd.to_numeric(rooms["service_fee"], errors="coerce").fillna(0).to_numpy(dtype=np.float64))
+    budget = pd.to_numeric(rooms["budget"], errors="coerce").to_numpy(dtype=np.float64)
+
+    before, grand_before = priced(rooms, base, member, fee)
+    after, grand_after = priced(rooms, proposed, member, fee)
+    valid_dims = np.all(np.isfinite([width, length, height]) & (np.array([width, length, height]) > 0), axis=0)
+    ok = before["is_safe"].to_numpy() & after["is_safe"].to_numpy() & valid_dims
+    has_budget = ok & np.isfinite(budget)
+    budget_cents = to_cents(np.where(has_budget, budget, 0.0))
+    over_after = has_budget & (grand_after > budget_cents)
+    over_before = has_budget & (grand_before > budget_cents)
+
+    out = {"quotes": int(len(rooms)), "priced": int(ok.sum()), "rejected": int((~ok).sum()),
+           "before_cents": int(grand_before[ok].sum()), "after_cents": int(grand_after[ok].sum()),
+           "with_budget": int(has_budget.sum()), "over_budget": int(over_after.sum()),
+           "newly_over_budget": int((over_after & ~over_before).sum()), "materials": {}, "room_types": {}}
+    # MATERIAL LINES BEFORE DISCOUNT: FLOOR COST TO THE FLOOR MATERIAL, WALL COST TO THE WALL MATERIAL
+    for mat_col, cost_col in (("floor_mat", "floor_cost_cents"), ("wall_mat", "wall_cost_cents")):
+        b = before[cost_col].to_numpy()[ok]
+        a = after[cost_col].to_numpy()[ok]
+        add_groups(out["materials"], rooms[mat_col].to_numpy()[ok],
+                   {"lines": np.ones(len(b), dtype=np.int64), "before_cents": b, "after_cents": a})
+    add_groups(out["room_types"], rooms["room_type"].to_numpy()[ok],
+               {"quotes": np.ones(int(ok.sum()), dtype=np.int64), "before_cents": grand_before[ok],
+                "after_cents": grand_after[ok], "over_budget": over_after[ok].astype(np.int64)})
+    return out
+
+
+def merge(total, part):
+    for key, value in part.items():
+        if isinstance(value, dict):
+            groups = total.setdefault(key, {})
+            for name, entry in value.items():
+                into = groups.setdefault(name, dict.fromkeys(entry, 0))
+                for field, v in entry.items():
+                    into[field] += v
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+
+# PROCESS POOL, AT MOST 2 CHUNKS IN FLIGHT PER WORKER. workers=0 RUNS IN THIS PROCESS.
+def run(chunks, prices, workers=None, mat_catalog=None):
+    mat_catalog = database.catalog if mat_catalog is None else mat_catalog
+    unknown = [name for name in prices if name not in mat_catalog]
+    if unknown:
+        raise ValueError(f"Unknown material(s) in price table: {', '.join(unknown)}")
+    source = getattr(mat_catalog, "path", None) or mat_catalog.to_columns()
+    initargs = (source, prices)
+    total = {}
+    if workers == 0:
+        init_worker(*initargs)
+        for chunk in chunks:
+            merge(total, impact_chunk(chunk))
+        return total
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=initargs) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(impact_chunk, chunk))
+            if len(pending) >= workers * 2:
+                merge(total, pending.pop(0).result())
+        for future in pending:
+            merge(total, future.result())
+    return total
+
+
+def with_rm(entry):
+    out = {k: v for k, v in entry.items() if not k.endswith("_cents")}
+    if "before_cents" in entry:
+        delta = entry["after_cents"] - entry["before_cents"]
+        out.update({"before": from_cents(entry["before_cents"]), "after": from_cents(entry["after_cents"]),
+                    "delta": from_cents(delta),
+                    "delta_pct": round(delta / entry["before_cents"] * 100, 4) if entry["before_cents"] else None})
+    return out
+
+
+def report(total, prices, seconds):
+    materials = {name: with_rm(e) for name, e in total.get("materials", {}).items()}
+    return {
+        "changed_prices": prices,
+        "totals": with_rm({k: v for k, v in total.items() if not isinstance(v, dict)}),
+        "materials": dict(sorted(materials.items(), key=lambda kv: -abs(kv[1]["delta"]))),
+        "room_types": {name: with_rm(e) for name, e in sorted(total.get("room_types", {}).items())},
+        "seconds": round(seconds, 3)
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="renovision-impact",
+                                     description="Re-price past quotes under a proposed price table.")
+    parser.add_argument("prices", help="proposed prices: .json {material: price} or .csv (Material, Price_Per_Sqm)")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--store", help="quote store database (quote_store.py)")
+    source.add_argument("--quotes", help="quote export or room spec file (CSV, JSON or JSON Lines, see cli.py)")
+    parser.add_argument("--format", choices=["csv", "json", "jsonl"],
+                        help="--quotes format (default: from extension)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count, 0 = in process)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="quotes per task")
+    parser.add_argument("-o", "--output", default="-", help="JSON report file, '-' for stdout (default)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.chunk_size <= 0:
+        print("Error: --chunk-size must be greater than 0.", file=sys.stderr)
+        return 2
+    started = time.perf_counter()
+    try:
+        prices = load_prices(args.prices)
+        if args.store:
+            chunks = store_ranges(args.store, args.chunk_size)
+        else:
+            chunks = read_chunks(args.quotes, detect_format(args.quotes, args.format), args.chunk_size)
+        total = run(chunks, prices, args.workers)
+    except (ValueError, KeyError, OSError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    text = json.dumps(report(total, prices, time.perf_counter() - started), indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
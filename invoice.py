@@ -0,0 +1,247 @@
+import argparse
+import io
+import os
+import shutil
+import sys
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from pricing import to_cents, from_cents
+
+# INVOICE ENGINE: RENDERS QUOTE RECORDS (NO WIDGETS) FROM A TEMPLATE THAT IS
+# BUILT ONCE AT IMPORT, AND WRITES THEM IN BULK TO A DIRECTORY OR AN ARCHIVE.
+ASCII_HEADER = r"""
+  _____  ______ _   _  _____      _______ _____ _____ ____  _   _ 
+ |  __ \|  ____| \ | |/ _ \ \    / /_   _/ ____|_   _/ __ \| \ | |
+ | |__) | |__  |  \| | | | \ \  / /  | || (___   | || |  | |  \| |
+ |  _  /|  __| | . ` | | | |\ \/ /   | | \___ \  | || |  | | . ` |
+ | | \ \| |____| |\  | |_| | \  /   _| |_|___) |_| || |__| | |\  |
+ |_|  \_\______|_| \_|\___/   \/   |_____|_____/_____\____/|_| \_|
+        """
+LINE = "=" * 60
+THIN_LINE = "-" * 60
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+WRITE_BUFFER = 1 << 16
+
+# STATIC TEXT IS BAKED IN HERE; ONLY THE {field:spec} SLOTS ARE FILLED PER INVOICE
+TEMPLATE = f"""
+{ASCII_HEADER}
+
+{LINE}
+OFFICIAL INVOICE
+{LINE}
+Date: {{date}}
+Client Order: #{{order_id}}
+{LINE}
+
+PROJECT SPECIFICATIONS:
+  Room Type:      {{room_type}}
+  Dimensions:     {{width}}m x {{length}}m
+  Ceiling Height: {{height}}m
+  Tile Size:      {{tile_size}}
+
+{THIN_LINE}
+ITEMIZED BREAKDOWN
+{THIN_LINE}
+{'ITEM':<25} | {'QTY':<10} | {'UNIT PRICE':<10} | {'TOTAL':>10}
+{THIN_LINE}
+FLOORING: {{floor_mat:<15}} | {{floor_area:<6.1f}} sqm | RM {{floor_price:<7.2f}} | RM {{floor_cost:>7.2f}}
+WALL: {{wall_mat:<19}} | {{wall_area:<6.1f}} sqm | RM {{wall_price:<7.2f}} | RM {{wall_cost:>7.2f}}
+{THIN_LINE}
+Subtotal (Materials):                               RM {{subtotal:>7.2f}}
+{{discount_text}}
+Service ({{service_name}}):                           RM {{service_fee:>7.2f}}
+{LINE}
+GRAND TOTAL:                                        RM {{grand_total:>7.2f}}
+{LINE}
+
+Thank you for choosing RENOVISION!
+"""
+DISCOUNT_TEMPLATE = "Member Discount (5%):                           -RM {discount:>7.2f}\n" + THIN_LINE
+RENDER = TEMPLATE.format_map
+RENDER_DISCOUNT = DISCOUNT_TEMPLATE.format
+
+
+# UNIQUE ORDER NUMBERS: MILLISECOND CLOCK, BUMPED BY ONE WHEN TWO INVOICES ARE
+# ISSUED IN THE SAME MILLISECOND (OR THE CLOCK STEPS BACK), PLUS A RANDOM TAG PER
+# OrderNumbers. A BULK RUN RUNS THE COUNTER AHEAD OF THE CLOCK, SO WITHOUT THE TAG
+# A SECOND PROCESS STARTED MEANWHILE WOULD REISSUE THE SAME NUMBERS.
+class OrderNumbers:
+    def __init__(self, prefix="RV-", tag=None):
+        self.prefix = prefix
+        self.tag = uuid.uuid4().hex[:6].upper() if tag is None else tag
+        self._last = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            self._last = max(int(time.time() * 1000), self._last + 1)
+            return f"{self.prefix}{self._last}-{self.tag}"
+
+
+class InvoiceEngine:
+    def __init__(self, order_numbers=None):
+        self.order_numbers = OrderNumbers() if order_numbers is None else order_numbers
+
+    # record: room_type, width, length, height, tile_size, floor_mat, wall_mat, the
+    # calculate_project fields, discount, service_fee and service_name. order_id and
+    # date are filled in when missing.
+    def render(self, record):
+        fields = dict(record)
+        discount = fields.get("discount", 0) or 0
+        if not fields.get("order_id"):
+            fields["order_id"] = self.order_numbers.next()
+        if not fields.get("date"):
+            fields["date"] = datetime.now().strftime(DATE_FORMAT)
+        # TOTALS ARE ADDED UP IN CENTS, SO THEY MATCH THE LINE ITEMS EXACTLY
+        total = fields.get("total_cost_cents")
+        total = to_cents(fields["total_cost"]) if total is None else total
+        fields["subtotal"] = from_cents(total + to_cents(discount))
+        fields["grand_total"] = from_cents(total + to_cents(fields["service_fee"]))
+        fields["discount_text"] = RENDER_DISCOUNT(discount=discount) if discount > 0 else ""
+        return fields["order_id"], RENDER(fields)
+
+    def _render_batch(self, records):
+        return [self.render(record) for record in records]
+
+    def _rendered(self, records, pool, workers, batch_size):
+        # RENDER IN BATCHES ON THE POOL, YIELDED IN INPUT ORDER
+        batch, futures = [], []
+        for record in records:
+            batch.append(record)
+            if len(batch) == batch_size:
+                futures.append(pool.submit(self._render_batch, batch))
+                batch = []
+                if len(futures) > workers * 2:
+                    yield from futures.pop(0).result()
+        if batch:
+            futures.append(pool.submit(self._render_batch, batch))
+        for future in futures:
+            yield from future.result()
+
+    # dest IS A DIRECTORY, OR A .zip / .tar.gz / .tgz ARCHIVE PATH. EVERYTHING IS WRITTEN
+    # TO A STAGING FILE / DIRECTORY FIRST AND ONLY PUBLISHED WHEN THE WHOLE BATCH IS DONE,
+    # SO A FAILED RUN (E.G. AN ORDER NUMBER THAT IS ALREADY ISSUED) LEAVES NOTHING BEHIND.
+    def write_bulk(self, records, dest, workers=4, batch_size=256):
+        started = time.perf_counter()
+        count = 0
+        nbytes = 0
+        archive = dest.endswith((".zip", ".tar.gz", ".tgz"))
+        if archive and os.path.exists(dest):
+            raise FileExistsError(f"{dest} already exists")
+        if not archive:
+            os.makedirs(dest, exist_ok=True)
+        staging = f"{dest}.tmp{os.getpid()}" if archive else os.path.join(dest, f".staging{os.getpid()}")
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="invoice") as pool:
+                rendered = self._rendered(records, pool, workers, batch_size)
+                if dest.endswith(".zip"):
+                    with zipfile.ZipFile(staging, "x", zipfile.ZIP_DEFLATED, compresslevel=6) as out:
+                        for order_id, text in rendered:
+                            data = text.encode("utf-8")
+                            out.writestr(f"Invoice_{order_id}.txt", data)
+                            count += 1
+                            nbytes += len(data)
+                elif archive:
+                    with tarfile.open(staging, "x:gz", compresslevel=6) as out:
+                        for order_id, text in rendered:
+                            data = text.encode("utf-8")
+                            info = tarfile.TarInfo(f"Invoice_{order_id}.txt")
+                            info.size = len(data)
+                            info.mtime = int(time.time())
+                            out.addfile(info, io.BytesIO(data))
+                            count += 1
+                            nbytes += len(data)
+                else:
+                    os.makedirs(staging)
+                    writes = []
+                    for order_id, text in rendered:
+                        path = os.path.join(staging, f"Invoice_{order_id}.txt")
+                        writes.append(pool.submit(write_text, path, text))
+                        count += 1
+                        if len(writes) >= batch_size * workers:
+                            nbytes += sum(w.result() for w in writes)
+                            writes = []
+                    nbytes += sum(w.result() for w in writes)
+            if archive:
+                os.replace(staging, dest)
+            else:
+                publish(staging, dest)
+        except BaseException:
+            if os.path.isdir(staging):
+                shutil.rmtree(staging)
+            elif os.path.exists(staging):
+                os.remove(staging)
+            raise
+        seconds = time.perf_counter() - started
+        return {
+            "invoices": count,
+            "bytes": nbytes,
+            "seconds": seconds,
+            "invoices_per_sec": count / seconds if seconds > 0 else 0.0
+        }
+
+
+# MOVE EVERY INVOICE IN staging INTO dest, OR NONE OF THEM WHEN ANY NAME IS ALREADY TAKEN
+def publish(staging, dest):
+    names = os.listdir(staging)
+    taken = [name for name in names if os.path.exists(os.path.join(dest, name))]
+    if taken:
+        raise FileExistsError(f"{len(taken)} invoice(s) already exist in {dest}, e.g. {taken[0]}")
+    for name in names:
+        os.rename(os.path.join(staging, name), os.path.join(dest, name))
+    os.rmdir(staging)
+
+
+# "x": AN EXISTING INVOICE IS NEVER OVERWRITTEN, A REPEATED ORDER NUMBER FAILS LOUDLY
+def write_text(path, text):
+    with open(path, "x", buffering=WRITE_BUFFER) as f:
+        return f.write(text)
+
+
+# QUOTE ROWS AS WRITTEN BY cli.py -> INVOICE RECORDS
+def records_from_quotes(path, fmt=None):
+    import pandas as pd
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson", ".json")) else "csv")
+    reader = (pd.read_json(path, lines=True, chunksize=50_000, dtype=False) if fmt == "jsonl"
+              else pd.read_csv(path, chunksize=50_000))
+    for chunk in reader:
+        if "status" in chunk:
+            chunk = chunk[chunk["status"] == "quote"]
+        chunk = chunk.rename(columns={"service": "service_name"})
+        for record in chunk.to_dict("records"):
+            for col in ("width", "length", "height"):
+                record[col] = f"{record[col]:g}"
+            # A BLANK TILE SIZE READS BACK AS NaN
+            if pd.isna(record.get("tile_size")):
+                record["tile_size"] = ""
+            yield record
+
+
+ENGINE = InvoiceEngine()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="renovision-invoice",
+                                     description="Bulk invoice generation from quote exports (see cli.py).")
+    parser.add_argument("quotes", help="quote file from 'main.py quote' (CSV or JSON Lines)")
+    parser.add_argument("dest", help="output directory, or a .zip / .tar.gz archive")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+    try:
+        stats = ENGINE.write_bulk(records_from_quotes(args.quotes), args.dest, workers=args.workers)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"{stats['invoices']} invoices, {stats['bytes'] / 1e6:.1f} MB in {stats['seconds']:.2f}s "
+          f"({stats['invoices_per_sec']:.0f} invoices/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+import numpy as np
+
+from database import parse_tile_size
+
+# TILE LAYOUT PLANNER. TILES ARE LAID FROM THE (0, 0) CORNER OF THE ROOM, EACH ONE
+# IS CLIPPED TO THE ROOM, AND WHAT IS INSIDE DECIDES FULL / CUT. ALL ROOMS THAT
+# SHARE A TILE SIZE, PATTERN AND GROUT ARE EVALUATED TOGETHER AS NUMPY ARRAYS:
+# - straight / offset: ROOMS x ROWS. A ROW IS AN OPTIONAL CUT PIECE, A RUN OF FULL
+#   TILES AND AN OPTIONAL CUT PIECE, SO IT IS COUNTED WITHOUT VISITING EACH TILE.
+# - herringbone: ROOMS x LATTICE CELLS (TWO PLANKS PER CELL).
+# BOTH ARE CHUNKED TO AT MOST MAX_CELLS ELEMENTS.
+#
+# THE TILE'S LONG SIDE RUNS ALONG THE ROOM WIDTH. A CUT PIECE COMES OUT OF A TILE
+# TOGETHER WITH AS MANY OTHER PIECES OF THE SAME SIZE AS FIT (SAW KERF INCLUDED);
+# THOSE EXTRA PIECES ARE THE REUSED OFFCUTS.
+PATTERNS = ("straight", "offset", "herringbone")
+DEFAULT_GROUT_MM = 2.0
+DEFAULT_KERF_MM = 3.0
+DEFAULT_OFFSET = 0.5
+MAX_CELLS = 2_000_000
+EPS = 1e-9
+
+# LATTICE BASIS (v1, v2) AND THE TILE RECTANGLES (dx, dy, w, h) OF ONE CELL
+def pattern_cell(pattern, tile_w, tile_h, grout, offset=DEFAULT_OFFSET):
+    long_side, short_side = max(tile_w, tile_h), min(tile_w, tile_h)
+    pitch_l, pitch_s = long_side + grout, short_side + grout
+    if pattern == "straight":
+        return ((pitch_l, 0.0), (0.0, pitch_s)), [(0.0, 0.0, long_side, short_side)]
+    if pattern == "offset":
+        # EACH ROW SHIFTED BY offset OF A TILE AGAINST THE ONE BELOW (RUNNING BOND)
+        return ((pitch_l, 0.0), (offset * pitch_l, pitch_s)), [(0.0, 0.0, long_side, short_side)]
+    if pattern == "herringbone":
+        # 90 DEGREE HERRINGBONE: ONE PLANK ALONG x AND ONE ALONG y PER CELL
+        return ((pitch_s, pitch_s), (pitch_l, -pitch_l)), [(0.0, 0.0, long_side, short_side),
+                                                           (pitch_l, short_side - long_side, short_side, long_side)]
+    raise ValueError(f"pattern must be one of {', '.join(PATTERNS)}")
+
+
+# LATTICE INDEX RANGE THAT COVERS EACH ROOM (PLUS ONE TILE OF MARGIN)
+def index_ranges(basis, rects, width, length):
+    inv = np.linalg.inv(np.array(basis, dtype=np.float64).T)
+    margin = max(max(abs(dx), abs(dy)) + max(w, h) for dx, dy, w, h in rects)
+    xs = (np.full_like(width, -margin), width + margin)
+    ys = (np.full_like(length, -margin), length + margin)
+    corners = [(x, y) for x in xs for y in ys]
+    i = np.stack([inv[0, 0] * x + inv[0, 1] * y for x, y in corners])
+    j = np.stack([inv[1, 0] * x + inv[1, 1] * y for x, y in corners])
+    return (np.floor(i.min(axis=0)).astype(np.int64), np.ceil(i.max(axis=0)).astype(np.int64),
+            np.floor(j.min(axis=0)).astype(np.int64), np.ceil(j.max(axis=0)).astype(np.int64))
+
+
+def plan_chunk(width, length, basis, rects, kerf, i0, i1, j0, j1):
+    n = len(width)
+    ni = int((i1 - i0).max()) + 1
+    nj = int((j1 - j0).max()) + 1
+    i = i0[:, None, None] + np.arange(ni)[None, :, None]
+    j = j0[:, None, None] + np.arange(nj)[None, None, :]
+    valid = (i <= i1[:, None, None]) & (j <= j1[:, None, None])
+    (v1x, v1y), (v2x, v2y) = basis
+    px = i * v1x + j * v2x
+    py = i * v1y + j * v2y
+    W = width[:, None, None]
+    L = length[:, None, None]
+
+    out = {"full_tiles": np.zeros(n, dtype=np.int64), "cut_pieces": np.zeros(n, dtype=np.int64),
+           "covered_area": np.zeros(n), "cut_tile_share": np.zeros(n)}
+    for dx, dy, w, h in rects:
+        x0 = px + dx
+        y0 = py + dy
+        cw = np.clip(np.minimum(x0 + w, W) - np.maximum(x0, 0.0), 0.0, None)
+        ch = np.clip(np.minimum(y0 + h, L) - np.maximum(y0, 0.0), 0.0, None)
+        inside = valid & (cw > EPS) & (ch > EPS)
+        cut_x = cw < w - EPS
+        cut_y = ch < h - EPS
+        full = inside & ~cut_x & ~cut_y
+        cut = inside & (cut_x | cut_y)
+        n_full = np.count_nonzero(full, axis=(1, 2))
+        out["full_tiles"] += n_full
+        out["cut_pieces"] += np.count_nonzero(cut, axis=(1, 2))
+        # CUT PIECES ONLY LIE ALONG THE WALLS, SO THE PER-PIECE MATHS RUNS ON THOSE ALONE
+        room, a, b = np.nonzero(cut)
+        pw, ph = cw[room, a, b], ch[room, a, b]
+        out["covered_area"] += n_full * (w * h) + np.bincount(room, pw * ph, minlength=n)
+        out["cut_tile_share"] += np.bincount(room, tile_share(pw, ph, w, h, kerf), minlength=n)
+    return out
+
+
+# FRACTION OF A TILE A (cw x ch) PIECE USES: 1 / PIECES OF THAT SIZE ONE TILE YIELDS
+def tile_share(cw, ch, w, h, kerf):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_x = np.where(cw < w - EPS, np.floor((w + kerf) / (cw + kerf) + 1e-6), 1.0)
+        per_y = np.where(ch < h - EPS, np.floor((h + kerf) / (ch + kerf) + 1e-6), 1.0)
+    return 1.0 / np.maximum(per_x * per_y, 1.0)
+
+
+# straight / offset: ROW r STARTS ITS FIRST TILE AT x = -(r * shift * pitch MOD pitch)
+def plan_rows(width, length, w, h, grout, kerf, shift, n_rows):
+    n = len(width)
+    pitch_x, pitch_y = w + grout, h + grout
+    r = np.arange(n_rows)[None, :]
+    W = width[:, None]
+    y0 = r * pitch_y
+    ch = np.clip(np.minimum(y0 + h, length[:, None]) - y0, 0.0, None)
+    row_in = ch > EPS
+    row_full = ch >= h - EPS
+
+    x0 = -np.mod(r * shift * pitch_x, pitch_x)
+    x0 = np.where(x0 < -pitch_x + EPS, 0.0, x0)
+    # FIRST TILE (MAY STICK OUT ON THE LEFT, OR BE THE ONLY TILE IN A NARROW ROOM)
+    c_first = np.clip(np.minimum(x0 + w, W) - np.maximum(x0, 0.0), 0.0, None)
+    # THEN k = 1..K WHOLE TILES, THEN ONE PIECE CUT AT THE RIGHT WALL
+    k_last = np.floor((W - w - x0) / pitch_x + EPS)
+    n_mid = np.maximum(k_last, 0.0)
+    o_end = x0 + (n_mid + 1) * pitch_x
+    c_end = np.clip(W - o_end, 0.0, w)
+    c_end = np.where(c_end >= w - EPS, 0.0, c_end)
+
+    full = np.zeros(n, dtype=np.int64)
+    cut = np.zeros(n, dtype=np.int64)
+    covered = np.zeros(n)
+    share = np.zeros(n)
+    for cw, count in ((c_first, 1.0), (np.full_like(c_first, w), n_mid), (c_end, 1.0)):
+        inside = row_in & (cw > EPS)
+        is_full = inside & row_full & (cw >= w - EPS)
+        is_cut = inside & ~is_full
+        count = np.broadcast_to(count, inside.shape)
+        full += np.where(is_full, count, 0).sum(axis=1).astype(np.int64)
+        cut += np.where(is_cut, count, 0).sum(axis=1).astype(np.int64)
+        covered += np.where(inside, cw * ch * count, 0.0).sum(axis=1)
+        share += np.where(is_cut, tile_share(cw, ch, w, h, kerf) * count, 0.0).sum(axis=1)
+    return {"full_tiles": full, "cut_pieces": cut, "covered_area": covered, "cut_tile_share": share}
+
+
+# VECTORIZED OVER ROOMS. width / length IN METRES; tile_size, pattern, grout_mm
+# MAY BE SCALARS OR PER-ROOM ARRAYS. RETURNS A DICT OF PER-ROOM ARRAYS.
+def plan_layouts(width, length, tile_size, pattern="straight", grout_mm=DEFAULT_GROUT_MM,
+                 kerf_mm=DEFAULT_KERF_MM, offset=DEFAULT_OFFSET, max_cells=MAX_CELLS):
+    width = np.atleast_1d(np.asarray(width, dtype=np.float64))
+    length = np.atleast_1d(np.asarray(length, dtype=np.float64))
+    n = len(width)
+    tile_size = np.broadcast_to(np.asarray(tile_size, dtype=object), (n,))
+    pattern = np.broadcast_to(np.asarray(pattern, dtype=object), (n,))
+    grout_mm = np.broadcast_to(np.asarray(grout_mm, dtype=np.float64), (n,))
+    if np.any(~np.isfinite(width) | ~np.isfinite(length) | (width <= 0) | (length <= 0)):
+        raise ValueError("Room width and length must be greater than 0")
+    if np.any(grout_mm < 0) or kerf_mm < 0:
+        raise ValueError("Grout gap and saw kerf cannot be negative")
+
+    full = np.zeros(n, dtype=np.int64)
+    cut_pieces = np.zeros(n, dtype=np.int64)
+    cut_tiles = np.zeros(n, dtype=np.int64)
+    covered = np.zeros(n)
+    tile_area = np.zeros(n)
+
+    # ONE GROUP PER (TILE SIZE, PATTERN, GROUT)
+    groups = {}
+    for row, key in enumerate(zip(tile_size.tolist(), pattern.tolist(), grout_mm.tolist())):
+        groups.setdefault(key, []).append(row)
+    kerf = kerf_mm / 1000
+    for (size, pat, grout), rows in groups.items():
+        tile_w, tile_h = parse_tile_size(size)
+        grout = grout / 1000
+        rows = np.array(rows, dtype=np.int64)
+        if pat in ("straight", "offset"):
+            long_side, short_side = max(tile_w, tile_h), min(tile_w, tile_h)
+            n_rows = np.ceil(length[rows] / (short_side + grout)).astype(np.int64) + 1
+            cells = n_rows
+        else:
+            basis, rects = pattern_cell(pat, tile_w, tile_h, grout, offset)
+            i0, i1, j0, j1 = index_ranges(basis, rects, width[rows], length[rows])
+            cells = (i1 - i0 + 1) * (j1 - j0 + 1)
+        # SIMILAR-SIZED ROOMS TOGETHER SO PADDING STAYS SMALL
+        order = np.argsort(cells, kind="stable")
+        sorted_cells = cells[order]
+        start = 0
+        while start < len(order):
+            # LARGEST stop WITH sorted_cells[stop - 1] * (stop - start) <= max_cells
+            fits = sorted_cells[start:] * np.arange(1, len(order) - start + 1) <= max_cells
+            stop = start + max(1, int(np.argmin(fits)) if not fits.all() else len(fits))
+            part = order[start:stop]
+            sel = rows[part]
+            if pat in ("straight", "offset"):
+                shift = offset if pat == "offset" else 0.0
+                res = plan_rows(width[sel], length[sel], long_side, short_side, grout, kerf, shift,
+                                int(n_rows[part].max()))
+            else:
+                res = plan_chunk(width[sel], length[sel], basis, rects, kerf,
+                                 i0[part], i1[part], j0[part], j1[part])
+            full[sel] = res["full_tiles"]
+            cut_pieces[sel] = res["cut_pieces"]
+            cut_tiles[sel] = np.ceil(res["cut_tile_share"] - 1e-9).astype(np.int64)
+            covered[sel] = res["covered_area"]
+            start = stop
+        tile_area[rows] = tile_w * tile_h
+
+    tiles_needed = full + cut_tiles
+    floor_area = width * length
+    bought = tiles_needed * tile_area
+    return {
+        "full_tiles": full,
+        "cut_pieces": cut_pieces,
+        "cut_tiles": cut_tiles,
+        "offcuts_reused": cut_pieces - cut_tiles,
+        "tiles_needed": tiles_needed,
+        "covered_area": covered,
+        "waste_area": bought - covered,
+        "wastage_factor": bought / floor_area
+    }
+
+
+# ONE ROOM -> PLAIN PYTHON NUMBERS
+def plan_layout(width, length, tile_size, pattern="straight", grout_mm=DEFAULT_GROUT_MM,
+                kerf_mm=DEFAULT_KERF_MM, offset=DEFAULT_OFFSET):
+    res = plan_layouts([width], [length], tile_size, pattern, grout_mm, kerf_mm, offset)
+    return {k: v[0].item() for k, v in res.items()}
+
@@ -1,5 +1,32 @@
-from gui import RenovationApp
+import time
+
+STARTED_AT = time.perf_counter()
+
+import sys
 
 if __name__ == "__main__":
-    app = RenovationApp()
+    # HEADLESS MODE: python main.py quote [ARGS] (NEVER IMPORTS TKINTER OR PIL)
+    if len(sys.argv) > 1 and sys.argv[1] == "quote":
+        from cli import main
+        sys.exit(main(sys.argv[2:]))
+
+    # PRICE-CHANGE IMPACT OVER PAST QUOTES: python main.py impact PRICES --store DB | --quotes FILE
+    if len(sys.argv) > 1 and sys.argv[1] == "impact":
+        from impact import main
+        sys.exit(main(sys.argv[2:]))
+
+    # PRINT-RESOLUTION ROOM PREVIEW: python main.py export OUT.png|OUT.tif [ARGS] (SEE export.py)
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        from export import main
+        sys.exit(main(sys.argv[2:]))
+
+    # LOCAL HTTP SERVICE: python main.py serve|loadtest [ARGS] (SEE service.py)
+    if len(sys.argv) > 1 and sys.argv[1] in ("serve", "loadtest"):
+        from service import main
+        sys.exit(main(sys.argv[1:]))
+
+    # --eager BUILDS ALL PAGES AT STARTUP, --startup-timings PRINTS IMPORT/FIRST-PAINT TIMES
+    from gui import RenovationApp
+    app = RenovationApp(eager="--eager" in sys.argv, started_at=STARTED_AT,
+                        report_timings="--startup-timings" in sys.argv)
     app.mainloop()
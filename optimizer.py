@@ -0,0 +1,185 @@
+import heapq
+
+import numpy as np
+
+import database
+from database import (RenovationLogic, TILE_WASTAGE, DEFAULT_WASTAGE, WET_ROOMS,
+                      MEMBER_DISCOUNT_RATE, MEMBER_DISCOUNT_BP)
+from pricing import to_cents, from_cents, to_mm, to_basis_points, line_cents, discount_cents
+
+# BUDGET-CONSTRAINED SEARCH OVER EVERY SAFE FLOOR x WALL x TILE-SIZE COMBINATION.
+# COSTS ARE VECTORS (ONE PER FLOOR OPTION / WALL), COMBINATIONS ARE EVALUATED AS
+# BLOCKS OF A FLOOR x WALL GRID, AND ANYTHING THAT CANNOT FIT OR CANNOT REACH THE
+# TOP N IS PRUNED BEFORE THE GRID IS BUILT. COSTS AND THE BUDGET ARE WHOLE CENTS
+# (pricing.py), SO A COMBINATION PRICES EXACTLY AS calculate_project WOULD.
+SORT_KEYS = ("cost", "leftover", "quality")
+BLOCK_CELLS = 4_000_000
+
+
+# DEFAULT QUALITY: PRICE RELATIVE TO THE DEAREST MATERIAL OF THE SAME TYPE
+def default_quality(mat_catalog):
+    dearest = {}
+    for record in mat_catalog:
+        dearest[record.type] = max(dearest.get(record.type, 0.0), record.price)
+    return {r.name: (r.price / dearest[r.type] if dearest[r.type] else 0.0) for r in mat_catalog}
+
+
+def floor_options(room_type, floor_mm2, mat_catalog):
+    names, tiles, costs = [], [], []
+    for name in mat_catalog.names("Floor"):
+        # [HAZIQ] SAFETY CHECK (SAME RULE AS check_safety)
+        if room_type in WET_ROOMS and not mat_catalog[name].waterproof:
+            continue
+        price_cents = mat_catalog[name].price_cents
+        for tile in RenovationLogic.tile_options(name):
+            names.append(name)
+            tiles.append(tile)
+            # SAME ROUNDING AS calculate_project
+            costs.append(line_cents(floor_mm2, price_cents, to_basis_points(TILE_WASTAGE.get(tile, DEFAULT_WASTAGE))))
+    return names, tiles, np.array(costs, dtype=np.int64)
+
+
+def apply_discount(total, member):
+    # [AIMAN] DISCOUNT CALCULATION LOGIC
+    return total - discount_cents(total, member, MEMBER_DISCOUNT_BP)
+
+
+def top_k(scores, k):
+    if len(scores) <= k:
+        return np.argsort(scores, kind="stable")
+    part = np.argpartition(scores, k - 1)[:k]
+    return part[np.argsort(scores[part], kind="stable")]
+
+
+# PRUNE FOR "quality": WALK OPTIONS FROM CHEAPEST UP AND KEEP ONLY THOSE IN THE TOP N BY
+# QUALITY SO FAR. ANYTHING ELSE HAS N CHEAPER, BETTER OPTIONS THAT FIT WHENEVER IT DOES.
+# ALSO RETURNS, FOR EVERY PREFIX OF THE KEPT LIST, ITS TOP N (PADDED WITH -1).
+def quality_skyline(cost, quality, idx, n):
+    kept, prefix_top, top = [], [], []
+    for i in idx[np.argsort(cost[idx], kind="stable")].tolist():
+        if len(top) == n and quality[i] <= min(quality[j] for j in top):
+            continue
+        if len(top) == n:
+            top.remove(min(top, key=lambda j: quality[j]))
+        top.append(i)
+        kept.append(i)
+        prefix_top.append(top + [-1] * (n - len(top)))
+    return np.array(kept, dtype=np.int64), np.array(prefix_top, dtype=np.int64).reshape(-1, n)
+
+
+# NUMBER OF (COST-SORTED) WALLS THAT FIT NEXT TO EACH FLOOR
+def affordable_count(f_cost, w_sorted_cost, budget, member):
+    return np.searchsorted(w_sorted_cost, max_subtotal(budget, member) - f_cost, side="right")
+
+
+# LARGEST SUBTOTAL (CENTS) WHOSE DISCOUNTED TOTAL STILL FITS THE BUDGET
+def max_subtotal(budget, member):
+    if not member:
+        return budget
+    # DISCOUNTED TOTALS NEVER DECREASE AS THE SUBTOTAL GROWS; START ABOVE AND STEP DOWN
+    subtotal = int((budget + 1) / (1 - MEMBER_DISCOUNT_RATE)) + 1
+    while apply_discount(subtotal, member) > budget:
+        subtotal -= 1
+    return subtotal
+
+
+def find_combinations(room_type, width, length, height, budget, top_n=5, sort_by="cost",
+                      member=False, quality=None, mat_catalog=None):
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"sort_by must be one of {', '.join(SORT_KEYS)}")
+    mat_catalog = database.catalog if mat_catalog is None else mat_catalog
+    if top_n <= 0 or budget < 0:
+        return []
+
+    # ROOM CALCULATIONS (WHOLE MILLIMETRES AND CENTS, SEE pricing.py)
+    width, length, height = to_mm(width), to_mm(length), to_mm(height)
+    floor_mm2 = width * length
+    wall_mm2 = 2 * (width + length) * height
+    budget = to_cents(budget)
+
+    f_names, f_tiles, f_cost = floor_options(room_type, floor_mm2, mat_catalog)
+    w_names = mat_catalog.names("Wall")
+    w_cost = np.array([line_cents(wall_mm2, mat_catalog[n].price_cents) for n in w_names], dtype=np.int64)
+    if len(f_cost) == 0 or len(w_cost) == 0:
+        return []
+
+    if quality is None:
+        quality = default_quality(mat_catalog)
+    f_quality = np.array([quality.get(n, 0.0) for n in f_names], dtype=np.float64)
+    w_quality = np.array([quality.get(n, 0.0) for n in w_names], dtype=np.float64)
+
+    # PRUNE: A FLOOR THAT DOES NOT FIT WITH THE CHEAPEST WALL (AND VICE VERSA) NEVER FITS
+    f_keep = np.flatnonzero(apply_discount(f_cost + w_cost.min(), member) <= budget)
+    w_keep = np.flatnonzero(apply_discount(w_cost + f_cost.min(), member) <= budget)
+    if len(f_keep) == 0 or len(w_keep) == 0:
+        return []
+
+    # PRUNE FOR "cost": ONLY THE N CHEAPEST FLOORS AND N CHEAPEST WALLS CAN BE IN THE N CHEAPEST PAIRS
+    if sort_by == "cost":
+        f_keep = f_keep[top_k(f_cost[f_keep], top_n)]
+        w_keep = w_keep[top_k(w_cost[w_keep], top_n)]
+
+    if sort_by == "quality":
+        f_keep, _ = quality_skyline(f_cost, f_quality, f_keep, top_n)
+        w_order, w_prefix_top = quality_skyline(w_cost, w_quality, w_keep, top_n)
+    else:
+        w_order = w_keep[np.argsort(w_cost[w_keep], kind="stable")]
+
+    best_score = np.empty(0)
+    best_f = np.empty(0, dtype=np.int64)
+    best_w = np.empty(0, dtype=np.int64)
+    block = max(1, BLOCK_CELLS // len(w_order))
+    for start in range(0, len(f_keep), block):
+        fi = f_keep[start:start + block]
+        if sort_by == "cost":
+            wi = np.broadcast_to(w_order[None, :], (len(fi), len(w_order)))
+            valid_col = np.ones(wi.shape, dtype=bool)
+        else:
+            limit = affordable_count(f_cost[fi], w_cost[w_order], budget, member)
+            if sort_by == "leftover":
+                # PER FLOOR, ONLY THE N DEAREST WALLS THAT FIT CAN WIN
+                cols = limit[:, None] + np.arange(-top_n, 0)[None, :]
+                valid_col = cols >= 0
+                wi = w_order[np.clip(cols, 0, len(w_order) - 1)]
+            else:
+                # PER FLOOR, THE TOP N BY QUALITY AMONG THE WALLS THAT FIT
+                wi = w_prefix_top[np.clip(limit - 1, 0, None)]
+                valid_col = (limit[:, None] > 0) & (wi >= 0)
+                wi = np.where(valid_col, wi, w_order[0])
+        fi_grid = np.broadcast_to(fi[:, None], wi.shape)
+
+        total = apply_discount(f_cost[fi_grid] + w_cost[wi], member)
+        fits = valid_col & (total <= budget)
+        if sort_by == "cost":
+            score = total
+        elif sort_by == "leftover":
+            score = budget - total
+        else:
+            # HIGHER QUALITY FIRST, CHEAPER FIRST ON A TIE
+            score = -(f_quality[fi_grid] + w_quality[wi]) + total * 1e-14
+        score = np.where(fits, score, np.inf).ravel()
+
+        pick = top_k(score, top_n)
+        pick = pick[np.isfinite(score[pick])]
+        best_score = np.concatenate([best_score, score[pick]])
+        best_f = np.concatenate([best_f, fi_grid.ravel()[pick]])
+        best_w = np.concatenate([best_w, wi.ravel()[pick]])
+        keep = top_k(best_score, top_n)
+        best_score, best_f, best_w = best_score[keep], best_f[keep], best_w[keep]
+
+    results = []
+    for f, w in zip(best_f.tolist(), best_w.tolist()):
+        subtotal = f_cost[f] + w_cost[w]
+        total = apply_discount(subtotal, member)
+        results.append({
+            "floor_mat": f_names[f],
+            "tile_size": f_tiles[f],
+            "wall_mat": w_names[w],
+            "floor_cost": from_cents(int(f_cost[f])),
+            "wall_cost": from_cents(int(w_cost[w])),
+            "discount": from_cents(int(subtotal - total)),
+            "total_cost": from_cents(int(total)),
+            "leftover": from_cents(int(budget - total)),
+            "quality": float(f_quality[f] + w_quality[w])
+        })
+    return results
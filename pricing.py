@@ -0,0 +1,100 @@
+import math
+
+# EXACT MONEY. EVERY AMOUNT IS AN INTEGER NUMBER OF SEN (CENTS) - A PYTHON int FOR
+# ONE QUOTE, AN int64 NUMPY ARRAY FOR A BATCH - AND THE SAME FUNCTIONS SERVE BOTH.
+# FLOATS ONLY APPEAR AT THE EDGES (CATALOG PRICES IN, RM FOR DISPLAY OUT).
+#
+# ROUNDING POINTS, ALL HALF-UP:
+#   1. ROOM DIMENSIONS        -> WHOLE MILLIMETRES
+#   2. CATALOG PRICE          -> WHOLE CENTS PER SQM
+#   3. AREA x PRICE           -> WHOLE CENTS (ONE LINE PER FLOOR / WALL)
+#   4. FLOOR LINE x WASTAGE   -> WHOLE CENTS
+#   5. SUBTOTAL x DISCOUNT    -> WHOLE CENTS; TOTAL = SUBTOTAL - DISCOUNT
+# SUBTOTAL, TOTAL AND GRAND TOTAL ARE SUMS AND DIFFERENCES OF LINES, SO AN INVOICE
+# ALWAYS ADDS UP TO THE CENT. NUMPY IS ONLY IMPORTED FOR ARRAY INPUTS.
+CENTS_PER_RM = 100
+BASIS_POINTS = 10_000
+MM2_PER_SQM = 1_000_000
+
+
+def is_array(value):
+    return hasattr(value, "dtype")
+
+
+# NaN / inf WOULD OTHERWISE SURFACE AS A BARE ValueError / OverflowError FROM math.floor
+def check_finite(value):
+    if not math.isfinite(value):
+        raise ValueError(f"Expected a finite number, got {value}")
+    return value
+
+
+# RM -> CENTS (HALF-UP). round(..., 6) FIRST SO 2.675 * 100 = 267.49999... STILL GOES UP
+def to_cents(amount):
+    if is_array(amount):
+        import numpy as np
+        return np.floor(np.round(amount * CENTS_PER_RM, 6) + 0.5).astype(np.int64)
+    return math.floor(round(check_finite(amount) * CENTS_PER_RM, 6) + 0.5)
+
+
+def from_cents(cents):
+    return cents / CENTS_PER_RM
+
+
+def to_mm(metres):
+    if is_array(metres):
+        import numpy as np
+        return np.floor(np.round(metres * 1000, 6) + 0.5).astype(np.int64)
+    return math.floor(round(check_finite(metres) * 1000, 6) + 0.5)
+
+
+# SQUARE METRES -> WHOLE SQUARE MILLIMETRES (FOR AREAS THAT ARE NOT A PRODUCT OF mm SIDES)
+def to_mm2(sqm):
+    return math.floor(round(sqm * MM2_PER_SQM, 3) + 0.5)
+
+
+# 1.05 -> 10500, 0.05 -> 500
+def to_basis_points(rate):
+    return math.floor(round(rate * BASIS_POINTS, 6) + 0.5)
+
+
+# num / den ROUNDED HALF-UP, FOR num >= 0 AND den > 0 (int OR int64 ARRAYS)
+def div_half_up(num, den):
+    return (num + den // 2) // den
+
+
+def line_cents(area_mm2, price_cents, factor_bp=None):
+    cost = div_half_up(area_mm2 * price_cents, MM2_PER_SQM)
+    if factor_bp is None:
+        return cost
+    return div_half_up(cost * factor_bp, BASIS_POINTS)
+
+
+# FLOOR AND WALL LINES OF A RECTANGULAR ROOM, EACH ONLY FROM THE INPUTS IT USES
+def floor_cents(width, length, price_cents, wastage_bp):
+    return line_cents(to_mm(width) * to_mm(length), price_cents, wastage_bp)
+
+
+def wall_cents(width, length, height, price_cents):
+    return line_cents(2 * (to_mm(width) + to_mm(length)) * to_mm(height), price_cents)
+
+
+# (floor_cents, wall_cents) FOR ONE RECTANGULAR ROOM OR A BATCH OF THEM
+def room_cents(width, length, height, floor_price_cents, wall_price_cents, wastage_bp):
+    return (floor_cents(width, length, floor_price_cents, wastage_bp),
+            wall_cents(width, length, height, wall_price_cents))
+
+
+# [AIMAN] DISCOUNT CALCULATION LOGIC (member MAY BE A BOOL OR A BOOL ARRAY)
+def discount_cents(subtotal_cents, member, rate_bp):
+    discount = div_half_up(subtotal_cents * rate_bp, BASIS_POINTS)
+    if is_array(discount) or is_array(member):
+        import numpy as np
+        return np.where(member, discount, 0)
+    return discount if member else 0
+
+
+# "1443.75" WITHOUT GOING THROUGH A FLOAT
+def format_cents(cents):
+    sign = "-" if cents < 0 else ""
+    rm, sen = divmod(abs(int(cents)), CENTS_PER_RM)
+    return f"{sign}{rm}.{sen:02d}"
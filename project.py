@@ -0,0 +1,361 @@
+import math
+from collections import OrderedDict
+
+import database
+from database import RenovationLogic, TILE_WASTAGE, DEFAULT_WASTAGE, tile_area_sqm, pricing_stamp
+from pricing import MM2_PER_SQM, div_half_up, to_mm, to_basis_points, line_cents, from_cents
+
+# MULTI-ROOM PROJECTS. A ROOM IS A FLOOR POLYGON (METRES, ANY ORDER OF CORNERS),
+# A CEILING HEIGHT, A FINISH PER WALL AND DOOR / WINDOW OPENINGS. EVERY NUMBER IS
+# A NODE IN A DEPENDENCY GRAPH:
+#
+#   shape:<room> ----> geometry:<room> --+
+#   finish:<room> -----------------------+--> cost:<room> --> totals / by_material / by_room_type
+#   pricing (CATALOG VERSION) -----------+
+#
+# EDITING A ROOM ONLY DIRTIES THE NODES DOWNSTREAM OF WHAT CHANGED, SO CHANGING A
+# WALL FINISH RE-PRICES THAT ONE ROOM AND THE ROLL-UPS, NOTHING ELSE.
+EPS = 1e-9
+
+
+# POLYGON MATHS (SHOELACE AREA, EDGE LENGTHS)
+# TWICE THE SIGNED SHOELACE AREA; EXACT (AN int) FOR INTEGER CORNERS
+def twice_area(points):
+    return sum(x1 * y2 - x2 * y1 for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]))
+
+
+def polygon_area(points):
+    return abs(twice_area(points)) / 2
+
+
+def wall_lengths(points):
+    return [math.hypot(x2 - x1, y2 - y1) for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1])]
+
+
+def polygon_perimeter(points):
+    return sum(wall_lengths(points))
+
+
+def rectangle(width, length):
+    return [(0.0, 0.0), (float(width), 0.0), (float(width), float(length)), (0.0, float(length))]
+
+
+class Opening:
+    __slots__ = ("wall", "width", "height", "kind")
+
+    def __init__(self, wall, width, height, kind="door"):
+        self.wall = int(wall)
+        self.width = float(width)
+        self.height = float(height)
+        self.kind = kind
+
+    def key(self):
+        return (self.wall, self.width, self.height, self.kind)
+
+    def __repr__(self):
+        return f"Opening({self.wall}, {self.width!r}, {self.height!r}, {self.kind!r})"
+
+
+class Room:
+    __slots__ = ("name", "room_type", "points", "height", "floor_mat", "wall_mat", "tile_size",
+                 "wall_finishes", "openings")
+
+    # wall_finishes: {WALL INDEX: MATERIAL} FOR WALLS THAT DIFFER FROM wall_mat.
+    # WALL i RUNS FROM points[i] TO points[i + 1].
+    def __init__(self, name, room_type, points, height, floor_mat, wall_mat, tile_size="30x30 cm",
+                 wall_finishes=None, openings=()):
+        self.name = name
+        self.room_type = room_type
+        self.points = [(float(x), float(y)) for x, y in points]
+        self.height = float(height)
+        self.floor_mat = floor_mat.strip()
+        self.wall_mat = wall_mat.strip()
+        self.tile_size = tile_size.strip()
+        self.wall_finishes = {int(i): m.strip() for i, m in (wall_finishes or {}).items()}
+        self.openings = [o if isinstance(o, Opening) else Opening(*o) for o in openings]
+        self.validate()
+
+    @classmethod
+    def rectangular(cls, name, room_type, width, length, height, floor_mat, wall_mat, tile_size="30x30 cm",
+                    **kwargs):
+        return cls(name, room_type, rectangle(width, length), height, floor_mat, wall_mat, tile_size, **kwargs)
+
+    def validate(self):
+        if len(self.points) < 3 or not all(math.isfinite(v) for p in self.points for v in p):
+            raise ValueError(f"{self.name}: a floor plan needs at least 3 corners")
+        if polygon_area(self.points) <= EPS:
+            raise ValueError(f"{self.name}: floor plan has no area")
+        if not self.height > 0:
+            raise ValueError(f"{self.name}: height must be greater than 0")
+        walls = wall_lengths(self.points)
+        for i in self.wall_finishes:
+            if not 0 <= i < len(walls):
+                raise ValueError(f"{self.name}: no wall {i} (walls are 0..{len(walls) - 1})")
+        used = [0.0] * len(walls)
+        for o in self.openings:
+            if not 0 <= o.wall < len(walls):
+                raise ValueError(f"{self.name}: opening on missing wall {o.wall}")
+            if o.width <= 0 or o.height <= 0 or o.height > self.height:
+                raise ValueError(f"{self.name}: opening {o.width} x {o.height} m does not fit the wall height")
+            used[o.wall] += o.width
+            if used[o.wall] > walls[o.wall] + EPS:
+                raise ValueError(f"{self.name}: openings are wider than wall {o.wall}")
+
+    def replace(self, **changes):
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return Room(**values)
+
+    # GRAPH INPUTS (HASHABLE, COMPARED TO DECIDE WHAT AN EDIT INVALIDATES)
+    def shape(self):
+        return (tuple(self.points), self.height, tuple(o.key() for o in self.openings))
+
+    def finish(self):
+        return (self.room_type, self.floor_mat, self.wall_mat, self.tile_size,
+                tuple(sorted(self.wall_finishes.items())))
+
+
+class DependencyGraph:
+    def __init__(self):
+        self._values = {}
+        self._rules = {}
+        self._dependents = {}
+        self._dirty = set()
+        self.recomputed = {}
+
+    # INPUT NODE. AN EQUAL VALUE IS A NO-OP, SO RE-SAVING AN UNCHANGED ROOM COSTS NOTHING
+    def set(self, key, value):
+        if key in self._values and self._values[key] == value:
+            return False
+        self._values[key] = value
+        self._invalidate(key)
+        return True
+
+    # DERIVED NODE: value = fn(*values of deps)
+    def define(self, key, deps, fn):
+        self.discard(key, keep_dependents=True)
+        self._rules[key] = (tuple(deps), fn)
+        for dep in deps:
+            self._dependents.setdefault(dep, set()).add(key)
+        self._dirty.add(key)
+        self._invalidate(key)
+
+    def discard(self, key, keep_dependents=False):
+        rule = self._rules.pop(key, None)
+        if rule is not None:
+            for dep in rule[0]:
+                self._dependents.get(dep, set()).discard(key)
+        self._values.pop(key, None)
+        self._dirty.discard(key)
+        if not keep_dependents:
+            self._invalidate(key)
+            self._dependents.pop(key, None)
+
+    def _invalidate(self, key):
+        stack = list(self._dependents.get(key, ()))
+        while stack:
+            node = stack.pop()
+            if node not in self._dirty:
+                self._dirty.add(node)
+                stack.extend(self._dependents.get(node, ()))
+
+    def get(self, key):
+        if key in self._dirty:
+            deps, fn = self._rules[key]
+            self._values[key] = fn(*[self.get(dep) for dep in deps])
+            self._dirty.discard(key)
+            kind = key[0] if isinstance(key, tuple) else key
+            self.recomputed[kind] = self.recomputed.get(kind, 0) + 1
+        return self._values[key]
+
+    def is_dirty(self, key):
+        return key in self._dirty
+
+
+def room_geometry(shape):
+    points, height, openings = shape
+    # CORNERS SNAP TO WHOLE MILLIMETRES FIRST (ROUNDING POINT 1 IN pricing.py), THEN THE
+    # FLOOR IS AN EXACT INTEGER SHOELACE SUM, SO A RECTANGLE PRICES LIKE calculate_project
+    corners_mm = [(to_mm(x), to_mm(y)) for x, y in points]
+    height_mm = to_mm(height)
+    walls = []
+    for i, length_mm in enumerate(wall_lengths(corners_mm)):
+        length_mm = math.floor(length_mm + 0.5)
+        length = length_mm / 1000
+        gross_mm2 = length_mm * height_mm
+        cut_out_mm2 = sum(to_mm(w) * to_mm(h) for wall, w, h, _ in openings if wall == i)
+        walls.append({"wall": i, "length": length, "gross_area": gross_mm2 / MM2_PER_SQM,
+                      "openings_area": cut_out_mm2 / MM2_PER_SQM, "net_area": (gross_mm2 - cut_out_mm2) / MM2_PER_SQM,
+                      "net_mm2": gross_mm2 - cut_out_mm2})
+    floor_mm2 = div_half_up(abs(twice_area(corners_mm)), 2)
+    return {
+        "floor_area": floor_mm2 / MM2_PER_SQM,
+        "floor_mm2": floor_mm2,
+        "perimeter": sum(w["length"] for w in walls),
+        "walls": walls
+    }
+
+
+# SAME PRICING RULES AS RenovationLogic._calculate_project. WALLS ARE PRICED AS ONE
+# LINE PER FINISH, SO A ROOM WITH ONE FINISH COSTS EXACTLY WHAT calculate_project SAYS.
+def room_cost(name, geometry, finish):
+    room_type, floor_mat, wall_mat, tile_size, overrides = finish
+    overrides = dict(overrides)
+    mat_catalog = database.catalog
+    # ONE SNAPSHOT FOR THE WHOLE ROOM, SO A HOT RELOAD CANNOT SPLIT THE CHECK FROM THE PRICES
+    is_safe, message = RenovationLogic.check_safety(room_type, floor_mat, mat_catalog)
+    missing = sorted({m for m in [wall_mat, *overrides.values()] if mat_catalog.get(m) is None})
+    if is_safe and missing:
+        is_safe, message = False, f"Error: Material not found: {', '.join(missing)}"
+
+    out = {"name": name, "room_type": room_type, "is_safe": is_safe, "message": message,
+           "floor_mat": floor_mat, "tile_size": tile_size, "floor_area": geometry["floor_area"],
+           "perimeter": geometry["perimeter"], "tiles_needed": 0, "floor_price": 0.0, "wall_area": 0.0,
+           "openings_area": 0.0, "walls": [], "wall_lines": {}, "floor_cost_cents": 0, "wall_cost_cents": 0,
+           "total_cost_cents": 0}
+    if is_safe:
+        f_row = mat_catalog[floor_mat]
+        wastage_factor = TILE_WASTAGE.get(tile_size, DEFAULT_WASTAGE)
+        # [AIMAN] ADD WASTAGE FACTOR TO CALCULATION
+        out["tiles_needed"] = int((geometry["floor_area"] / tile_area_sqm(tile_size)) * wastage_factor)
+        out["floor_price"] = f_row.price
+        out["floor_cost_cents"] = line_cents(geometry["floor_mm2"], f_row.price_cents, to_basis_points(wastage_factor))
+        net_mm2 = {}
+        for wall in geometry["walls"]:
+            material = overrides.get(wall["wall"], wall_mat)
+            out["walls"].append(dict(wall, material=material))
+            out["wall_area"] += wall["net_area"]
+            out["openings_area"] += wall["openings_area"]
+            net_mm2[material] = net_mm2.get(material, 0) + wall["net_mm2"]
+        for material, mm2 in net_mm2.items():
+            cents = line_cents(mm2, mat_catalog[material].price_cents)
+            out["wall_lines"][material] = {"area": mm2 / MM2_PER_SQM, "price": mat_catalog[material].price,
+                                           "cost_cents": cents}
+            out["wall_cost_cents"] += cents
+        out["total_cost_cents"] = out["floor_cost_cents"] + out["wall_cost_cents"]
+    for key in ("floor_cost", "wall_cost", "total_cost"):
+        out[key] = from_cents(out[key + "_cents"])
+    return out
+
+
+MONEY_KEYS = ("floor_cost", "wall_cost", "total_cost")
+
+
+# MONEY IS SUMMED IN CENTS AND ONLY CONVERTED TO RM AT THE END
+def project_totals(*rooms):
+    totals = {"rooms": len(rooms), "rejected": 0, "floor_area": 0.0, "wall_area": 0.0, "tiles_needed": 0,
+              "floor_cost_cents": 0, "wall_cost_cents": 0, "total_cost_cents": 0}
+    for r in rooms:
+        if not r["is_safe"]:
+            totals["rejected"] += 1
+            continue
+        for key in ("floor_area", "wall_area", "tiles_needed", "floor_cost_cents", "wall_cost_cents",
+                    "total_cost_cents"):
+            totals[key] += r[key]
+    for key in MONEY_KEYS:
+        totals[key] = from_cents(totals[key + "_cents"])
+    return totals
+
+
+# AREA AND COST PER MATERIAL (FLOOR AREA IS BEFORE WASTAGE, WALL AREA IS NET OF OPENINGS)
+def by_material(*rooms):
+    out = {}
+    for r in rooms:
+        if not r["is_safe"]:
+            continue
+        lines = [(r["floor_mat"], r["floor_area"], r["floor_cost_cents"])]
+        lines += [(m, line["area"], line["cost_cents"]) for m, line in r["wall_lines"].items()]
+        for material, area, cents in lines:
+            entry = out.setdefault(material, {"area": 0.0, "cost_cents": 0})
+            entry["area"] += area
+            entry["cost_cents"] += cents
+    for entry in out.values():
+        entry["cost"] = from_cents(entry["cost_cents"])
+    return out
+
+
+def by_room_type(*rooms):
+    out = {}
+    for r in rooms:
+        if not r["is_safe"]:
+            continue
+        entry = out.setdefault(r["room_type"], {"rooms": 0, "total_cost_cents": 0})
+        entry["rooms"] += 1
+        entry["total_cost_cents"] += r["total_cost_cents"]
+    for entry in out.values():
+        entry["total_cost"] = from_cents(entry["total_cost_cents"])
+    return out
+
+
+ROLLUPS = {"totals": project_totals, "by_material": by_material, "by_room_type": by_room_type}
+
+
+class Project:
+    def __init__(self, name="", rooms=()):
+        self.name = name
+        self.rooms = OrderedDict()
+        self.graph = DependencyGraph()
+        self.graph.set("pricing", pricing_stamp())
+        for room in rooms:
+            self.add_room(room)
+
+    def add_room(self, room):
+        if room.name in self.rooms:
+            raise ValueError(f"Room {room.name!r} already exists")
+        self.rooms[room.name] = room
+        name = room.name
+        self.graph.set(("shape", name), room.shape())
+        self.graph.set(("finish", name), room.finish())
+        self.graph.define(("geometry", name), [("shape", name)], room_geometry)
+        self.graph.define(("cost", name), [("geometry", name), ("finish", name), "pricing"],
+                          lambda geometry, finish, _pricing: room_cost(name, geometry, finish))
+        self._define_rollups()
+        return room
+
+    # ONLY THE INPUTS THAT ACTUALLY CHANGED ARE SET, SO A FINISH EDIT KEEPS THE GEOMETRY
+    def update_room(self, name, **changes):
+        room = self.rooms[name].replace(**changes)
+        if room.name != name:
+            raise ValueError("Rename a room by removing it and adding it again")
+        self.rooms[name] = room
+        self.graph.set(("shape", name), room.shape())
+        self.graph.set(("finish", name), room.finish())
+        return room
+
+    def remove_room(self, name):
+        del self.rooms[name]
+        for kind in ("cost", "geometry", "shape", "finish"):
+            self.graph.discard((kind, name))
+        self._define_rollups()
+
+    def _define_rollups(self):
+        deps = [("cost", name) for name in self.rooms]
+        for key, fn in ROLLUPS.items():
+            self.graph.define(key, deps, fn)
+
+    # CATALOG SWAPS (database.set_catalog) RE-PRICE EVERY ROOM BUT KEEP ALL GEOMETRY
+    def _sync_pricing(self):
+        self.graph.set("pricing", pricing_stamp())
+
+    def room_result(self, name):
+        self._sync_pricing()
+        return self.graph.get(("cost", name))
+
+    def totals(self):
+        self._sync_pricing()
+        return self.graph.get("totals")
+
+    def by_material(self):
+        self._sync_pricing()
+        return self.graph.get("by_material")
+
+    def by_room_type(self):
+        self._sync_pricing()
+        return self.graph.get("by_room_type")
+
+    def summary(self):
+        return {"name": self.name, "rooms": [self.room_result(name) for name in self.rooms],
+                "totals": self.totals(), "by_material": self.by_material(), "by_room_type": self.by_room_type()}
+
+    def recompute_counts(self):
+        return dict(self.graph.recomputed)
@@ -0,0 +1,244 @@
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# PERSISTENT QUOTE HISTORY. EVERY COMPUTED QUOTE IS QUEUED HERE AND WRITTEN BY A
+# BACKGROUND THREAD IN BATCHES (ONE TRANSACTION PER BATCH), SO THE TK THREAD
+# NEVER WAITS ON DISK. WAL MODE LETS READERS RUN WHILE THE WRITER COMMITS.
+DB_PATH = os.environ.get("RENOVISION_QUOTES_DB",
+                         os.path.join(os.path.expanduser("~"), ".local", "share", "renovision", "quotes.db"))
+BATCH_SIZE = 500
+FLUSH_INTERVAL = 0.25
+
+COLUMNS = ("order_id", "created_at", "room_type", "floor_mat", "wall_mat", "tile_size",
+           "width", "length", "height", "budget", "member", "discount",
+           "service_name", "service_fee", "total_cost", "result")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    id INTEGER PRIMARY KEY,
+    order_id TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL,
+    room_type TEXT,
+    floor_mat TEXT,
+    wall_mat TEXT,
+    tile_size TEXT,
+    width REAL,
+    length REAL,
+    height REAL,
+    budget REAL,
+    member INTEGER,
+    discount REAL,
+    service_name TEXT,
+    service_fee REAL,
+    total_cost REAL,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_quotes_created ON quotes (created_at);
+CREATE INDEX IF NOT EXISTS idx_quotes_room ON quotes (room_type, created_at);
+CREATE INDEX IF NOT EXISTS idx_quotes_floor ON quotes (floor_mat, created_at);
+CREATE INDEX IF NOT EXISTS idx_quotes_wall ON quotes (wall_mat, created_at);
+"""
+
+# A LATER SUBMIT WITH THE SAME order_id (E.G. WHEN THE INVOICE PICKS A SERVICE) UPDATES THE ROW
+UPSERT = (
+    f"INSERT INTO quotes ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)}) "
+    "ON CONFLICT(order_id) DO UPDATE SET "
+    + ", ".join(f"{col} = COALESCE(excluded.{col}, {col})" for col in COLUMNS
+                if col not in ("order_id", "created_at"))
+)
+
+# RESULT FIELDS ALREADY STORED AS COLUMNS OR NOT WORTH KEEPING IN THE JSON BLOB
+RESULT_SKIP = {"order_id", "discount", "total_cost"}
+
+
+def connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+# quote: THE calculate_project DICT (WITH discount, AND order_id) PLUS THE INPUTS
+def to_row(quote):
+    result = {k: v for k, v in quote.items() if k not in RESULT_SKIP and k not in COLUMNS}
+    member = quote.get("member")
+    return (
+        quote["order_id"],
+        quote.get("created_at") or time.time(),
+        quote.get("room_type"),
+        quote.get("floor_mat"),
+        quote.get("wall_mat"),
+        quote.get("tile_size"),
+        quote.get("width"),
+        quote.get("length"),
+        quote.get("height"),
+        quote.get("budget"),
+        None if member is None else int(bool(member)),
+        quote.get("discount"),
+        quote.get("service_name"),
+        quote.get("service_fee"),
+        quote.get("total_cost"),
+        json.dumps(result) if result else None
+    )
+
+
+def from_row(row):
+    quote = dict(zip(COLUMNS, row))
+    result = quote.pop("result")
+    if result:
+        quote.update(json.loads(result))
+    if quote["member"] is not None:
+        quote["member"] = bool(quote["member"])
+    return quote
+
+
+class QuoteStore:
+    def __init__(self, path=DB_PATH, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._writer = connect(path)
+        self._writer.executescript(SCHEMA)
+        self._writer.commit()
+        # ":memory:" DATABASES ARE PER-CONNECTION, SO READS SHARE THE WRITER THERE AND
+        # THE WRITER THREAD THEN TAKES THE READ LOCK TOO (ONE USER OF THE CONNECTION AT A TIME)
+        self._reader = self._writer if path == ":memory:" else connect(path)
+        self._read_lock = threading.Lock()
+        self._write_lock = self._read_lock if self._reader is self._writer else threading.Lock()
+        self._closed = False
+        self._queue = queue.Queue()
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name="quote-writer", daemon=True)
+        self._thread.start()
+
+    # NON-BLOCKING: THE ROW IS BUILT HERE, THE DISK WRITE HAPPENS ON THE WRITER THREAD
+    def submit(self, quote):
+        self._queue.put(to_row(quote))
+
+    def submit_many(self, quotes):
+        for quote in quotes:
+            self.submit(quote)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        try:
+            with self._write_lock, self._writer:
+                self._writer.executemany(UPSERT, batch)
+            self.written += len(batch)
+            self.batches += 1
+        except sqlite3.Error as e:
+            self.errors += 1
+            print(f"Quote Store Error: {e}")
+
+    # BLOCKS UNTIL EVERYTHING SUBMITTED SO FAR IS ON DISK
+    def flush(self):
+        self._queue.join()
+
+    # WRITES EVERYTHING STILL QUEUED, THEN CLOSES BOTH CONNECTIONS (SAFE TO CALL TWICE)
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        with self._read_lock:
+            if self._reader is not self._writer:
+                self._reader.close()
+            self._writer.close()
+
+    def _query(self, sql, params):
+        with self._read_lock:
+            return [from_row(row) for row in self._reader.execute(sql, params)]
+
+    def get(self, order_id):
+        rows = self._query(f"SELECT {', '.join(COLUMNS)} FROM quotes WHERE order_id = ?", (order_id,))
+        return rows[0] if rows else None
+
+    # NEWEST FIRST. EACH FILTER WALKS ONE (column, created_at) INDEX BACKWARDS AND
+    # STOPS AFTER limit ROWS, SO THE COST DOES NOT GROW WITH THE TABLE SIZE.
+    def recent(self, limit=50, room_type=None, material=None, since=None, until=None):
+        cols = ", ".join(COLUMNS)
+        where, params = [], []
+        if room_type is not None:
+            where.append("room_type = ?")
+            params.append(room_type)
+        if since is not None:
+            where.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("created_at < ?")
+            params.append(until)
+        if material is None:
+            clause = f" WHERE {' AND '.join(where)}" if where else ""
+            sql = f"SELECT {cols} FROM quotes{clause} ORDER BY created_at DESC LIMIT ?"
+            return self._query(sql, params + [limit])
+        # FLOOR OR WALL MATERIAL: TWO INDEXED SCANS, MERGED
+        parts = []
+        for column in ("floor_mat", "wall_mat"):
+            clause = " AND ".join(where + [f"{column} = ?"])
+            parts.append(f"SELECT * FROM (SELECT {cols} FROM quotes WHERE {clause} ORDER BY created_at DESC LIMIT ?)")
+        sql = f"{' UNION '.join(parts)} ORDER BY created_at DESC LIMIT ?"
+        part_params = params + [material, limit]
+        return self._query(sql, part_params + part_params + [limit])
+
+    def count(self):
+        with self._read_lock:
+            return self._reader.execute("SELECT COUNT(*) FROM quotes").fetchone()[0]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+# THE SHARED STORE IS CLOSED AT EXIT SO THE WRITER'S LAST BATCH IS NOT LOST WITH
+# ITS DAEMON THREAD (THE GUI ALSO CLOSES IT WHEN THE WINDOW IS CLOSED)
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = QuoteStore()
+        return _store
+
+
+def close_store():
+    global _store
+    with _store_lock:
+        store, _store = _store, None
+    if store is not None:
+        store.close()
+
+
+atexit.register(close_store)
@@ -0,0 +1,121 @@
+import database
+from database import RenovationLogic, MEMBER_DISCOUNT_BP, tile_wastage
+from pricing import to_basis_points, floor_cents, wall_cents, discount_cents
+
+# LIVE ESTIMATE FOR CalculatorPage. EVERY OUTPUT NAMES THE INPUTS / OUTPUTS IT IS
+# BUILT FROM; AN UPDATE RECOMPUTES ONLY WHAT SITS DOWNSTREAM OF A VALUE THAT REALLY
+# CHANGED, AND STOPS WHERE A RECOMPUTED OUTPUT COMES OUT THE SAME (E.G. A NEW
+# CATALOG SNAPSHOT THAT KEEPS THE FLOOR IMAGE DOES NOT RE-RENDER THE FLOOR).
+# ENTRIES ARE IN DEPENDENCY ORDER. DEPENDS_ON ONLY DECIDES WHAT IS RECOMPUTED; THE
+# MONEY ITSELF COMES FROM THE SAME pricing / database FUNCTIONS AS calculate_project.
+DEPENDS_ON = {
+    "safety": ("room_type", "floor_mat", "catalog"),
+    "floor_cost": ("width", "length", "floor_mat", "tile_size", "catalog"),
+    "wall_cost": ("width", "length", "height", "wall_mat", "catalog"),
+    "total": ("floor_cost", "wall_cost", "member"),
+    "budget_feedback": ("total", "budget"),
+    "floor_texture": ("floor_mat", "catalog"),
+    "wall_texture": ("wall_mat", "catalog"),
+    # PREVIEW LAYERS: PARAMETERS OF render.RoomRenderer.floor_layer / wall_layer
+    "floor_layer": ("floor_texture", "tile_size", "width", "length"),
+    "wall_layer": ("wall_texture", "width", "length", "height")
+}
+INPUTS = ("room_type", "width", "length", "height", "budget", "floor_mat", "wall_mat", "tile_size", "member",
+          "catalog")
+
+
+def _record(values, key):
+    name = values[key]
+    return None if name is None else values["catalog"].get(name)
+
+
+def _safety(v):
+    if v["room_type"] is None or v["floor_mat"] is None:
+        return None
+    return RenovationLogic.check_safety(v["room_type"], v["floor_mat"], v["catalog"])
+
+
+def _floor_cost(v):
+    record = _record(v, "floor_mat")
+    if record is None or v["width"] is None or v["length"] is None:
+        return None
+    return floor_cents(v["width"], v["length"], record.price_cents, to_basis_points(tile_wastage(v["tile_size"])))
+
+
+def _wall_cost(v):
+    record = _record(v, "wall_mat")
+    if record is None or v["width"] is None or v["length"] is None or v["height"] is None:
+        return None
+    return wall_cents(v["width"], v["length"], v["height"], record.price_cents)
+
+
+# [AIMAN] DISCOUNT CALCULATION LOGIC (IN CENTS, SEE pricing.py)
+def _total(v):
+    if v["floor_cost"] is None or v["wall_cost"] is None:
+        return None
+    subtotal = v["floor_cost"] + v["wall_cost"]
+    discount = discount_cents(subtotal, bool(v["member"]), MEMBER_DISCOUNT_BP)
+    return {"subtotal_cents": subtotal, "discount_cents": discount, "total_cents": subtotal - discount}
+
+
+def _budget_feedback(v):
+    if v["total"] is None or v["budget"] is None:
+        return None
+    return v["total"]["total_cents"], v["budget"]
+
+
+def _texture(key):
+    def compute(v):
+        record = _record(v, key)
+        return None if record is None else record.image_file
+    return compute
+
+
+def _layer(*keys):
+    def compute(v):
+        params = tuple(v[k] for k in keys)
+        return None if None in params else params
+    return compute
+
+
+COMPUTE = {
+    "safety": _safety,
+    "floor_cost": _floor_cost,
+    "wall_cost": _wall_cost,
+    "total": _total,
+    "budget_feedback": _budget_feedback,
+    "floor_texture": _texture("floor_mat"),
+    "wall_texture": _texture("wall_mat"),
+    "floor_layer": _layer(*DEPENDS_ON["floor_layer"]),
+    "wall_layer": _layer(*DEPENDS_ON["wall_layer"])
+}
+
+
+class LiveQuote:
+    def __init__(self):
+        self.values = dict.fromkeys(INPUTS + tuple(DEPENDS_ON))
+        self.recomputed = dict.fromkeys(DEPENDS_ON, 0)
+
+    # NEW INPUT VALUES (None = MISSING OR INVALID). RETURNS THE OUTPUTS WHOSE VALUE
+    # CHANGED, IN DEPENDENCY ORDER. catalog DEFAULTS TO THE CURRENT SNAPSHOT.
+    def update(self, **inputs):
+        unknown = set(inputs) - set(INPUTS)
+        if unknown:
+            raise KeyError(f"Unknown inputs: {', '.join(sorted(unknown))}")
+        inputs.setdefault("catalog", database.catalog)
+        changed = {name for name, value in inputs.items() if self.values[name] != value}
+        self.values.update(inputs)
+        out = []
+        for name, deps in DEPENDS_ON.items():
+            if not changed.intersection(deps):
+                continue
+            value = COMPUTE[name](self.values)
+            self.recomputed[name] += 1
+            if value != self.values[name]:
+                self.values[name] = value
+                changed.add(name)
+                out.append(name)
+        return out
+
+    def __getitem__(self, name):
+        return self.values[name]
@@ -0,0 +1,351 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from assets import ASSETS, TEXTURE_SIZE, TextureCache
+from database import parse_tile_size, tile_area_sqm
+from timing import TIMINGS
+
+# 3D ROOM PREVIEW RENDERING (USED BY CalculatorPage.run_calc)
+DEFAULT_CANVAS_SIZE = TEXTURE_SIZE
+CEILING_COLOR = (220, 220, 220)
+OUTLINE_COLOR = "grey"
+
+# PERSPECTIVE TILING: ONE FLOOR TILE / ONE WALL PATTERN REPEAT IS SAMPLED FROM A
+# TEXTURE OF THIS SIZE, WALL FINISHES REPEAT EVERY WALL_REPEAT_M METRES
+TILE_TEXTURE_SIZE = (128, 128)
+WALL_TEXTURE_SIZE = (256, 256)
+WALL_REPEAT_M = 1.0
+GROUT_FRACTION = 0.03
+GROUT_SHADE = 0.55
+
+# SAMPLED LAYERS (ONE uint32 PER COVERED PIXEL) AND PACKED TEXTURES KEPT PER RENDERER, SO A
+# WALL-ONLY CHANGE REUSES THE FLOOR LAYER AND VICE VERSA
+LAYER_CACHE_SIZE = 8
+WALLS = ("back", "left", "right")
+CEILING_TEXEL = np.array([CEILING_COLOR + (255,)], dtype=np.uint8).view(np.uint32)[0]
+
+
+class RenderCancelled(Exception):
+    pass
+
+
+# ROOM GEOMETRY FOR A CANVAS (BACK WALL IS THE CENTRE RECTANGLE)
+def room_geometry(size):
+    w, h = size
+    x0, x1 = w // 4, w * 3 // 4
+    y0, y1 = h // 5, h * 3 // 5
+    return {
+        "floor": [(0, h), (w, h), (x1, y1), (x0, y1)],
+        "ceiling": [(0, 0), (w, 0), (x1, y0), (x0, y0)],
+        "back": (x0, y0, x1, y1),
+        "lines": [[(0, 0), (x0, y0)], [(w, 0), (x1, y0)], [(0, h), (x0, y1)], [(w, h), (x1, y1)]]
+    }
+
+
+# UNIT-SQUARE -> QUAD HOMOGRAPHY. CORNERS ARE THE IMAGES OF (0,0), (1,0), (1,1), (0,1)
+def square_to_quad(quad):
+    (x0, y0), (x1, y1), (x2, y2), (x3, y3) = quad
+    dx1, dx2, dx3 = x1 - x2, x3 - x2, x0 - x1 + x2 - x3
+    dy1, dy2, dy3 = y1 - y2, y3 - y2, y0 - y1 + y2 - y3
+    det = dx1 * dy2 - dx2 * dy1
+    g = (dx3 * dy2 - dx2 * dy3) / det
+    h = (dx1 * dy3 - dx3 * dy1) / det
+    return np.array([
+        [x1 - x0 + g * x1, x3 - x0 + h * x3, x0],
+        [y1 - y0 + g * y1, y3 - y0 + h * y3, y0],
+        [g, h, 1.0]
+    ])
+
+
+# SURFACES OF THE ROOM AS (u, v) QUADS: u RUNS ALONG THE SURFACE, v FROM TOP/BACK
+# TO BOTTOM/FRONT. ORDER IS THE PAINT PRIORITY WHERE EDGES TOUCH.
+def surface_quads(size):
+    w, h = size
+    geo = room_geometry(size)
+    x0, y0, x1, y1 = geo["back"]
+    return {
+        "back": [(x0, y0), (x1, y0), (x1, y1), (x0, y1)],
+        "floor": [(x0, y1), (x1, y1), (w, h), (0, h)],
+        "left": [(0, 0), (x0, y0), (x0, y1), (0, h)],
+        "right": [(w, 0), (x1, y0), (x1, y1), (w, h)]
+    }
+
+
+# INVERSE-MAPPED (u, v) FOR EVERY PIXEL OF EACH SURFACE, FOR ROWS [row0, row1).
+# THIS IS THE EXPENSIVE PART AND ONLY DEPENDS ON THE CANVAS SIZE.
+def surface_maps(size, row0=0, row1=None):
+    w, h = size
+    row1 = h if row1 is None else row1
+    ys, xs = np.mgrid[row0:row1, 0:w]
+    px = xs.ravel().astype(np.float64) + 0.5
+    py = ys.ravel().astype(np.float64) + 0.5
+    taken = np.zeros(px.shape, dtype=bool)
+    maps = {}
+    for name, quad in surface_quads(size).items():
+        inv = np.linalg.inv(square_to_quad(quad))
+        den = inv[2, 0] * px + inv[2, 1] * py + inv[2, 2]
+        u = (inv[0, 0] * px + inv[0, 1] * py + inv[0, 2]) / den
+        v = (inv[1, 0] * px + inv[1, 1] * py + inv[1, 2]) / den
+        inside = (u >= 0) & (u <= 1) & (v >= 0) & (v <= 1) & ~taken
+        taken |= inside
+        idx = np.flatnonzero(inside)
+        maps[name] = (idx.astype(np.int32), u[idx].astype(np.float32), v[idx].astype(np.float32))
+    return maps
+
+
+# SAME PARSER AS THE QUOTE AND layout.py; A SIZE THE QUOTE PRICES WITH THE DEFAULT AREA IS DRAWN AS A SQUARE OF IT
+def tile_dims_m(tile_size_str):
+    try:
+        return parse_tile_size(tile_size_str)
+    except ValueError:
+        side = tile_area_sqm(tile_size_str) ** 0.5
+        return side, side
+
+
+# PACK AN RGB TEXTURE AS ONE uint32 PER TEXEL (R, G, B, 255) SO SAMPLING IS A SINGLE GATHER
+def pack_texture(img):
+    rgba = np.asarray(img.convert("RGBA")).copy()
+    rgba[..., 3] = 255
+    return rgba.view(np.uint32)[..., 0]
+
+
+# SAMPLE A REPEATING PACKED TEXTURE AT (u, v) * repeats. stagger OFFSETS EVERY
+# OTHER COLUMN BY HALF A TILE (PLANK LAYOUT), grout DARKENS THE TILE EDGES.
+def sample_tiled(tex, u, v, repeats_u, repeats_v, stagger=False, grout=0.0):
+    th, tw = tex.shape
+    # u, v >= 0 SO TRUNCATION IS FLOOR: TEXEL COORDINATE ACROSS ALL REPEATS
+    gu = (u * np.float32(repeats_u * tw)).astype(np.int32)
+    gv = (v * np.float32(repeats_v * th)).astype(np.int32)
+    if stagger:
+        gv += ((gu // tw) & 1) * (th // 2)
+    iu = gu % tw
+    iv = gv % th
+    out = tex.ravel()[iv * tw + iu]
+    if grout > 0:
+        edge = (iu < int(grout * tw)) | (iv < int(grout * th))
+        shaded = out[edge].view(np.uint8).reshape(-1, 4)
+        shaded[:, :3] = (shaded[:, :3] * GROUT_SHADE).astype(np.uint8)
+        out[edge] = shaded.view(np.uint32).ravel()
+    return out
+
+
+# CEILING BLOCK AND OUTLINES IN ONE RGBA LAYER, FOR CANVAS ROWS [row0, row1)
+def draw_overlay(size, row0=0, row1=None, line_width=2):
+    w, h = size
+    row1 = h if row1 is None else row1
+    geo = room_geometry(size)
+
+    def shift(points):
+        return [(x, y - row0) for x, y in points]
+
+    overlay = Image.new("RGBA", (w, row1 - row0), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    draw.polygon(shift(geo["ceiling"]), fill=CEILING_COLOR + (255,))
+    x0, y0, x1, y1 = geo["back"]
+    draw.rectangle((x0, y0 - row0, x1, y1 - row0), outline=OUTLINE_COLOR, width=line_width)
+    for line in geo["lines"]:
+        draw.line(shift(line), fill=OUTLINE_COLOR, width=line_width)
+    return overlay
+
+
+# FLOOR TILES SCALED TO THE REAL ROOM AND TILE SIZE (PLANKS STAGGERED, GROUT DARKENED)
+def sample_floor(tex, u, v, tile_size_str, width, length):
+    tile_w, tile_l = tile_dims_m(tile_size_str)
+    return sample_tiled(tex, u, v, width / tile_w, length / tile_l,
+                        stagger=max(tile_w, tile_l) >= 3 * min(tile_w, tile_l), grout=GROUT_FRACTION)
+
+
+# RUN OF EACH VISIBLE WALL, IN WALLS ORDER
+def wall_runs(width, length):
+    return width, length, length
+
+
+# WALL FINISH REPEATING EVERY WALL_REPEAT_M ALONG A WALL OF LENGTH run
+def sample_wall(tex, u, v, run, height):
+    return sample_tiled(tex, u, v, run / WALL_REPEAT_M, height / WALL_REPEAT_M)
+
+
+# PRECOMPUTES THE STATIC PARTS OF THE PREVIEW ONCE PER CANVAS SIZE SO A RENDER
+# IS JUST: COPY WALL, PASTE FLOOR THROUGH MASK, PASTE CEILING+OUTLINE LAYER.
+class RoomRenderer:
+    def __init__(self, size=DEFAULT_CANVAS_SIZE, textures=None):
+        self.size = tuple(size)
+        self.textures = TextureCache() if textures is None else textures
+        geo = room_geometry(self.size)
+
+        self.floor_mask = Image.new("L", self.size, 0)
+        ImageDraw.Draw(self.floor_mask).polygon(geo["floor"], fill=255)
+
+        self.overlay = draw_overlay(self.size)
+        self._maps = None
+        self._layers = OrderedDict()
+        self._layers_lock = threading.Lock()
+        self.layer_hits = 0
+        self.layer_misses = 0
+        self.decodes = 0
+
+    # HOMOGRAPHY COORDINATE MAPS, BUILT ON FIRST TILED RENDER AND KEPT
+    @property
+    def maps(self):
+        if self._maps is None:
+            self._maps = surface_maps(self.size)
+        return self._maps
+
+    # cancelled() IS CHECKED BETWEEN STAGES SO A SUPERSEDED RENDER STOPS EARLY
+    def render(self, wall_path, floor_path, cancelled=None):
+        wall = self.textures.get(wall_path, self.size)
+        if cancelled is not None and cancelled():
+            raise RenderCancelled()
+        floor = self.textures.get(floor_path, self.size)
+        if cancelled is not None and cancelled():
+            raise RenderCancelled()
+        final_img = wall.copy()
+        final_img.paste(floor, (0, 0), self.floor_mask)
+        final_img.paste(self.overlay, (0, 0), self.overlay)
+        return final_img
+
+    # PERSPECTIVE-CORRECT TILED PREVIEW: FLOOR TILES SCALED TO THE REAL ROOM AND
+    # TILE SIZE, WALL FINISH REPEATING EVERY WALL_REPEAT_M ON EACH VISIBLE WALL.
+    # FLOOR AND WALLS ARE SEPARATE CACHED LAYERS; ONLY A MISSING LAYER IS SAMPLED
+    # AND ONLY A TEXTURE NOT PACKED BEFORE IS DECODED.
+    def render_tiled(self, wall_path, floor_path, tile_size_str, width, length, height, cancelled=None):
+        floor = self.floor_layer(floor_path, tile_size_str, width, length, cancelled)
+        if cancelled is not None and cancelled():
+            raise RenderCancelled()
+        walls = self.wall_layer(wall_path, width, length, height, cancelled)
+        if cancelled is not None and cancelled():
+            raise RenderCancelled()
+        with TIMINGS.stage("preview.composite"):
+            return self.composite(floor, walls)
+
+    def floor_layer(self, floor_path, tile_size_str, width, length, cancelled=None):
+        key = ("floor", floor_path, tile_size_str, width, length)
+        layer = self._cached_layer(key)
+        if layer is None:
+            floor_tex = self.packed(floor_path, TILE_TEXTURE_SIZE)
+            if cancelled is not None and cancelled():
+                raise RenderCancelled()
+            with TIMINGS.stage("preview.floor_layer"):
+                _, u, v = self.maps["floor"]
+                layer = sample_floor(floor_tex, u, v, tile_size_str, width, length)
+            self._store_layer(key, layer)
+        return layer
+
+    # THE THREE VISIBLE WALLS IN WALLS ORDER
+    def wall_layer(self, wall_path, width, length, height, cancelled=None):
+        key = ("wall", wall_path, width, length, height)
+        layer = self._cached_layer(key)
+        if layer is None:
+            wall_tex = self.packed(wall_path, WALL_TEXTURE_SIZE)
+            if cancelled is not None and cancelled():
+                raise RenderCancelled()
+            with TIMINGS.stage("preview.wall_layer"):
+                maps = self.maps
+                layer = tuple(sample_wall(wall_tex, maps[name][1], maps[name][2], run, height)
+                              for name, run in zip(WALLS, wall_runs(width, length)))
+            self._store_layer(key, layer)
+        return layer
+
+    # PACKED TEXTURES ARE KEPT WITH THE LAYERS (THE DECODED IMAGE IS ALSO IN self.textures)
+    def packed(self, path, size):
+        key = ("texture", path, size)
+        tex = self._cached_layer(key)
+        if tex is None:
+            with TIMINGS.stage("preview.decode"):
+                tex = pack_texture(self.textures.get(path, size))
+            self.decodes += 1
+            self._store_layer(key, tex)
+        return tex
+
+    def _cached_layer(self, key):
+        with self._layers_lock:
+            layer = self._layers.get(key)
+            if layer is None:
+                self.layer_misses += 1
+                return None
+            self._layers.move_to_end(key)
+            self.layer_hits += 1
+            return layer
+
+    def _store_layer(self, key, layer):
+        with self._layers_lock:
+            self._layers[key] = layer
+            if len(self._layers) > LAYER_CACHE_SIZE:
+                self._layers.popitem(last=False)
+
+    def composite(self, floor, walls):
+        maps = self.maps
+        pixels = np.empty(self.size[0] * self.size[1], dtype=np.uint32)
+        pixels[:] = CEILING_TEXEL
+        pixels[maps["floor"][0]] = floor
+        for name, layer in zip(WALLS, walls):
+            pixels[maps[name][0]] = layer
+
+        final_img = Image.frombuffer("RGBA", self.size, pixels, "raw", "RGBA", 0, 1).convert("RGB")
+        final_img.paste(self.overlay, (0, 0), self.overlay)
+        return final_img
+
+
+# TEXTURES COME FROM THE SHARED ASSET MANAGER (MEMORY LRU + ON-DISK CACHE)
+TEXTURES = ASSETS
+_renderers = {}
+_renderers_lock = threading.Lock()
+
+
+def get_renderer(size=DEFAULT_CANVAS_SIZE):
+    size = tuple(size)
+    with _renderers_lock:
+        if size not in _renderers:
+            _renderers[size] = RoomRenderer(size, TEXTURES)
+        return _renderers[size]
+
+
+# BACKGROUND PREVIEW RENDERING. ONLY THE NEWEST REQUEST IS EVER DELIVERED: A NEW
+# submit() CANCELS A QUEUED RENDER AND TELLS A RUNNING ONE TO STOP. RESULTS ARE
+# HANDED BACK ON THE TK THREAD BY POLLING WITH widget.after().
+class RenderWorker:
+    POLL_MS = 15
+
+    def __init__(self, widget, max_workers=2):
+        self.widget = widget
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preview")
+        self.generation = 0
+        self.future = None
+        self.superseded = 0
+
+    def is_current(self, generation):
+        return generation == self.generation
+
+    def submit(self, fn, on_done, on_error):
+        self.generation += 1
+        generation = self.generation
+        if self.future is not None and not self.future.done():
+            self.future.cancel()
+            self.superseded += 1
+        # fn RECEIVES A cancelled() CALLBACK IT CAN CHECK BETWEEN STAGES
+        self.future = self.executor.submit(fn, lambda: not self.is_current(generation))
+        self.widget.after(self.POLL_MS, self._poll, generation, self.future, on_done, on_error)
+        return generation
+
+    def _poll(self, generation, future, on_done, on_error):
+        if not self.is_current(generation):
+            return
+        if not future.done():
+            self.widget.after(self.POLL_MS, self._poll, generation, future, on_done, on_error)
+            return
+        try:
+            result = future.result()
+        except RenderCancelled:
+            return
+        except Exception as e:
+            on_error(e)
+            return
+        on_done(result)
+
+    def shutdown(self):
+        self.generation += 1
+        self.executor.shutdown(wait=False, cancel_futures=True)
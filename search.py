@@ -0,0 +1,121 @@
+import bisect
+import re
+import threading
+
+import numpy as np
+
+# MATERIAL SEARCH FOR LARGE CATALOGS. NAMES ARE SPLIT INTO LOWER-CASE TOKENS AND
+# KEPT IN ONE SORTED TOKEN LIST, SO A PREFIX IS TWO BISECTS AND A SLICE OF ROW
+# NUMBERS. TYPE, PRICE AND WATERPROOF FILTERS ARE NUMPY MASKS OVER THE CATALOG.
+TOKEN_RE = re.compile(r"[0-9a-z]+")
+MAX_RESULTS = None
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(str(text).lower())
+
+
+# THE SAME FILTERS FOR ONE RECORD (CATALOG RELOADS RE-CHECK ONLY THE ROWS THAT CHANGED)
+def record_matches(record, query="", mat_type=None, min_price=None, max_price=None, waterproof=None):
+    if mat_type is not None and record.type != mat_type:
+        return False
+    if min_price is not None and record.price < min_price:
+        return False
+    if max_price is not None and record.price > max_price:
+        return False
+    if waterproof is not None and record.waterproof != waterproof:
+        return False
+    query = query.strip().lower() if query else ""
+    if not query:
+        return True
+    lower = record.name.lower()
+    tokens = set(tokenize(lower)) | {lower}
+    if any(token.startswith(query) for token in tokens):
+        return True
+    words = tokenize(query)
+    if len(words) > 1 or (words and words[0] != query):
+        return all(any(token.startswith(word) for token in tokens) for word in words)
+    return False
+
+
+class MaterialIndex:
+    def __init__(self, mat_catalog):
+        self.catalog = mat_catalog
+        self.names = mat_catalog.names()
+        cols = mat_catalog.columns()
+        self.price = cols["price"]
+        self.waterproof = cols["waterproof"]
+        n = len(self.names)
+
+        # ONE MASK PER MATERIAL TYPE
+        self.type_masks = {}
+        for i, record in enumerate(mat_catalog):
+            mask = self.type_masks.get(record.type)
+            if mask is None:
+                mask = self.type_masks[record.type] = np.zeros(n, dtype=bool)
+            mask[i] = True
+
+        # (TOKEN, ROW) PAIRS SORTED BY TOKEN; A NAME'S FULL LOWER-CASE TEXT IS ALSO
+        # A TOKEN SO "solid w" STILL MATCHES AS ONE PREFIX
+        pairs = []
+        for row, name in enumerate(self.names):
+            lower = name.lower()
+            for token in set(tokenize(lower)) | {lower}:
+                pairs.append((token, row))
+        pairs.sort()
+        self.tokens = [token for token, _ in pairs]
+        self.rows = np.array([row for _, row in pairs], dtype=np.int64)
+
+    # ROWS WITH ANY TOKEN STARTING WITH prefix
+    def prefix_mask(self, prefix):
+        lo = bisect.bisect_left(self.tokens, prefix)
+        hi = bisect.bisect_left(self.tokens, prefix + "\uffff", lo)
+        mask = np.zeros(len(self.names), dtype=bool)
+        mask[self.rows[lo:hi]] = True
+        return mask
+
+    def text_mask(self, query):
+        query = query.strip().lower()
+        mask = self.prefix_mask(query)
+        # EVERY QUERY WORD MUST PREFIX SOME WORD OF THE NAME ("wood sol" FINDS "Solid Wood")
+        words = tokenize(query)
+        if len(words) > 1 or (words and words[0] != query):
+            every = self.prefix_mask(words[0])
+            for word in words[1:]:
+                every &= self.prefix_mask(word)
+            mask |= every
+        return mask
+
+    # CATALOG ROW POSITIONS (IN CATALOG ORDER) MATCHING EVERY GIVEN FILTER
+    def search(self, query="", mat_type=None, min_price=None, max_price=None, waterproof=None, limit=MAX_RESULTS):
+        mask = self.text_mask(query) if query and query.strip() else np.ones(len(self.names), dtype=bool)
+        if mat_type is not None:
+            type_mask = self.type_masks.get(mat_type)
+            if type_mask is None:
+                return np.empty(0, dtype=np.int64)
+            mask &= type_mask
+        if min_price is not None:
+            mask &= self.price >= min_price
+        if max_price is not None:
+            mask &= self.price <= max_price
+        if waterproof is not None:
+            mask &= self.waterproof if waterproof else ~self.waterproof
+        rows = np.flatnonzero(mask)
+        return rows if limit is None else rows[:limit]
+
+    def search_names(self, *args, **kwargs):
+        names = self.names
+        return [names[i] for i in self.search(*args, **kwargs).tolist()]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+# ONE INDEX PER CATALOG SNAPSHOT, REBUILT WHEN THE CATALOG IS SWAPPED
+def get_index(mat_catalog):
+    global _index
+    with _index_lock:
+        if _index is None or _index.catalog is not mat_catalog:
+            _index = MaterialIndex(mat_catalog)
+        return _index
@@ -0,0 +1,545 @@
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import database
+from cli import quote_chunk, new_totals, add_totals, TRUE_STRINGS
+from database import RenovationLogic, SERVICE_OPTIONS, MEMBER_DISCOUNT_BP
+from pricing import to_cents, from_cents, discount_cents
+
+# LOCAL QUOTING SERVICE: HTTP/1.1 + JSON ON asyncio STREAMS (STANDARD LIBRARY ONLY).
+# SINGLE QUOTES AND SAFETY CHECKS RUN ON THE EVENT LOOP (MICROSECONDS, MEMOIZED);
+# BATCHES ARE PARSED, PRICED AND SERIALIZED ON AN EXECUTOR SO THE LOOP KEEPS SERVING.
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_BODY_BYTES = 1 << 20
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BATCH_ROOMS = 100_000
+KEEPALIVE_TIMEOUT = 15.0
+BODY_TIMEOUT = 30.0
+BATCH_WORKERS = 2
+
+REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    408: "Request Timeout", 411: "Length Required", 413: "Payload Too Large",
+    431: "Request Header Fields Too Large", 500: "Internal Server Error"
+}
+
+# LATENCY BUCKET UPPER BOUNDS IN MILLISECONDS
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, float("inf"))
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.statuses = {}
+
+    def record(self, ms, status):
+        i = 0
+        while ms > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    # UPPER BOUND OF THE BUCKET HOLDING THE p-TH PERCENTILE (CAPPED AT THE MAX SEEN)
+    def percentile(self, p):
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(50),
+            "p90_ms": self.percentile(90),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max_ms,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "buckets": {("+Inf" if b == float("inf") else f"{b:g}"): n for b, n in zip(self.buckets, self.counts)}
+        }
+
+
+def parse_flag(value, default=False):
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_STRINGS
+
+
+def parse_service_key(value, default="self"):
+    key = default if value is None or value == "" else str(value).strip().lower()
+    if key not in SERVICE_OPTIONS:
+        raise HttpError(400, f"Unknown service option: {key}")
+    return key
+
+
+# NaN AND inf ARE REJECTED HERE (JSON ALLOWS THEM), SAME AS cli.py'S DIMENSION CHECK
+def parse_number(spec, field):
+    try:
+        value = float(spec[field])
+    except KeyError:
+        raise HttpError(400, f"Missing field: {field}")
+    except (TypeError, ValueError):
+        raise HttpError(400, f"{field} must be a number")
+    if not math.isfinite(value):
+        raise HttpError(400, f"{field} must be a finite number")
+    return value
+
+
+def parse_json(body):
+    try:
+        return json.loads(body)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HttpError(400, f"Invalid JSON: {e}")
+
+
+# ONE ROOM, SAME RULES AND OUTPUT FIELDS AS A ROW OF cli.quote_chunk
+def quote_room(spec):
+    if not isinstance(spec, dict):
+        raise HttpError(400, "Expected a JSON object")
+    missing = [col for col in RenovationLogic.BATCH_COLUMNS if col not in spec]
+    if missing:
+        raise HttpError(400, f"Missing field(s): {', '.join(missing)}")
+    width, length, height = (parse_number(spec, col) for col in ("width", "length", "height"))
+    service_fee, service_name = SERVICE_OPTIONS[parse_service_key(spec.get("service"))]
+    member = parse_flag(spec.get("member"))
+    budget = parse_number(spec, "budget") if spec.get("budget") not in (None, "") else None
+    room_type, floor_mat, wall_mat, tile_size = (str(spec[col]) for col in ("room_type", "floor_mat",
+                                                                             "wall_mat", "tile_size"))
+    quote = {"room_type": room_type, "floor_mat": floor_mat, "wall_mat": wall_mat, "tile_size": tile_size,
+             "width": width, "length": length, "height": height, "service": service_name, "budget": budget}
+
+    # [HAZIQ] INPUT VALIDATION AND SAFETY CHECK
+    if width <= 0 or length <= 0 or height <= 0:
+        return dict(quote, status="rejected", message="Dimensions must be greater than 0.")
+    is_safe, msg = RenovationLogic.check_safety(room_type, floor_mat)
+    if not is_safe:
+        return dict(quote, status="rejected", message=msg)
+    try:
+        res = RenovationLogic.calculate_project(width, length, height, floor_mat, wall_mat, tile_size)
+    except KeyError:
+        return dict(quote, status="rejected", message="Error: Material not found.")
+
+    # [AIMAN] DISCOUNT CALCULATION LOGIC (IN CENTS, SEE pricing.py)
+    subtotal_cents = res["total_cost_cents"]
+    discount = discount_cents(subtotal_cents, member, MEMBER_DISCOUNT_BP)
+    total_cents = subtotal_cents - discount
+    grand_cents = total_cents + to_cents(service_fee)
+    grand_total = from_cents(grand_cents)
+    quote.update({
+        "status": "quote",
+        "message": "",
+        "floor_area": res["floor_area"],
+        "wall_area": res["wall_area"],
+        "tiles_needed": res["tiles_needed"],
+        "floor_price": res["floor_price"],
+        "wall_price": res["wall_price"],
+        "floor_cost": res["floor_cost"],
+        "wall_cost": res["wall_cost"],
+        "subtotal": res["total_cost"],
+        "discount": from_cents(discount),
+        "total_cost": from_cents(total_cents),
+        "service_fee": service_fee,
+        "grand_total": grand_total,
+        "grand_total_cents": grand_cents,
+        "balance": None if budget is None else from_cents(to_cents(budget) - grand_cents)
+    })
+    return quote
+
+
+# RUNS ON THE EXECUTOR: JSON IN -> quote_chunk -> JSON BYTES OUT
+def quote_batch(body):
+    payload = parse_json(body)
+    rooms = payload.get("rooms") if isinstance(payload, dict) else payload
+    if not isinstance(rooms, list):
+        raise HttpError(400, "Expected {\"rooms\": [...]} or a JSON array of rooms")
+    if len(rooms) > MAX_BATCH_ROOMS:
+        raise HttpError(413, f"At most {MAX_BATCH_ROOMS} rooms per batch")
+    options = payload if isinstance(payload, dict) else {}
+    default_service = parse_service_key(options.get("service"))
+    default_member = parse_flag(options.get("member"))
+    if not rooms:
+        return json.dumps({"summary": new_totals(), "rows": []}).encode()
+    try:
+        frame = pd.DataFrame.from_records(rooms)
+    except (TypeError, ValueError) as e:
+        raise HttpError(400, f"Invalid rooms: {e}")
+    missing = [col for col in RenovationLogic.BATCH_COLUMNS if col not in frame]
+    if missing:
+        raise HttpError(400, f"Missing room field(s): {', '.join(missing)}")
+    try:
+        out = quote_chunk(frame, 0, default_service, default_member)
+    except ValueError as e:
+        raise HttpError(400, str(e))
+    summary = json.dumps(add_totals(new_totals(), out))
+    rows = out.to_json(orient="records", double_precision=10)
+    return f'{{"summary": {summary}, "rows": {rows}}}'.encode()
+
+
+class QuoteService:
+    def __init__(self, max_body=MAX_BODY_BYTES, keepalive_timeout=KEEPALIVE_TIMEOUT, workers=BATCH_WORKERS):
+        self.max_body = max_body
+        self.keepalive_timeout = keepalive_timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+        self.started = time.time()
+        self.open_connections = 0
+        self.connections = 0
+        self.histograms = {}
+        self._catalog_cache = {}
+        self.routes = {
+            ("POST", "/quote"): self.handle_quote,
+            ("POST", "/quote/batch"): self.handle_batch,
+            ("POST", "/safety"): self.handle_safety,
+            ("GET", "/catalog"): self.handle_catalog,
+            ("GET", "/metrics"): self.handle_metrics,
+            ("GET", "/health"): self.handle_health
+        }
+
+    async def start(self, host=HOST, port=PORT):
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    # ENDPOINTS: (body, query) -> (status, JSON-able object OR ready-made bytes)
+    async def handle_quote(self, body, query):
+        return 200, quote_room(parse_json(body))
+
+    async def handle_batch(self, body, query):
+        loop = asyncio.get_running_loop()
+        return 200, await loop.run_in_executor(self.executor, quote_batch, body)
+
+    async def handle_safety(self, body, query):
+        spec = parse_json(body)
+        if not isinstance(spec, dict) or "room_type" not in spec or "floor_mat" not in spec:
+            raise HttpError(400, "Expected {\"room_type\": ..., \"floor_mat\": ...}")
+        is_safe, msg = RenovationLogic.check_safety(str(spec["room_type"]), str(spec["floor_mat"]))
+        return 200, {"is_safe": is_safe, "message": msg}
+
+    async def handle_catalog(self, body, query):
+        mat_type = query.get("type")
+        catalog = database.catalog
+        key = (catalog.version, mat_type)
+        cached = self._catalog_cache.get(key)
+        if cached is None:
+            materials = [{"name": r.name, "type": r.type, "price": r.price, "waterproof": r.waterproof,
+                          "image_file": r.image_file}
+                         for r in catalog if mat_type is None or r.type == mat_type]
+            cached = json.dumps({"version": catalog.version, "materials": materials}).encode()
+            # ONLY THE CURRENT SNAPSHOT IS KEPT
+            self._catalog_cache = {k: v for k, v in self._catalog_cache.items() if k[0] == catalog.version}
+            self._catalog_cache[key] = cached
+        return 200, cached
+
+    async def handle_metrics(self, body, query):
+        return 200, {
+            "uptime_s": time.time() - self.started,
+            "connections": {"open": self.open_connections, "total": self.connections},
+            "endpoints": {name: hist.to_dict() for name, hist in sorted(self.histograms.items())},
+            "memo": RenovationLogic.memo_stats()
+        }
+
+    async def handle_health(self, body, query):
+        return 200, {"status": "ok"}
+
+    def record(self, name, started, status):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = LatencyHistogram()
+        hist.record((time.perf_counter() - started) * 1000, status)
+
+    async def handle_connection(self, reader, writer):
+        self.open_connections += 1
+        self.connections += 1
+        try:
+            keep_alive = True
+            while keep_alive:
+                keep_alive = await self.handle_request(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.open_connections -= 1
+            writer.close()
+
+    # ONE REQUEST/RESPONSE. RETURNS FALSE WHEN THE CONNECTION SHOULD BE CLOSED.
+    async def handle_request(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keepalive_timeout)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+            return False
+        except asyncio.LimitOverrunError:
+            await self.send(writer, 431, {"error": "Request headers too large"}, False)
+            return False
+        started = time.perf_counter()
+
+        try:
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, version = request_line.split(" ", 2)
+        except ValueError:
+            await self.send(writer, 400, {"error": "Malformed request line"}, False)
+            return False
+        headers = {}
+        for line in header_lines:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+        path, _, query_string = target.partition("?")
+        query = dict(part.partition("=")[::2] for part in query_string.split("&") if part)
+        name = f"{method} {path}" if (method, path) in self.routes else "other"
+
+        # BODY: Content-Length ONLY, CHECKED AGAINST THE LIMIT BEFORE ANYTHING IS READ
+        if "transfer-encoding" in headers:
+            await self.send(writer, 411, {"error": "Chunked bodies are not supported, send Content-Length"}, False)
+            self.record(name, started, 411)
+            return False
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            length = -1
+        if length < 0:
+            await self.send(writer, 400, {"error": "Invalid Content-Length"}, False)
+            self.record(name, started, 400)
+            return False
+        if length > self.max_body:
+            await self.send(writer, 413, {"error": f"Body larger than {self.max_body} bytes"}, False)
+            self.record(name, started, 413)
+            return False
+        if length and headers.get("expect", "").lower() == "100-continue":
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+        try:
+            body = await asyncio.wait_for(reader.readexactly(length), BODY_TIMEOUT) if length else b""
+        except asyncio.TimeoutError:
+            await self.send(writer, 408, {"error": "Timed out reading the body"}, False)
+            self.record(name, started, 408)
+            return False
+
+        handler = self.routes.get((method, path))
+        extra = {}
+        if handler is None:
+            allowed = [m for (m, p) in self.routes if p == path]
+            if allowed:
+                status, payload = 405, {"error": f"Use {', '.join(allowed)} for {path}"}
+                extra["Allow"] = ", ".join(allowed)
+            else:
+                status, payload = 404, {"error": f"No endpoint {path}"}
+        else:
+            try:
+                status, payload = await handler(body, query)
+            except HttpError as e:
+                status, payload = e.status, {"error": str(e)}
+            except Exception as e:
+                status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        await self.send(writer, status, payload, keep_alive, extra)
+        self.record(name, started, status)
+        return keep_alive
+
+    async def send(self, writer, status, payload, keep_alive, extra=None):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}",
+                 "Content-Type: application/json",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        lines += [f"{k}: {v}" for k, v in (extra or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+
+async def serve(host=HOST, port=PORT, max_body=MAX_BODY_BYTES, workers=BATCH_WORKERS):
+    service = QuoteService(max_body=max_body, workers=workers)
+    server = await service.start(host, port)
+    bound = server.sockets[0].getsockname()
+    print(f"RENOVISION quote service listening on http://{bound[0]}:{bound[1]}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+# MINIMAL KEEP-ALIVE CLIENT (USED BY loadtest AND THE TESTS)
+class Client:
+    def __init__(self, reader, writer, host):
+        self.reader = reader
+        self.writer = writer
+        self.host = host
+
+    @classmethod
+    async def connect(cls, host=HOST, port=PORT):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer, host)
+
+    async def request(self, method, path, payload=None):
+        body = b"" if payload is None else (payload if isinstance(payload, bytes) else json.dumps(payload).encode())
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n")
+        self.writer.write(head.encode("latin-1") + body)
+        await self.writer.drain()
+        status_line, *header_lines = (await self.reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        headers = {}
+        for line in header_lines:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        data = await self.reader.readexactly(int(headers.get("content-length", "0")))
+        return int(status_line.split(" ", 2)[1]), data
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+# RANDOM BUT VALID ROOMS (REPEATED STANDARD SIZES, AS IN REAL TRAFFIC)
+def sample_rooms(n, seed=0):
+    rng = random.Random(seed)
+    floors = database.catalog.names("Floor")
+    walls = database.catalog.names("Wall")
+    rooms = []
+    for _ in range(n):
+        floor = rng.choice(floors)
+        rooms.append({
+            "room_type": rng.choice(["Bedroom", "Living Room", "Bathroom", "Kitchen"]),
+            "width": rng.choice([2.5, 3, 3.5, 4, 5]),
+            "length": rng.choice([2.5, 3, 4, 5, 6]),
+            "height": rng.choice([2.7, 3]),
+            "floor_mat": floor,
+            "wall_mat": rng.choice(walls),
+            "tile_size": rng.choice(RenovationLogic.tile_options(floor)),
+            "member": rng.random() < 0.3
+        })
+    return rooms
+
+
+async def load(host, port, endpoint, total, concurrency, batch_size):
+    path = {"quote": "/quote", "batch": "/quote/batch", "safety": "/safety", "catalog": "/catalog"}[endpoint]
+    method = "GET" if endpoint == "catalog" else "POST"
+    if endpoint == "batch":
+        payloads = [json.dumps({"rooms": sample_rooms(batch_size, seed)}).encode() for seed in range(8)]
+    elif endpoint == "catalog":
+        payloads = [None]
+    else:
+        payloads = [json.dumps(room).encode() for room in sample_rooms(256)]
+
+    latencies, statuses = [], {}
+    remaining = [total]
+
+    async def worker(w):
+        client = await Client.connect(host, port)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                payload = payloads[(remaining[0] + w) % len(payloads)]
+                started = time.perf_counter()
+                status, _ = await client.request(method, path, payload)
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            await client.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    seconds = time.perf_counter() - started
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] if latencies else 0.0
+
+    return {
+        "endpoint": path,
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "batch_size": batch_size if endpoint == "batch" else None,
+        "seconds": seconds,
+        "requests_per_sec": len(latencies) / seconds if seconds > 0 else 0.0,
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": latencies[-1] if latencies else 0.0,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())}
+    }
+
+
+# WITHOUT --port A FRESH SERVER IS STARTED IN A CHILD PROCESS ON A FREE LOCAL PORT
+def loadtest(args):
+    child = None
+    port = args.port
+    if port is None:
+        child = subprocess.Popen([sys.executable, __file__, "serve", "--port", "0"],
+                                 stdout=subprocess.PIPE, text=True)
+        port = int(child.stdout.readline().strip().rsplit(":", 1)[1])
+    try:
+        report = asyncio.run(load(args.host, port, args.endpoint, args.requests, args.concurrency,
+                                  args.batch_size))
+    finally:
+        if child is not None:
+            child.terminate()
+            child.wait()
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="renovision-service", description="Local RENOVISION quoting service.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_parser = sub.add_parser("serve", help="run the HTTP/JSON service")
+    serve_parser.add_argument("--host", default=HOST)
+    serve_parser.add_argument("--port", type=int, default=PORT)
+    serve_parser.add_argument("--max-body", type=int, default=MAX_BODY_BYTES, help="request body limit in bytes")
+    serve_parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="batch executor threads")
+    load_parser = sub.add_parser("loadtest", help="load-test a local service")
+    load_parser.add_argument("--host", default=HOST)
+    load_parser.add_argument("--port", type=int, help="existing service port (default: start one)")
+    load_parser.add_argument("--endpoint", choices=["quote", "batch", "safety", "catalog"], default="quote")
+    load_parser.add_argument("--requests", type=int, default=10_000)
+    load_parser.add_argument("--concurrency", type=int, default=16)
+    load_parser.add_argument("--batch-size", type=int, default=500, help="rooms per batch request")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "loadtest":
+        return loadtest(args)
+    try:
+        asyncio.run(serve(args.host, args.port, args.max_body, args.workers))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,30 +1,660 @@
 # FILE: test_logic.py
-from database import RenovationLogic
+# RUN WITH: python -m pytest -q   (TIMINGS LIVE IN bench.py)
+import asyncio
+import json
+import os
+
+import database
+from database import RenovationLogic, catalog
 
-print("STARTING LOGIC TEST")
 
 # TEST 1: Safety Check (Should Fail)
-print("\nTest 1: Wood in Bathroom...")
-is_safe, msg = RenovationLogic.check_safety("Bathroom", "Solid Wood")
-if is_safe == False:
-    print("✅ SUCCESS: System correctly blocked unsafe material.")
-    print(f"   Message: {msg}")
-else:
-    print("❌ FAIL: System allowed unsafe material.")
+def test_wood_blocked_in_bathroom():
+    is_safe, msg = RenovationLogic.check_safety("Bathroom", "Solid Wood")
+    assert is_safe is False
+    assert "SAFETY WARNING" in msg
+
 
 # TEST 2: Calculation Math
-print("\nTest 2: Calculating Cost for 5x5m Room...")
-# Setup: 5x5m floor, 3m height.
-# Floor: Vinyl (RM 55/sqm). Wall: Paint (RM 22/sqm).
-# Floor Area = 25 sqm. Cost = 25 * 55 = 1375
-# Wall Area = (20 perimeter * 3 height) = 60 sqm. Cost = 60 * 22 = 1320
-# Expected Total = 1375 + 1320 = 2695
-result = RenovationLogic.calculate_project(5, 5, 3, "Vinyl", "Standard Paint", "30x30 cm")
-
-print(f"   Calculated Total: RM {result['total_cost']}")
-if result['total_cost'] == 2695.00:
-    print("✅ SUCCESS: Math is perfect.")
-else:
-    print(f"❌ FAIL: Expected 2695, got {result['total_cost']}")
-
-print("\n--- TEST COMPLETE ---")
\ No newline at end of file
+def test_calculation_math():
+    # Setup: 5x5m floor, 3m height.
+    # Floor: Vinyl (RM 55/sqm), 30x30 tiles (5% wastage). Wall: Paint (RM 22/sqm).
+    # Floor Area = 25 sqm. Cost = 25 * 55 * 1.05 = 1443.75
+    # Wall Area = (20 perimeter * 3 height) = 60 sqm. Cost = 60 * 22 = 1320
+    # Expected Total = 1443.75 + 1320 = 2763.75
+    result = RenovationLogic.calculate_project(5, 5, 3, "Vinyl", "Standard Paint", "30x30 cm")
+    assert result["floor_cost"] == 1443.75
+    assert result["wall_cost"] == 1320
+    assert result["total_cost"] == 2763.75
+    assert result["tiles_needed"] == 291
+
+
+# TEST 3: Catalog Lookup
+def test_catalog_lookup():
+    record = catalog.get("Marble")
+    assert record is not None and record.price == 165.00 and record.waterproof
+    assert catalog.get("Granite") is None
+
+
+# TEST 4: Batch Quoting Matches Single Quotes
+def test_batch_matches_single_quotes():
+    rooms = {
+        "room_type": ["Living Room", "Bathroom", "Kitchen"],
+        "width": [5, 2.5, 3.2],
+        "length": [5, 1.8, 4.1],
+        "height": [3, 2.7, 2.9],
+        "floor_mat": ["Vinyl", "Solid Wood", "Ceramic Tile"],
+        "wall_mat": ["Standard Paint", "Premium Wallpaper", "Textured Paint"],
+        "tile_size": ["30x30 cm", "15x90 cm", "60x60 cm"]
+    }
+    batch = RenovationLogic.calculate_batch(rooms)
+    single = [RenovationLogic.calculate_project(5, 5, 3, "Vinyl", "Standard Paint", "30x30 cm"),
+              RenovationLogic.calculate_project(3.2, 4.1, 2.9, "Ceramic Tile", "Textured Paint", "60x60 cm")]
+    assert list(batch["is_safe"]) == [True, False, True]
+    assert [batch["total_cost"][0], batch["total_cost"][2]] == [r["total_cost"] for r in single]
+    assert [batch["tiles_needed"][0], batch["tiles_needed"][2]] == [r["tiles_needed"] for r in single]
+
+
+# TEST 5: Preview Texture Cache
+def test_texture_cache_budget():
+    from render import RoomRenderer, TextureCache
+    textures = TextureCache(budget_mb=1.0)
+    renderer = RoomRenderer((400, 250), textures)
+    first = renderer.render("images/paint.jpg", "images/vinyl.jpg")
+    second = renderer.render("images/paint.jpg", "images/vinyl.jpg")
+    renderer.render("images/wallpaper.jpg", "images/marble.jpg")
+    stats = textures.stats()
+    assert first.tobytes() == second.tobytes()
+    assert stats["hits"] == 2 and stats["evictions"] > 0 and stats["mb"] <= 1.0
+
+
+# TEST 6: Perspective Tiled Preview
+def test_tiled_preview():
+    from render import RoomRenderer, TextureCache
+    renderer = RoomRenderer((400, 250), TextureCache(budget_mb=1.0))
+    tiled = renderer.render_tiled("images/paint.jpg", "images/ceramic.jpg", "60x60 cm", 3, 3, 2.7)
+    covered = sum(len(idx) for idx, _, _ in renderer.maps.values())
+    assert tiled.size == (400, 250) and tiled.mode == "RGB"
+    assert 0.6 * 400 * 250 < covered < 400 * 250
+    # THE PREVIEW DRAWS THE SAME TILE THE QUOTE PRICES
+    from render import tile_dims_m
+    from database import tile_area_sqm
+    for size in ("60x60 cm", "600 x 1200 mm", "15X90", "0.3x0.3 m", "mosaic"):
+        w, h = tile_dims_m(size)
+        assert abs(w * h - tile_area_sqm(size)) < 1e-12
+    assert tile_dims_m("600 x 1200 mm") == (0.6, 1.2)
+
+
+# TEST 7: Budget Optimizer
+def test_optimizer_cheapest_safe_kitchen():
+    from optimizer import find_combinations
+    options = find_combinations("Kitchen", 4, 5, 3, 6000, top_n=3, sort_by="cost")
+    assert len(options) == 3
+    assert options[0]["floor_mat"] == "Vinyl" and options[0]["wall_mat"] == "Standard Paint"
+    assert all(o["floor_mat"] != "Solid Wood" and o["total_cost"] <= 6000 for o in options)
+    check = RenovationLogic.calculate_project(4, 5, 3, options[0]["floor_mat"], options[0]["wall_mat"],
+                                              options[0]["tile_size"])
+    assert check["total_cost"] == options[0]["total_cost"]
+
+
+def sample_quote():
+    quote = RenovationLogic.calculate_project(5, 5, 3, "Vinyl", "Standard Paint", "30x30 cm")
+    quote.update({"discount": 0.0, "room_type": "Bedroom", "width": "5", "length": "5", "height": "3",
+                  "tile_size": "30x30 cm", "floor_mat": "Vinyl", "wall_mat": "Standard Paint",
+                  "service_fee": 85.0, "service_name": "Delivery Only"})
+    return quote
+
+
+# TEST 8: Invoice Engine
+def test_invoices_issued_in_same_second():
+    from invoice import InvoiceEngine
+    engine = InvoiceEngine()
+    quote = sample_quote()
+    orders = [engine.render(quote)[0] for _ in range(100)]
+    text = engine.render(quote)[1]
+    assert len(set(orders)) == 100
+    assert "GRAND TOTAL:                                        RM 2848.75" in text
+
+
+# TEST 9: Quote Store
+def test_quote_store():
+    from quote_store import QuoteStore
+    quote = sample_quote()
+    store = QuoteStore(":memory:")
+    for i, room in enumerate(["Kitchen", "Bedroom", "Kitchen"]):
+        store.submit(dict(quote, order_id=f"RV-T{i}", created_at=1000.0 + i, room_type=room, member=False))
+    store.submit({"order_id": "RV-T0", "service_name": "Delivery Only", "service_fee": 85.0})
+    store.flush()
+    kitchens = [q["order_id"] for q in store.recent(10, room_type="Kitchen")]
+    first = store.get("RV-T0")
+    store.close()
+    assert kitchens == ["RV-T2", "RV-T0"]
+    assert first["service_fee"] == 85.0 and first["floor_cost"] == quote["floor_cost"]
+
+
+# TEST 10: Memoized Quotes
+def test_memo_follows_price_changes():
+    RenovationLogic.clear_memo()
+    before = RenovationLogic.calculate_project(5, 5, 3, "Vinyl", "Standard Paint", "30x30 cm")
+    before["total_cost"] = -1
+    again = RenovationLogic.calculate_project(5.0, 5.0, 3.0, "Vinyl", "Standard Paint", "30x30 cm")
+    original = database.catalog
+    database.set_catalog(original.with_prices({"Vinyl": 60.0}))
+    try:
+        repriced = RenovationLogic.calculate_project(5, 5, 3, "Vinyl", "Standard Paint", "30x30 cm")
+    finally:
+        database.set_catalog(original)
+    memo = RenovationLogic.memo_stats()["quotes"]
+    assert again["total_cost"] == 2763.75
+    assert repriced["floor_price"] == 60.0
+    assert memo["hits"] == 1 and memo["invalidations"] == 1
+
+
+# TEST 11: Local Quoting Service
+def test_service_over_keepalive():
+    from service import QuoteService, Client
+
+    async def call_service():
+        service = QuoteService(max_body=4096)
+        server = await service.start("127.0.0.1", 0)
+        client = await Client.connect("127.0.0.1", server.sockets[0].getsockname()[1])
+        room = {"room_type": "Bedroom", "width": 5, "length": 5, "height": 3, "floor_mat": "Vinyl",
+                "wall_mat": "Standard Paint", "tile_size": "30x30 cm", "service": "delivery"}
+        single = json.loads((await client.request("POST", "/quote", room))[1])
+        rooms = [room, dict(room, room_type="Kitchen", floor_mat="Solid Wood")]
+        batch = json.loads((await client.request("POST", "/quote/batch", {"rooms": rooms}))[1])
+        too_big = (await client.request("POST", "/quote/batch", {"rooms": [room] * 100}))[0]
+        await client.close()
+        server.close()
+        await server.wait_closed()
+        service.close()
+        return service, single, batch, too_big
+
+    service, single, batch, too_big = asyncio.run(call_service())
+    assert single["grand_total"] == 2848.75
+    assert batch["summary"]["quotes"] == 1 and batch["rows"][1]["status"] == "rejected"
+    assert too_big == 413
+    assert service.histograms["POST /quote"].count == 1 and service.connections == 1
+
+
+# TEST 12: Benchmark Regression Check
+def test_bench_compare_flags_regressions():
+    from bench import compare
+    baseline = {"metrics": {"calc": {"value": 100.0, "unit": "ops/s", "better": "higher"},
+                            "render": {"value": 10.0, "unit": "ms", "better": "lower"}}}
+    current = {"metrics": {"calc": {"value": 95.0, "unit": "ops/s", "better": "higher"},
+                           "render": {"value": 12.0, "unit": "ms", "better": "lower"}}}
+    regressions = compare(baseline, current, threshold=0.10)
+    assert [r["name"] for r in regressions] == ["render"]
+
+
+# TEST 13: Benchmark Check Fails On Missing Metrics
+def test_bench_compare_flags_missing_metrics():
+    from bench import compare
+    baseline = {"metrics": {"calc": {"value": 100.0, "unit": "ops/s", "better": "higher"},
+                            "render": {"value": 10.0, "unit": "ms", "better": "lower"}}}
+    current = {"metrics": {"calc": {"value": 100.0, "unit": "ops/s", "better": "higher"}}}
+    regressions = compare(baseline, current, threshold=0.10)
+    assert [(r["name"], r["current"]) for r in regressions] == [("render", None)]
+
+
+# TEST 14: Stage Timings
+def test_stage_timings():
+    from timing import Timings, NULL_STAGE
+    timings = Timings(enabled=False)
+    assert timings.stage("calc.quote") is NULL_STAGE
+    timings.enabled = True
+    for _ in range(10):
+        with timings.stage("calc.quote"):
+            pass
+    timings.record("preview.click_to_screen", 0.02)
+    summary = timings.summary()
+    assert summary["calc.quote"]["count"] == 10
+    assert summary["preview.click_to_screen"]["p99"] == 0.02
+    assert 'renovision_stage_seconds_count{stage="calc.quote"} 10' in timings.to_prometheus()
+
+
+# TEST 15: Material Search Index
+def test_material_search_and_filters():
+    from search import MaterialIndex
+    index = MaterialIndex(catalog)
+    assert index.search_names("wood sol") == ["Solid Wood"]
+    assert index.search_names("p", "Wall") == ["Standard Paint", "Premium Wallpaper", "Textured Paint"]
+    assert index.search_names("", "Floor", max_price=100, waterproof=True) == ["Vinyl", "Ceramic Tile"]
+    assert index.search_names("tile", min_price=100) == ["Porcelain Tile"]
+
+
+# TEST 16: Tile Layout Planner
+def test_tile_layout_planner():
+    import numpy as np
+    import pytest
+    from layout import plan_layout, plan_layouts, parse_tile_size
+    exact = plan_layout(3, 3, "30x30 cm", grout_mm=0, kerf_mm=0)
+    assert exact["full_tiles"] == 100 and exact["cut_pieces"] == 0
+    # TEN 10 cm STRIPS ALONG ONE WALL: THREE COME OUT OF EACH TILE
+    strips = plan_layout(3.1, 3, "30x30 cm", grout_mm=0, kerf_mm=0)
+    assert strips["full_tiles"] == 100 and strips["cut_pieces"] == 10 and strips["cut_tiles"] == 4
+    assert strips["offcuts_reused"] == 6
+    for pattern in ("straight", "offset", "herringbone"):
+        res = plan_layouts([2.35, 4.0], [3.1, 5.55], "15x90 cm", pattern, grout_mm=0)
+        assert np.allclose(res["covered_area"], [2.35 * 3.1, 4.0 * 5.55])
+    assert parse_tile_size("600 x 1200 mm") == (0.6, 1.2)
+    with pytest.raises(ValueError):
+        parse_tile_size("large")
+
+
+# TEST 17: Multi-Room Project
+def test_project_recomputes_only_edited_room():
+    from project import Project, Room
+    rooms = [Room.rectangular(f"Room {i}", "Bedroom", 5, 5, 3, "Vinyl", "Standard Paint", "30x30 cm")
+             for i in range(40)]
+    project = Project("Apartment", rooms)
+    assert project.totals()["total_cost"] == 40 * 2763.75
+    project.graph.recomputed.clear()
+    project.update_room("Room 7", wall_finishes={0: "Premium Wallpaper"},
+                        openings=[(1, 0.9, 2.0)])
+    edited = project.room_result("Room 7")
+    assert edited["wall_area"] == 60 - 1.8
+    assert project.totals()["total_cost"] == 39 * 2763.75 + edited["total_cost"]
+    assert project.recompute_counts() == {"geometry": 1, "cost": 1, "totals": 1}
+    # L-SHAPED KITCHEN: 4x2 PLUS 2x3
+    kitchen = project.add_room(Room("Kitchen", "Kitchen", [(0, 0), (4, 0), (4, 2), (2, 2), (2, 5), (0, 5)], 2.7,
+                                    "Ceramic Tile", "Textured Paint"))
+    assert project.room_result(kitchen.name)["floor_area"] == 14.0
+    assert project.room_result(kitchen.name)["perimeter"] == 18.0
+
+
+# TEST 18: Integer-Cents Pricing
+def test_cents_pricing_reconciles():
+    import numpy as np
+    from pricing import to_cents, discount_cents, format_cents
+    from cli import quote_chunk
+    import pandas as pd
+    assert to_cents(2.675) == 268 and to_cents(np.array([0.125, 1.005])).tolist() == [13, 101]
+    # 5% OF RM 2763.75 IS RM 138.1875 -> 13819 CENTS (HALF-UP)
+    assert discount_cents(276375, True, 500) == 13819
+    quote = RenovationLogic.calculate_project(3.33, 2.71, 2.65, "Marble", "Premium Wallpaper", "60x60 cm")
+    assert quote["floor_cost_cents"] + quote["wall_cost_cents"] == quote["total_cost_cents"]
+    assert quote["total_cost"] == quote["total_cost_cents"] / 100
+    rooms = pd.DataFrame({"room_type": ["Bedroom"] * 1000, "width": np.linspace(2, 8, 1000), "length": 3.37,
+                          "height": 2.71, "floor_mat": "Marble", "wall_mat": "Premium Wallpaper",
+                          "tile_size": "60x60 cm", "member": "yes", "service": "delivery"})
+    out = quote_chunk(rooms, 0, "self", False)
+    batch = RenovationLogic.calculate_batch(rooms)
+    single = RenovationLogic.calculate_project(rooms["width"][517], 3.37, 2.71, "Marble", "Premium Wallpaper",
+                                               "60x60 cm")
+    assert batch["total_cost_cents"][517] == single["total_cost_cents"]
+    lines = to_cents(out["total_cost"].to_numpy()) + to_cents(out["service_fee"].to_numpy())
+    assert (lines == to_cents(out["grand_total"].to_numpy())).all()
+    assert format_cents(int(lines.sum())) == f"{lines.sum() / 100:.2f}"
+
+
+# TEST 19: Price-Change Impact Analysis
+def test_price_change_impact():
+    import pandas as pd
+    import impact
+    rooms = pd.DataFrame({"room_type": ["Bedroom", "Kitchen", "Bathroom"], "width": [5, 4, 2], "length": [5, 5, 2],
+                          "height": [3, 3, 2.5], "floor_mat": ["Vinyl", "Ceramic Tile", "Solid Wood"],
+                          "wall_mat": ["Standard Paint", "Standard Paint", "Standard Paint"],
+                          "tile_size": ["30x30 cm", "60x60 cm", "15x90 cm"], "budget": [2800, None, 1000]})
+    prices = {"Vinyl": 60.0}
+    serial = impact.run([rooms.iloc[:2], rooms.iloc[2:]], prices, workers=0)
+    pooled = impact.run([rooms.iloc[:2], rooms.iloc[2:]], prices, workers=2)
+    # VINYL FLOOR: 25 sqm x RM 5 x 1.05 WASTAGE = RM 131.25 MORE, WHICH TAKES ROOM 1 OVER RM 2800
+    assert serial == pooled
+    assert serial["after_cents"] - serial["before_cents"] == 13125
+    assert serial["rejected"] == 1 and serial["newly_over_budget"] == 1
+    assert serial["materials"]["Standard Paint"]["before_cents"] == serial["materials"]["Standard Paint"]["after_cents"]
+
+
+# TEST 20: Memory-Mapped Catalog File
+def test_mmap_catalog_matches_in_memory(tmp_path):
+    import numpy as np
+    from catalog_mmap import write_catalog, open_catalog
+    path = write_catalog(str(tmp_path / "catalog.rvcat"), database.material_data())
+    mapped = open_catalog(path)
+    assert len(mapped) == len(catalog) and mapped.version == catalog.version
+    assert mapped["Marble"].price == 165.0 and mapped.get("Granite") is None and "Vinyl" in mapped
+    assert mapped.names("Wall") == catalog.names("Wall")
+    assert mapped.codes(["Vinyl", "Granite", "Textured Paint"]).tolist() == [0, -1, 7]
+    assert np.array_equal(mapped.columns()["price_cents"], catalog.columns()["price_cents"])
+    rooms = {"room_type": ["Bedroom", "Bathroom"], "width": [5, 2], "length": [5, 2], "height": [3, 2.5],
+             "floor_mat": ["Vinyl", "Solid Wood"], "wall_mat": ["Standard Paint", "Textured Paint"],
+             "tile_size": ["30x30 cm", "15x90 cm"]}
+    batch = RenovationLogic.calculate_batch(rooms, mapped)
+    assert batch["total_cost_cents"].tolist() == [276375, 0] and batch["is_safe"].tolist() == [True, False]
+    mapped.close()
+
+
+# TEST 21: Hot-Reloaded Catalog Snapshots
+def test_catalog_hot_reload(tmp_path):
+    from catalog_watch import CatalogWatcher
+    from search import record_matches
+    data = database.material_data()
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(data))
+    watcher = CatalogWatcher(str(path))
+    seen = []
+    watcher.add_listener(lambda old, new, diff: seen.append(diff))
+    original = database.catalog
+    try:
+        data["Price_Per_Sqm"][0] = 60.0
+        for col in data:
+            data[col].append({"Material": "Slate", "Type": "Floor", "Price_Per_Sqm": 140.0,
+                              "Is_Waterproof": True, "Image_File": "images/slate.jpg"}[col])
+        path.write_text(json.dumps(data))
+        os.utime(path, ns=(1, 1))
+        # NOTHING IS LOADED UNTIL THE FILE HAS STAYED THE SAME FOR ONE POLL
+        assert watcher.check() is None and database.catalog is original
+        diff = watcher.check()
+        assert diff == {"added": ["Slate"], "removed": [], "changed": ["Vinyl"]} and seen == [diff]
+        assert database.catalog["Vinyl"].price == 60.0
+        # A QUOTE THAT TOOK THE OLD SNAPSHOT KEEPS ITS PRICES
+        old_quote = RenovationLogic.calculate_project(5, 5, 3, "Vinyl", "Standard Paint", "30x30 cm", original)
+        new_quote = RenovationLogic.calculate_project(5, 5, 3, "Vinyl", "Standard Paint", "30x30 cm")
+        assert new_quote["total_cost_cents"] - old_quote["total_cost_cents"] == 13125
+        assert record_matches(database.catalog["Slate"], "sla", "Floor", max_price=150)
+        path.write_text("{broken")
+        os.utime(path, ns=(2, 2))
+        assert watcher.check() is None and watcher.check() is None and watcher.last_error is not None
+        assert database.catalog["Slate"].price == 140.0
+    finally:
+        database.set_catalog(original)
+        RenovationLogic.clear_memo()
+
+
+# TEST 22: Live Recalculation Only Redoes Affected Outputs
+def test_live_quote_dependencies():
+    from recalc import LiveQuote
+    from render import RoomRenderer, TextureCache
+    live = LiveQuote()
+    first = live.update(room_type="Bedroom", width=5.0, length=5.0, height=3.0, budget=2800.0, floor_mat="Vinyl",
+                        wall_mat="Standard Paint", tile_size="30x30 cm", member=False)
+    assert "floor_layer" in first and "wall_layer" in first
+    assert live["total"]["total_cents"] == 276375
+    assert live.update(budget=3000.0) == ["budget_feedback"]
+    assert live.update(wall_mat="Textured Paint") == ["wall_cost", "total", "budget_feedback", "wall_texture",
+                                                      "wall_layer"]
+    assert "floor_texture" not in live.update(width=4.0) and live.update(width=4.0) == []
+    assert live.update(member=True) == ["total", "budget_feedback"]
+    assert live["total"]["discount_cents"] == 31425 and live["total"]["total_cents"] == 628500 - 31425
+
+    renderer = RoomRenderer((200, 125), TextureCache(budget_mb=1.0))
+    renderer.render_tiled("images/paint.jpg", "images/ceramic.jpg", "60x60 cm", 3, 3, 2.7)
+    renderer.render_tiled("images/wallpaper.jpg", "images/ceramic.jpg", "60x60 cm", 3, 3, 2.7)
+    assert renderer.decodes == 3
+    renderer.render_tiled("images/wallpaper.jpg", "images/ceramic.jpg", "60x60 cm", 4, 3, 2.7)
+    assert renderer.decodes == 3
+
+
+# TEST 23: Background Thumbnail Loader
+def test_background_thumbnail_loader(tmp_path):
+    from assets import AssetManager, BackgroundLoader, THUMB_SIZE, POPUP_SIZE
+    assets = AssetManager(cache_dir=str(tmp_path), budget_mb=1.0)
+    loader = BackgroundLoader(assets)
+    loader.prefetch(("images/marble.jpg", POPUP_SIZE))
+    loader.want([("images/vinyl.jpg", THUMB_SIZE), ("images/missing.jpg", THUMB_SIZE)])
+    got = dict(loader.done.get(timeout=10) for _ in range(2))
+    assert got[("images/vinyl.jpg", THUMB_SIZE)].size == THUMB_SIZE and got[("images/missing.jpg", THUMB_SIZE)] is None
+    assert loader.done.empty() and loader.failed == 1
+    # THE PREFETCHED POPUP IMAGE IS ALREADY IN THE CACHE
+    hits = assets.memory.hits
+    assets.get("images/marble.jpg", POPUP_SIZE)
+    assert assets.memory.hits == hits + 1
+    loader.close()
+
+    import time
+
+    # A FILE THAT BLOWS UP IN THE DECODER (ANY EXCEPTION) STILL REPORTS BACK AND FREES THE THREAD
+    class Exploding:
+        def get(self, path, size):
+            if path == "bad":
+                raise ValueError("corrupt image")
+            return assets.get(path, size)
+    corrupt = tmp_path / "corrupt.jpg"
+    corrupt.write_bytes(b"\xff\xd8\xff\xe0" + bytes(64))
+    loader = BackgroundLoader(Exploding())
+    loader.want([("bad", THUMB_SIZE), (str(corrupt), THUMB_SIZE), ("images/vinyl.jpg", THUMB_SIZE)])
+    got = dict(loader.done.get(timeout=10) for _ in range(3))
+    assert got[("bad", THUMB_SIZE)] is None and got[(str(corrupt), THUMB_SIZE)] is None
+    assert got[("images/vinyl.jpg", THUMB_SIZE)].size == THUMB_SIZE
+    assert loader.failed == 2 and loader.loaded == 1
+    for _ in range(100):
+        if not loader.busy():
+            break
+        time.sleep(0.01)
+    assert not loader.busy()
+    loader.close()
+
+
+# TEST 24: Strip-Rendered Preview Export
+def test_preview_export_matches_screen_render(tmp_path):
+    import numpy as np
+    import pytest
+    from PIL import Image
+    from export import export_preview
+    from render import RoomRenderer, TextureCache
+    textures = TextureCache(budget_mb=4.0)
+    screen = RoomRenderer((400, 250), textures).render_tiled("images/paint.jpg", "images/ceramic.jpg", "60x60 cm",
+                                                             3, 4, 2.7)
+    for name in ("preview.png", "preview.tif"):
+        path = export_preview(str(tmp_path / name), "images/paint.jpg", "images/ceramic.jpg", "60x60 cm", 3, 4, 2.7,
+                              size=(400, 250), strip_rows=37, textures=textures)
+        exported = Image.open(path)
+        assert exported.size == (400, 250) and round(exported.info["dpi"][0]) == 300
+        assert np.array_equal(np.asarray(exported.convert("RGB")), np.asarray(screen))
+    with pytest.raises(ValueError):
+        export_preview(str(tmp_path / "preview.jpg"), "images/paint.jpg", "images/ceramic.jpg", "60x60 cm", 3, 4, 2.7)
+
+
+# TEST 25: Blank And Unknown Tile Sizes Price Like calculate_project
+def test_batch_blank_tile_size_uses_defaults():
+    import numpy as np
+    for sizes in (["", "60x60 cm", "mosaic"], [np.nan, np.nan, np.nan]):
+        rooms = {"room_type": ["Bedroom"] * 3, "width": [5, 5, 4], "length": [5, 5, 3], "height": [3, 3, 2.8],
+                 "floor_mat": ["Vinyl"] * 3, "wall_mat": ["Standard Paint"] * 3, "tile_size": sizes}
+        batch = RenovationLogic.calculate_batch(rooms)
+        for i, size in enumerate(sizes):
+            single = RenovationLogic.calculate_project(rooms["width"][i], rooms["length"][i], rooms["height"][i],
+                                                       "Vinyl", "Standard Paint", size if isinstance(size, str) else "")
+            assert batch["floor_cost_cents"][i] == single["floor_cost_cents"]
+            assert batch["tiles_needed"][i] == single["tiles_needed"]
+    # 25 sqm VINYL AT RM 55 WITH THE DEFAULT 5% WASTAGE
+    assert RenovationLogic.calculate_batch({**rooms, "tile_size": [""] * 3})["floor_cost_cents"][0] == 144375
+
+
+# TEST 26: Closing The Quote Store Writes The Last Batch
+def test_quote_store_close_flushes(tmp_path):
+    from quote_store import QuoteStore
+    path = str(tmp_path / "quotes.db")
+    store = QuoteStore(path, flush_interval=60)
+    store.submit(dict(sample_quote(), order_id="RV-LAST", created_at=1000.0))
+    store.submit({"order_id": "RV-LAST", "service_name": "Delivery Only", "service_fee": 85.0})
+    store.close()
+    store.close()
+    reopened = QuoteStore(path)
+    assert reopened.get("RV-LAST")["service_fee"] == 85.0
+    reopened.close()
+
+
+# TEST 27: Order Numbers Stay Unique Across Processes, Invoices Are Never Overwritten
+def test_order_numbers_unique_across_engines(tmp_path):
+    import pytest
+    from invoice import InvoiceEngine
+    first, second = InvoiceEngine(), InvoiceEngine()
+    quote = sample_quote()
+    # A BULK RUN PUSHES THE FIRST COUNTER AHEAD OF THE CLOCK; A SECOND ENGINE STARTS INSIDE THAT WINDOW
+    ahead = {first.render(quote)[0] for _ in range(2000)}
+    assert len(ahead) == 2000 and not ahead & {second.render(quote)[0] for _ in range(2000)}
+    records = [dict(quote, order_id="RV-1"), dict(quote, order_id="RV-2")]
+    first.write_bulk(records, str(tmp_path), workers=1)
+    with pytest.raises(FileExistsError):
+        first.write_bulk(records[:1], str(tmp_path), workers=1)
+    # A RE-ISSUED BATCH THAT HITS ONE EXISTING ORDER WRITES NONE OF ITS INVOICES
+    with pytest.raises(FileExistsError):
+        first.write_bulk([dict(quote, order_id="RV-3"), records[1]], str(tmp_path), workers=1)
+    assert sorted(os.listdir(tmp_path)) == ["Invoice_RV-1.txt", "Invoice_RV-2.txt"]
+    first.write_bulk(records, str(tmp_path / "out.zip"), workers=1)
+    with pytest.raises(FileExistsError):
+        first.write_bulk(records, str(tmp_path / "out.zip"), workers=1)
+    assert sorted(os.listdir(tmp_path)) == ["Invoice_RV-1.txt", "Invoice_RV-2.txt", "out.zip"]
+    # A BLANK TILE SIZE IN A QUOTE EXPORT PRINTS AS BLANK, NOT "nan"
+    from invoice import records_from_quotes
+    export = tmp_path / "quotes.csv"
+    export.write_text("status,width,length,height,tile_size\nquote,5,5,3,\nquote,4,4,3,60x60 cm\n")
+    assert [r["tile_size"] for r in records_from_quotes(str(export))] == ["", "60x60 cm"]
+
+
+# TEST 28: Non-Finite Dimensions Are A 400, Not A 500
+def test_service_rejects_non_finite_numbers():
+    import pytest
+    from service import HttpError, quote_room
+    room = {"room_type": "Bedroom", "width": 5, "length": 5, "height": 3, "floor_mat": "Vinyl",
+            "wall_mat": "Standard Paint", "tile_size": "30x30 cm"}
+    for field, value in (("width", "nan"), ("height", float("inf")), ("budget", "-Infinity")):
+        with pytest.raises(HttpError) as e:
+            quote_room(dict(room, **{field: value}))
+        assert e.value.status == 400
+
+
+# TEST 29: Pricing Refuses NaN / inf Instead Of Crashing In math.floor
+def test_pricing_rejects_non_finite():
+    import pytest
+    from pricing import to_mm, to_cents
+    for bad in (float("nan"), float("inf"), -float("inf")):
+        with pytest.raises(ValueError):
+            to_mm(bad)
+        with pytest.raises(ValueError):
+            to_cents(bad)
+    with pytest.raises(ValueError):
+        RenovationLogic.calculate_project(float("nan"), 5, 3, "Vinyl", "Standard Paint", "30x30 cm")
+    assert to_mm(2.5) == 2500 and to_cents(2.675) == 268
+
+
+# TEST 30: A Scalar Quote Does Not Import NumPy
+def test_scalar_quote_stays_numpy_free():
+    import subprocess
+    import sys
+    code = ("import sys, database; "
+            "database.RenovationLogic.calculate_project(4, 5, 2.7, 'Ceramic Tile', 'Standard Paint', '600x1200 mm'); "
+            "print('numpy' in sys.modules)")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert out.stdout.strip() == "False"
+
+
+# TEST 31: The Live Estimate Prices Exactly Like calculate_project
+def test_live_quote_matches_calculate_project():
+    from recalc import LiveQuote
+    from pricing import discount_cents
+    from database import MEMBER_DISCOUNT_BP
+    live = LiveQuote()
+    cases = [(5.0, 5.0, 3.0, "Vinyl", "Standard Paint", "30x30 cm", False),
+             (3.2, 4.1, 2.9, "Ceramic Tile", "Textured Paint", " 60x60 cm ", True),
+             (2.35, 7.125, 2.55, "Solid Wood", "Premium Wallpaper", "15x90 cm", True),
+             (4.0, 4.0, 2.7, "Marble", "Standard Paint", "", False)]
+    for w, l, h, floor, wall, tile, member in cases:
+        live.update(room_type="Bedroom", width=w, length=l, height=h, budget=None, floor_mat=floor, wall_mat=wall,
+                    tile_size=tile, member=member)
+        quote = RenovationLogic.calculate_project(w, l, h, floor, wall, tile)
+        assert (live["floor_cost"], live["wall_cost"]) == (quote["floor_cost_cents"], quote["wall_cost_cents"])
+        discount = discount_cents(quote["total_cost_cents"], member, MEMBER_DISCOUNT_BP)
+        assert live["total"] == {"subtotal_cents": quote["total_cost_cents"], "discount_cents": discount,
+                                 "total_cents": quote["total_cost_cents"] - discount}
+
+
+# TEST 32: A Corrupt Catalog Write Does Not Stop Hot Reload
+def test_catalog_watch_survives_corrupt_file(tmp_path):
+    from catalog_watch import CatalogWatcher
+    data = database.material_data()
+    path = tmp_path / "catalog.json"
+    path.write_text(json.dumps(data))
+    watcher = CatalogWatcher(str(path))
+    original = database.catalog
+    try:
+        for stamp, text in enumerate(("[1, 2]", json.dumps([{"Material": "Vinyl"}])), start=1):
+            path.write_text(text)
+            os.utime(path, ns=(stamp, stamp))
+            assert watcher.check() is None and watcher.check() is None
+            assert watcher.last_error is not None and database.catalog is original
+        data["Price_Per_Sqm"][0] = 61.0
+        path.write_text(json.dumps(data))
+        os.utime(path, ns=(9, 9))
+        watcher.check()
+        assert watcher.check() == {"added": [], "removed": [], "changed": ["Vinyl"]}
+        assert watcher.last_error is None and database.catalog["Vinyl"].price == 61.0
+    finally:
+        database.set_catalog(original)
+        RenovationLogic.clear_memo()
+
+
+# TEST 33: Truncated .rvcat Files Fail Cleanly
+def test_mmap_catalog_rejects_truncated_file(tmp_path, monkeypatch):
+    import mmap
+    import pytest
+    import catalog_mmap
+    from catalog_mmap import write_catalog, open_catalog, HEADER
+    full = open(write_catalog(str(tmp_path / "catalog.rvcat"), database.material_data()), "rb").read()
+    opened, real_mmap = [], mmap.mmap
+
+    def tracked_mmap(*args, **kwargs):
+        opened.append(real_mmap(*args, **kwargs))
+        return opened[-1]
+    monkeypatch.setattr(catalog_mmap.mmap, "mmap", tracked_mmap)
+    path = tmp_path / "short.rvcat"
+    for size in (0, 40, HEADER.size, len(full) - 8):
+        path.write_bytes(full[:size])
+        with pytest.raises(ValueError, match="truncated or corrupt"):
+            open_catalog(str(path))
+    assert len(opened) == 3 and all(m.closed for m in opened)
+
+
+# TEST 34: Sub-Millimetre Rectangular Rooms Price Like calculate_project
+def test_project_rectangle_matches_calculate_project():
+    import random
+    from project import Project, Room
+    rng = random.Random(7)
+    rooms = [Room.rectangular("Study", "Bedroom", 2.8735, 6.1748, 2.7, "Vinyl", "Standard Paint", "30x30 cm")]
+    rooms += [Room.rectangular(f"Room {i}", "Bedroom", *(round(rng.uniform(1, 9), 4) for _ in range(3)),
+                               "Marble", "Textured Paint", "60x60 cm") for i in range(200)]
+    project = Project("Random", rooms)
+    for room in rooms:
+        w, l = room.points[2]
+        quote = RenovationLogic.calculate_project(w, l, room.height, room.floor_mat, room.wall_mat, room.tile_size)
+        result = project.room_result(room.name)
+        assert (result["floor_cost_cents"], result["wall_cost_cents"]) == \
+            (quote["floor_cost_cents"], quote["wall_cost_cents"])
+
+
+# TEST 35: NaN / inf Dimensions In A Batch Are Left Unpriced, Without Warnings
+def test_batch_non_finite_dimensions_unpriced():
+    import warnings
+    import numpy as np
+    nan, inf = float("nan"), float("inf")
+    rooms = {"room_type": ["Bedroom"] * 4, "width": [5, nan, inf, 5], "length": [5, 5, 0, 5],
+             "height": [3, 3, 3, nan], "floor_mat": ["Vinyl"] * 4, "wall_mat": ["Standard Paint"] * 4,
+             "tile_size": ["30x30 cm"] * 4}
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        batch = RenovationLogic.calculate_batch(rooms)
+    assert batch["tiles_needed"].tolist() == [291, 0, 0, 0]
+    assert batch["total_cost_cents"].tolist() == [276375, 0, 0, 0] and np.isnan(batch["total_cost"][1:]).all()
+
+
+# TEST 36: JSON Array Input And Reconciling Run Totals
+def test_cli_json_array_and_totals(tmp_path, capsys):
+    import io
+    from cli import main, run
+    rooms = [{"room_type": "Bedroom", "width": 5, "length": 5, "height": 3, "floor_mat": "Vinyl",
+              "wall_mat": "Standard Paint", "tile_size": "30x30 cm", "member": "yes"}] * 3
+    path = tmp_path / "rooms.json"
+    path.write_text(json.dumps(rooms))
+    out = tmp_path / "quotes.jsonl"
+    assert main([str(path), "-o", str(out)]) == 0
+    assert [json.loads(line)["total_cost"] for line in out.read_text().splitlines()] == [2625.56] * 3
+    path.write_text(json.dumps({"rooms": rooms}))
+    assert main([str(path)]) == 1 and "array of room objects" in capsys.readouterr().err
+    totals = run(io.StringIO(json.dumps(rooms)), io.StringIO(), "json", "csv", 2)
+    assert totals["materials_total"] == 3 * 2763.75 and totals["discount_total"] == 3 * 138.19
+    assert round(totals["materials_total"] - totals["discount_total"] + totals["service_total"], 2) == \
+        totals["invoice_total"]
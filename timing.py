@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# STAGE TIMINGS FOR THE CONSULTATION PIPELINE. WHEN DISABLED, stage() HANDS BACK
+# ONE SHARED NO-OP CONTEXT MANAGER, SO AN INSTRUMENTED CALL COSTS ONE ATTRIBUTE
+# CHECK. WHEN ENABLED, EACH STAGE KEEPS ITS LAST window DURATIONS FOR PERCENTILES.
+WINDOW = 1024
+PERCENTILES = (50, 90, 99)
+PROMETHEUS_PREFIX = "renovision_stage"
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class StageStats:
+    __slots__ = ("recent", "count", "total")
+
+    def __init__(self, window):
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+
+class Timings:
+    def __init__(self, enabled=False, window=WINDOW):
+        self.enabled = enabled
+        self.window = window
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    # with TIMINGS.stage("calc.quote"): ...
+    def stage(self, name):
+        if not self.enabled:
+            return NULL_STAGE
+        return _Stage(self, name)
+
+    # FOR DURATIONS THAT SPAN CALLBACKS (E.G. CLICK -> PREVIEW ON SCREEN)
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = StageStats(self.window)
+            stats.recent.append(seconds)
+            stats.count += 1
+            stats.total += seconds
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+    # PER STAGE: LIFETIME COUNT AND MEAN, PERCENTILES OVER THE ROLLING WINDOW (SECONDS)
+    def summary(self):
+        with self._lock:
+            snapshot = {name: (sorted(s.recent), s.count, s.total) for name, s in self._stages.items()}
+        out = {}
+        for name, (recent, count, total) in sorted(snapshot.items()):
+            entry = {"count": count, "mean": total / count if count else 0.0, "max": recent[-1] if recent else 0.0}
+            for p in PERCENTILES:
+                entry[f"p{p}"] = recent[min(len(recent) - 1, int(p / 100 * len(recent)))] if recent else 0.0
+            out[name] = entry
+        return out
+
+    def to_json(self):
+        return json.dumps({"unit": "seconds", "window": self.window, "stages": self.summary()}, indent=2)
+
+    def to_prometheus(self, prefix=PROMETHEUS_PREFIX):
+        lines = [f"# HELP {prefix}_seconds Duration of RENOVISION pipeline stages.",
+                 f"# TYPE {prefix}_seconds summary"]
+        for name, entry in self.summary().items():
+            for p in PERCENTILES:
+                lines.append(f'{prefix}_seconds{{stage="{name}",quantile="{p / 100:g}"}} {entry[f"p{p}"]:.9f}')
+            lines.append(f'{prefix}_seconds_sum{{stage="{name}"}} {entry["mean"] * entry["count"]:.9f}')
+            lines.append(f'{prefix}_seconds_count{{stage="{name}"}} {entry["count"]}')
+        return "\n".join(lines) + "\n"
+
+    # .prom / .txt -> PROMETHEUS TEXT, ANYTHING ELSE -> JSON
+    def dump(self, path):
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    # ONE LINE PER STAGE FOR THE GUI DEBUG OVERLAY
+    def overlay_text(self):
+        rows = [f"{'STAGE':<24}{'N':>6}{'P50':>9}{'P90':>9}{'P99':>9}"]
+        for name, e in self.summary().items():
+            rows.append(f"{name:<24}{e['count']:>6}{e['p50'] * 1000:>7.2f}ms{e['p90'] * 1000:>7.2f}ms"
+                        f"{e['p99'] * 1000:>7.2f}ms")
+        return "\n".join(rows)
+
+
+# RENOVISION_TIMINGS=1 TURNS COLLECTION ON FROM STARTUP (THE GUI OVERLAY ALSO DOES)
+TIMINGS = Timings(enabled=os.environ.get("RENOVISION_TIMINGS", "") not in ("", "0"))